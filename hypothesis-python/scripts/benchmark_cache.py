@@ -0,0 +1,98 @@
+# coding=utf-8
+#
+# This file is part of Hypothesis, which may be found at
+# https://github.com/HypothesisWorks/hypothesis-python
+#
+# Most of this work is copyright (C) 2013-2018 David R. MacIver
+# (david@drmaciver.com), but it contains contributions by others. See
+# CONTRIBUTING.rst for a full list of people who may hold copyright, and
+# consult the git log if you need to determine who owns an individual
+# contribution.
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+#
+# END HEADER
+
+"""Compares the throughput and hit rate of ClockCache with LRUReusedCache,
+which has to be guarded by a lock to be used from several threads, for a
+skewed pattern of reads and writes like that of the strategy cache.
+
+Usage: python scripts/benchmark_cache.py [n_threads] [operations_per_thread]
+"""
+
+from __future__ import division, print_function, absolute_import
+
+import sys
+import time
+import threading
+from random import Random
+
+from hypothesis.internal.cache import ClockCache, LRUReusedCache
+
+CACHE_SIZE = 1024
+N_KEYS = 4096
+
+
+class LockedLRUReusedCache(LRUReusedCache):
+    __slots__ = ('lock',)
+
+    def __init__(self, max_size):
+        super(LockedLRUReusedCache, self).__init__(max_size)
+        self.lock = threading.Lock()
+
+    def __getitem__(self, key):
+        with self.lock:
+            return super(LockedLRUReusedCache, self).__getitem__(key)
+
+    def __setitem__(self, key, value):
+        with self.lock:
+            super(LockedLRUReusedCache, self).__setitem__(key, value)
+
+
+def keys(seed, n):
+    # Roughly Zipf distributed, as a few strategies are built far more often
+    # than the rest.
+    random = Random(seed)
+    return [int(N_KEYS ** random.random()) for _ in range(n)]
+
+
+def worker(cache, keys, counts):
+    hits = 0
+    for k in keys:
+        try:
+            cache[k]
+            hits += 1
+        except KeyError:
+            cache[k] = k
+    counts.append(hits)
+
+
+def run(cache_class, n_threads, n):
+    cache = cache_class(CACHE_SIZE)
+    workloads = [keys(i, n) for i in range(n_threads)]
+    counts = []
+    threads = [
+        threading.Thread(target=worker, args=(cache, w, counts))
+        for w in workloads
+    ]
+    start = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.time() - start
+    return n_threads * n / elapsed, sum(counts) / (n_threads * n)
+
+
+def main(n_threads=8, n=100000):
+    for threads in sorted({1, n_threads}):
+        for cache_class in [LockedLRUReusedCache, ClockCache]:
+            rate, hit_rate = run(cache_class, threads, n)
+            print('%-22s %2d threads: %9.0f ops/s, hit rate %.3f' % (
+                cache_class.__name__, threads, rate, hit_rate))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
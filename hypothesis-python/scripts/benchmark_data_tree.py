@@ -0,0 +1,157 @@
+# coding=utf-8
+#
+# This file is part of Hypothesis, which may be found at
+# https://github.com/HypothesisWorks/hypothesis-python
+#
+# Most of this work is copyright (C) 2013-2018 David R. MacIver
+# (david@drmaciver.com), but it contains contributions by others. See
+# CONTRIBUTING.rst for a full list of people who may hold copyright, and
+# consult the git log if you need to determine who owns an individual
+# contribution.
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+#
+# END HEADER
+
+"""Compares the memory used by DataTree with the list of dicts that
+ConjectureRunner previously used to record the buffers it had run, and the
+time taken to look buffers up in each.
+
+Usage: python scripts/benchmark_data_tree.py [n_buffers] [buffer_size]
+"""
+
+from __future__ import division, print_function, absolute_import
+
+import sys
+import timeit
+import tracemalloc
+from random import Random
+
+from hypothesis.internal.compat import hbytes
+from hypothesis.internal.conjecture.data import ConjectureData
+from hypothesis.internal.conjecture.datatree import DataTree
+
+
+def random_buffers(n, size):
+    random = Random(0)
+    # Buffers share prefixes to a varying degree, as they do when they are
+    # produced by mutating earlier examples.
+    buffers = [hbytes(random.getrandbits(8) for _ in range(size))]
+    while len(buffers) < n:
+        base = random.choice(buffers)
+        i = random.randrange(0, size)
+        buffers.append(base[:i] + hbytes(
+            random.getrandbits(8) for _ in range(size - i)))
+    return buffers
+
+
+def run(buffer):
+    data = ConjectureData.for_buffer(buffer)
+    data.draw_bytes(len(buffer))
+    data.freeze()
+    return data
+
+
+def build_dict_tree(datas):
+    # This is the representation ConjectureRunner used before DataTree.
+    tree = [{}]
+    dead = set()
+    forced = {}
+    capped = {}
+    block_sizes = {}
+    for data in datas:
+        tree_node = tree[0]
+        indices = []
+        node_index = 0
+        for i, b in enumerate(data.buffer):
+            indices.append(node_index)
+            if i in data.forced_indices:
+                forced[node_index] = b
+            try:
+                capped[node_index] = data.capped_indices[i]
+            except KeyError:
+                pass
+            try:
+                node_index = tree_node[b]
+            except KeyError:
+                node_index = len(tree)
+                tree.append({})
+                tree_node[b] = node_index
+            tree_node = tree[node_index]
+            if node_index in dead:
+                break
+        for u, v in data.blocks:
+            if u >= len(indices):
+                break
+            block_sizes[indices[u]] = v - u
+        if node_index not in dead:
+            dead.add(node_index)
+            tree[node_index] = data
+            for j in reversed(indices):
+                if (
+                    len(tree[j]) < capped.get(j, 255) + 1 and
+                    j not in forced
+                ):
+                    break
+                if set(tree[j].values()).issubset(dead):
+                    dead.add(j)
+                else:
+                    break
+    return tree, dead, forced, capped, block_sizes
+
+
+def lookup_dict_tree(tree, buffer):
+    tree, _, forced, _, _ = tree
+    node_index = 0
+    for i in range(len(buffer)):
+        try:
+            c = forced[node_index]
+        except KeyError:
+            c = buffer[i]
+        try:
+            node_index = tree[node_index][c]
+        except KeyError:
+            break
+        node = tree[node_index]
+        if isinstance(node, ConjectureData):
+            return node
+
+
+def build_data_tree(datas):
+    tree = DataTree()
+    for data in datas:
+        tree.add(data, cap=len(data.buffer) + 1)
+    return tree
+
+
+def measure(name, build, lookup, datas):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tree = build(datas)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    build_time = timeit.timeit(lambda: build(datas), number=1)
+    nodes = len(tree) if isinstance(tree, DataTree) else len(tree[0])
+    buffers = [d.buffer for d in datas]
+    elapsed = timeit.timeit(
+        lambda: [lookup(tree, b) for b in buffers], number=3) / 3
+    print((
+        '%-10s %10d nodes %8.1f MB %8.1f bytes/node '
+        '%8.3fs to build %8.3fs to look up'
+    ) % (
+        name, nodes, (after - before) / 1e6, (after - before) / nodes,
+        build_time, elapsed,
+    ))
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 4096
+    datas = [run(b) for b in random_buffers(n, size)]
+    measure('dicts', build_dict_tree, lookup_dict_tree, datas)
+    measure(
+        'DataTree', build_data_tree,
+        lambda tree, b: tree.lookup(b, len(b)), datas,
+    )
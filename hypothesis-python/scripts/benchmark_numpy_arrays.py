@@ -0,0 +1,71 @@
+# coding=utf-8
+#
+# This file is part of Hypothesis, which may be found at
+# https://github.com/HypothesisWorks/hypothesis-python
+#
+# Most of this work is copyright (C) 2013-2018 David R. MacIver
+# (david@drmaciver.com), but it contains contributions by others. See
+# CONTRIBUTING.rst for a full list of people who may hold copyright, and
+# consult the git log if you need to determine who owns an individual
+# contribution.
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+#
+# END HEADER
+
+"""Compares how long it takes to draw dense arrays with elements that can be
+decoded in bulk, against the same elements drawn one at a time (which we get
+by wrapping the elements strategy in a no-op map).
+
+Usage: python scripts/benchmark_numpy_arrays.py [n_examples]
+"""
+
+from __future__ import division, print_function, absolute_import
+
+import sys
+import time
+
+import numpy as np
+
+import hypothesis.strategies as st
+from hypothesis import HealthCheck, given, settings, unlimited
+from hypothesis.extra.numpy import arrays, from_dtype
+
+CASES = [
+    ('bool', 1000),
+    ('int8', 1000),
+    ('int64', 200),
+    ('float32', 200),
+    ('float64', 100),
+]
+
+
+def run(strategy, n):
+    @settings(
+        max_examples=n, database=None, deadline=None, timeout=unlimited,
+        suppress_health_check=[
+            HealthCheck.too_slow, HealthCheck.data_too_large],
+    )
+    @given(strategy)
+    def test(x):
+        pass
+
+    start = time.time()
+    test()
+    return time.time() - start
+
+
+def main(n=200):
+    for dtype, size in CASES:
+        bulk = run(arrays(dtype, size, fill=st.nothing()), n)
+        one_at_a_time = run(arrays(
+            dtype, size, elements=from_dtype(np.dtype(dtype)).map(lambda x: x),
+            fill=st.nothing()), n)
+        print('%-8s x %4d: %6.2fs in bulk, %6.2fs one at a time (%.1fx)' % (
+            dtype, size, bulk, one_at_a_time, one_at_a_time / bulk))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,88 @@
+# coding=utf-8
+#
+# This file is part of Hypothesis, which may be found at
+# https://github.com/HypothesisWorks/hypothesis-python
+#
+# Most of this work is copyright (C) 2013-2018 David R. MacIver
+# (david@drmaciver.com), but it contains contributions by others. See
+# CONTRIBUTING.rst for a full list of people who may hold copyright, and
+# consult the git log if you need to determine who owns an individual
+# contribution.
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+#
+# END HEADER
+
+"""Compares how long it takes to draw data frames whose columns have no fill
+and can be drawn in bulk, against the same columns drawn one row at a time
+(which we get by wrapping each elements strategy in a no-op map), and
+against building them from rows.
+
+Usage: python scripts/benchmark_pandas_data_frames.py [n_examples]
+
+n_examples is the number of examples for the smallest frames, and is
+divided by ten for each larger size.
+"""
+
+from __future__ import division, print_function, absolute_import
+
+import sys
+import time
+
+import numpy as np
+
+import hypothesis.strategies as st
+from hypothesis import HealthCheck, given, settings, unlimited
+from hypothesis.extra.numpy import from_dtype
+from hypothesis.extra.pandas import column, data_frames, range_indexes
+
+DTYPES = ['int64', 'float64', 'bool']
+SIZES = [10, 1000, 100000]
+
+
+def run(strategy, n, rows):
+    @settings(
+        max_examples=n, database=None, deadline=None, timeout=unlimited,
+        buffer_size=max(8 * 1024, 64 * rows),
+        suppress_health_check=HealthCheck.all(),
+    )
+    @given(strategy)
+    def test(x):
+        assert len(x) == rows
+
+    start = time.time()
+    test()
+    return time.time() - start
+
+
+def frames(rows, bulk=True, row_wise=False):
+    columns = [
+        column(dtype, dtype=dtype, fill=st.nothing(), elements=None if bulk
+               else from_dtype(np.dtype(dtype)).map(lambda x: x))
+        for dtype in DTYPES
+    ]
+    return data_frames(
+        columns, index=range_indexes(rows, rows),
+        rows=st.tuples(*[
+            from_dtype(np.dtype(dtype)) for dtype in DTYPES
+        ]) if row_wise else None,
+    )
+
+
+def main(n=100):
+    for rows in SIZES:
+        n = max(1, n)
+        bulk = run(frames(rows), n, rows)
+        one_at_a_time = run(frames(rows, bulk=False), n, rows)
+        row_wise = run(frames(rows, row_wise=True), n, rows)
+        print((
+            '%6d rows x %3d: %7.2fs in bulk, %7.2fs one at a time, '
+            '%7.2fs from rows') % (
+                rows, n, bulk, one_at_a_time, row_wise))
+        n //= 10
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
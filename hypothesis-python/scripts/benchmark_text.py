@@ -0,0 +1,83 @@
+# coding=utf-8
+#
+# This file is part of Hypothesis, which may be found at
+# https://github.com/HypothesisWorks/hypothesis-python
+#
+# Most of this work is copyright (C) 2013-2018 David R. MacIver
+# (david@drmaciver.com), but it contains contributions by others. See
+# CONTRIBUTING.rst for a full list of people who may hold copyright, and
+# consult the git log if you need to determine who owns an individual
+# contribution.
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+#
+# END HEADER
+
+"""Compares how long it takes to draw fixed length text all at once, against
+the same text drawn one character at a time (which we get by wrapping the
+characters strategy in a no-op map), for a large and a small alphabet, and
+times looking up characters in the alphabet of text().
+
+Usage: python scripts/benchmark_text.py [n_examples]
+"""
+
+from __future__ import division, print_function, absolute_import
+
+import sys
+import time
+
+import hypothesis.strategies as st
+from hypothesis import HealthCheck, given, settings, unlimited
+from hypothesis.searchstrategy.strings import OneCharStringStrategy
+
+ALPHABETS = [
+    ('text()', {'blacklist_categories': ('Cs',)}),
+    ('letters', {'whitelist_categories': ('Lu', 'Ll')}),
+    ('latin-1', {'max_codepoint': 255}),
+]
+SIZES = [10, 100, 1000]
+
+
+def run(strategy, n):
+    @settings(
+        max_examples=n, database=None, deadline=None, timeout=unlimited,
+        suppress_health_check=HealthCheck.all(),
+    )
+    @given(strategy)
+    def test(x):
+        pass
+
+    start = time.time()
+    test()
+    return time.time() - start
+
+
+def lookups(intervals, passes=10):
+    indices = range(0, len(intervals), max(1, len(intervals) // 10000))
+    start = time.time()
+    for _ in range(passes):
+        for i in indices:
+            intervals[i]
+    return time.time() - start
+
+
+def main(n=200):
+    for name, kwargs in ALPHABETS:
+        intervals = OneCharStringStrategy(**kwargs).intervals
+        print('%-8s: %d characters in %d intervals, %.2fs to look them up' % (
+            name, len(intervals), len(intervals.intervals),
+            lookups(intervals)))
+        for size in SIZES:
+            bulk = run(st.text(
+                st.characters(**kwargs), min_size=size, max_size=size), n)
+            one_at_a_time = run(st.text(
+                st.characters(**kwargs).map(lambda c: c),
+                min_size=size, max_size=size), n)
+            print('%-8s x %4d: %6.2fs in bulk, %6.2fs one at a time (%.1fx)'
+                  % (name, size, bulk, one_at_a_time, one_at_a_time / bulk))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,81 @@
+# coding=utf-8
+#
+# This file is part of Hypothesis, which may be found at
+# https://github.com/HypothesisWorks/hypothesis-python
+#
+# Most of this work is copyright (C) 2013-2018 David R. MacIver
+# (david@drmaciver.com), but it contains contributions by others. See
+# CONTRIBUTING.rst for a full list of people who may hold copyright, and
+# consult the git log if you need to determine who owns an individual
+# contribution.
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+#
+# END HEADER
+
+"""Maintenance commands for Hypothesis, run as ``python -m hypothesis``."""
+
+from __future__ import division, print_function, absolute_import
+
+import sys
+import argparse
+
+from hypothesis.database import ExampleDatabase
+from hypothesis.utils.conventions import not_set
+from hypothesis.internal.conjecture.corpus import POLICIES, \
+    MAX_CORPUS_SIZE, collect_garbage
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m hypothesis')
+    commands = parser.add_subparsers(dest='command')
+    db_parser = commands.add_parser('db', help='Manage an example database')
+    db_commands = db_parser.add_subparsers(dest='db_command')
+    gc_parser = db_commands.add_parser(
+        'gc', help=(
+            'Delete the saved examples least worth keeping from corpora '
+            'that are over budget. Failing examples are never deleted.'
+        ))
+    gc_parser.add_argument(
+        '--database', default=None,
+        help='The path of the database, by default the one in the '
+        'Hypothesis directory'
+    )
+    gc_parser.add_argument(
+        '--max-corpus-size', type=int, default=MAX_CORPUS_SIZE,
+        help='The most examples to keep for each test in each corpus'
+    )
+    gc_parser.add_argument(
+        '--max-size', type=int, default=None,
+        help='The most examples to keep in all corpora together'
+    )
+    gc_parser.add_argument(
+        '--policy', choices=sorted(POLICIES), default='lru',
+        help='Whether to keep the most recently or most frequently used '
+        'examples'
+    )
+    args = parser.parse_args(argv)
+    if args.command != 'db' or args.db_command != 'gc':
+        parser.print_usage()
+        return 2
+
+    db = ExampleDatabase(not_set if args.database is None else args.database)
+    try:
+        deleted = collect_garbage(
+            db, policy=POLICIES[args.policy],
+            max_corpus_size=args.max_corpus_size, max_size=args.max_size,
+        )
+        db.flush()
+    except NotImplementedError:
+        print('%r cannot list its keys' % (db,), file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+    print('Deleted %d examples from %r' % (deleted, db))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -32,7 +32,7 @@ import attr
 
 from hypothesis.errors import InvalidState, InvalidArgument, \
     HypothesisDeprecationWarning
-from hypothesis.internal.compat import text_type
+from hypothesis.internal.compat import text_type, integer_types
 from hypothesis.utils.conventions import UniqueIdentifier, not_set
 from hypothesis.internal.reflection import proxies, \
     get_pretty_function_description
@@ -437,6 +437,75 @@ your tests slower.
 )
 
 
+def _validate_workers(n):
+    if not isinstance(n, integer_types) or n < 1:
+        raise InvalidArgument(
+            'workers=%r must be a positive integer' % (n,))
+    return n
+
+
+settings._define_setting(
+    'workers',
+    default=1,
+    description="""
+The number of processes to use when running examples. If this is greater
+than one, Hypothesis will fork that many worker processes and run batches of
+generated examples and of shrink attempts in parallel, which can substantially
+speed up tests that are CPU bound.
+
+This is only supported on platforms with ``os.fork``. Elsewhere the setting
+is ignored and examples are generated one at a time.
+""",
+    validator=_validate_workers,
+)
+
+
+def _validate_memory_budget(n):
+    if n is None:
+        return n
+    if not isinstance(n, integer_types) or n < 1:
+        raise InvalidArgument(
+            'memory_budget=%r must be None or a positive integer' % (n,))
+    return n
+
+
+settings._define_setting(
+    'memory_budget',
+    default=None,
+    description="""
+An approximate limit, in bytes, on the memory Hypothesis uses to remember the
+details of examples it has already run. Once this is exceeded the oldest
+details are discarded, so that memory use stays flat on very long runs, at
+the cost of occasionally having to rerun an example rather than looking up
+its result.
+
+If None, which is the default, nothing is ever discarded.
+""",
+    validator=_validate_memory_budget,
+)
+
+
+settings._define_setting(
+    'remember_explored',
+    default=False,
+    description="""
+If True, Hypothesis saves a compact record of which parts of the search space
+it has finished exploring to the example database after each passing run of
+a test, and starts the next run from where that one left off rather than
+from nothing. A test whose possible inputs have all been tried will then
+finish almost instantly.
+
+This record is discarded whenever the strategies the test uses, the source
+of the test function or the version of Hypothesis changes, but *not* when
+the code under test does, so only enable this if inputs that have already
+passed are not worth trying again. The strategies include the source of any
+functions they are built from, such as those passed to
+:func:`~hypothesis.strategies.composite` or ``map``, and any simple values
+those close over. If one closes over anything else, no record is kept.
+""",
+)
+
+
 settings._define_setting(
     'max_shrinks',
     default=500,
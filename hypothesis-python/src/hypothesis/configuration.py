@@ -27,6 +27,10 @@ __hypothesis_home_directory = None
 def set_hypothesis_home_dir(directory):
     global __hypothesis_home_directory
     __hypothesis_home_directory = directory
+    # The default databases are cached per home directory, but a directory
+    # may be reused after being deleted so we start afresh.
+    from hypothesis.database import clear_default_databases
+    clear_default_databases()
 
 
 def mkdir_p(path):
@@ -27,6 +27,7 @@ import time
 import zlib
 import base64
 import random as rnd_module
+import hashlib
 import inspect
 import warnings
 import traceback
@@ -53,9 +54,11 @@ from hypothesis._settings import note_deprecation
 from hypothesis.executors import new_style_executor
 from hypothesis.reporting import report, verbose_report, current_verbosity
 from hypothesis.statistics import note_engine_for_statistics
+from hypothesis.internal.cache import NestedDictView, register_cache
 from hypothesis.internal.compat import ceil, hbytes, qualname, \
-    str_to_bytes, benchmark_time, get_type_hints, getfullargspec, \
-    int_from_bytes, encoded_filepath, bad_django_TestCase
+    text_type, binary_type, str_to_bytes, integer_types, benchmark_time, \
+    get_type_hints, getfullargspec, int_from_bytes, encoded_filepath, \
+    bad_django_TestCase
 from hypothesis.internal.coverage import IN_COVERAGE_TESTS
 from hypothesis.utils.conventions import infer, not_set
 from hypothesis.internal.escalation import is_hypothesis_file, \
@@ -418,6 +421,85 @@ def escalate_warning(msg, slug=None):  # pragma: no cover
     )
 
 
+# Values whose repr is stable between runs, so that a function that closes
+# over or reads one of them can be told apart from one that uses another.
+SIMPLE_TYPES = (
+    bool, float, complex, text_type, binary_type, type(None)
+) + integer_types
+
+
+def strategy_digest(strategy):
+    """Returns a digest of every function defined outside Hypothesis that
+    strategy uses, and of the simple values that they close over, have as
+    defaults or read from their globals. The repr of a strategy names the
+    functions it was built from, but changes to what they do would
+    otherwise go unnoticed.
+
+    Returns None if one of these functions closes over or has as a default
+    anything else, as we can't tell whether that has changed.
+    """
+    parts = set()
+    seen = set()
+    # Pairs of an object to look at and whether we must account for it.
+    # Everything a user function closes over could change what it does,
+    # but the other attributes of a strategy are already in its repr.
+    stack = [(strategy, False)]
+    while stack:
+        obj, strict = stack.pop()
+        if isinstance(obj, SIMPLE_TYPES):
+            if strict:
+                parts.add(str_to_bytes(repr(obj)))
+            continue
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, SearchStrategy):
+            if hasattr(type(obj), 'wrapped_strategy'):
+                stack.append((obj.wrapped_strategy, False))
+            else:
+                stack.extend(
+                    (v, False) for v in getattr(obj, '__dict__', {}).values())
+        elif isinstance(obj, (list, tuple)):
+            if strict and all(isinstance(v, SIMPLE_TYPES) for v in obj):
+                parts.add(str_to_bytes(repr(obj)))
+                continue
+            stack.extend((v, strict) for v in obj)
+        elif isinstance(obj, dict):
+            stack.extend((v, strict) for v in obj.values())
+        elif inspect.ismethod(obj):
+            stack.append((obj.__func__, strict))
+            stack.append((obj.__self__, strict))
+        elif inspect.isfunction(obj):
+            internal = is_hypothesis_file(obj.__code__.co_filename)
+            if not internal:
+                parts.add(function_digest(obj))
+                for name in obj.__code__.co_names:
+                    value = obj.__globals__.get(name)
+                    if isinstance(value, SIMPLE_TYPES):
+                        parts.add(str_to_bytes(name + '=' + repr(value)))
+                    elif inspect.isfunction(value):
+                        stack.append((value, False))
+            for cell in obj.__closure__ or ():
+                try:
+                    stack.append((cell.cell_contents, not internal))
+                except ValueError:  # pragma: no cover
+                    # The cell has not been filled in yet.
+                    pass
+            stack.append((obj.__defaults__ or (), not internal))
+            stack.append((getattr(obj, '__kwdefaults__', None) or {},
+                          not internal))
+        elif inspect.isclass(obj):
+            if not is_hypothesis_file(getattr(
+                sys.modules.get(obj.__module__), '__file__', None) or ''
+            ):
+                parts.add(function_digest(obj))
+        elif inspect.ismodule(obj):
+            pass
+        elif strict:
+            return None
+    return hashlib.sha1(b''.join(sorted(parts))).digest()
+
+
 class Arc(object):
     __slots__ = ('filename', 'source', 'target')
 
@@ -426,8 +508,15 @@ class Arc(object):
         self.source = source
         self.target = target
 
+    def __reduce__(self):
+        # Arcs are compared by identity, so when one is sent to or from a
+        # worker process we need it to come out the other side as the
+        # canonical instance rather than as a copy.
+        return (arc, (self.filename, self.source, self.target))
+
 
 ARC_CACHE = {}  # type: Dict[str, Dict[Any, Dict[Any, Arc]]]
+register_cache('arcs', NestedDictView(ARC_CACHE, 3))
 
 
 def arc(filename, source, target):
@@ -694,9 +783,9 @@ class StateForActualGivenExecution(object):
             raise
         except Exception as e:
             escalate_hypothesis_internal_error()
-            data.__expected_traceback = traceback.format_exc()
-            data.__expected_exception = e
-            verbose_report(data.__expected_traceback)
+            data.expected_traceback = traceback.format_exc()
+            data.expected_exception = e
+            verbose_report(data.expected_traceback)
 
             error_class, _, tb = sys.exc_info()
 
@@ -705,6 +794,20 @@ class StateForActualGivenExecution(object):
             lineno = origin[1]
             data.mark_interesting((error_class, filename, lineno))
 
+    def fingerprint(self):
+        """Returns a digest that changes whenever anything other than the
+        code under test changes how our test responds to a given buffer, or
+        None if we can't be sure of noticing such a change."""
+        strategy = strategy_digest(self.search_strategy)
+        if strategy is None:
+            return None
+        return hashlib.sha1(b'\0'.join((
+            str_to_bytes(__version__),
+            function_digest(self.test),
+            str_to_bytes(repr(self.search_strategy)),
+            strategy,
+        ))).digest()
+
     def run(self):
         # Tell pytest to omit the body of this function from tracebacks
         __tracebackhide__ = True
@@ -712,12 +815,16 @@ class StateForActualGivenExecution(object):
             database_key = str_to_bytes(fully_qualified_name(self.test))
         else:
             database_key = None
+        if self.settings.remember_explored:
+            fingerprint = self.fingerprint()
+        else:
+            fingerprint = None
         self.start_time = time.time()
         global in_given
         runner = ConjectureRunner(
             self.evaluate_test_data,
             settings=self.settings, random=self.random,
-            database_key=database_key,
+            database_key=database_key, fingerprint=fingerprint,
         )
 
         if in_given or self.collector is None:
@@ -801,14 +908,14 @@ class StateForActualGivenExecution(object):
         for falsifying_example in self.falsifying_examples:
             ran_example = ConjectureData.for_buffer(falsifying_example.buffer)
             self.__was_flaky = False
-            assert falsifying_example.__expected_exception is not None
+            assert falsifying_example.expected_exception is not None
             try:
                 self.execute(
                     ran_example,
                     print_example=True, is_final=True,
                     expected_failure=(
-                        falsifying_example.__expected_exception,
-                        falsifying_example.__expected_traceback,
+                        falsifying_example.expected_exception,
+                        falsifying_example.expected_traceback,
                     )
                 )
             except (UnsatisfiedAssumption, StopTest):
@@ -19,6 +19,11 @@ from __future__ import division, print_function, absolute_import
 
 import os
 import re
+import mmap
+import zlib
+import atexit
+import struct
+import weakref
 import binascii
 import warnings
 import threading
@@ -27,13 +32,62 @@ from contextlib import contextmanager
 
 from hypothesis.errors import HypothesisWarning
 from hypothesis._settings import note_deprecation
-from hypothesis.configuration import storage_directory
-from hypothesis.internal.compat import FileNotFoundError, hbytes, \
-    b64decode, b64encode
+from hypothesis.configuration import storage_directory, hypothesis_home_dir
+from hypothesis.internal.cache import LRUReusedCache
+from hypothesis.internal.compat import FileNotFoundError, hbytes, hrange, \
+    b64decode
 from hypothesis.utils.conventions import not_set
 
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
 sqlite3 = None
+
+SQLITE_CREATE = """
+    create table if not exists hypothesis_examples(
+        key blob not null,
+        value blob not null,
+        primary key (key, value)
+    )
+"""
+SQLITE_SAVE = """
+    insert or ignore into hypothesis_examples(key, value) values(?, ?)
+"""
+SQLITE_DELETE = """
+    delete from hypothesis_examples where key = ? and value = ?
+"""
+SQLITE_FETCH = """
+    select value from hypothesis_examples where key = ?
+"""
+SQLITE_FETCH_MANY = """
+    select key, value from hypothesis_examples where key in (%s)
+"""
+SQLITE_KEYS = """
+    select distinct key from hypothesis_examples
+"""
 SQLITE_PATH = re.compile(r"\.\(db|sqlite|sqlite3\)$")
+LOG_PATH = re.compile(r"\.log$")
+
+
+# The default database for each Hypothesis home directory. Every settings
+# object that uses the default database shares one from here, rather than
+# creating a new one (and checking the directory is usable) whenever its
+# database attribute is read.
+_default_databases = {}
+
+
+def clear_default_databases():
+    """Forget all the default databases, so that new ones are created the
+    next time they are needed."""
+    _default_databases.clear()
+
+
+def set_default_database(db):
+    """Use db as the default database until the Hypothesis home directory is
+    next changed, rather than the one that would be created for it."""
+    _default_databases[hypothesis_home_dir()] = db
 
 
 def _db_for_path(path=None):
@@ -50,23 +104,32 @@ def _db_for_path(path=None):
                 'settings profile instead.'
             )
             return _db_for_path(path)
+        home = hypothesis_home_dir()
+        try:
+            return _default_databases[home]
+        except KeyError:
+            pass
         # Note: storage_directory attempts to create the dir in question, so
         # if os.access fails there *must* be a fatal permissions issue.
         path = storage_directory('examples')
         if os.access(path, os.R_OK | os.W_OK | os.X_OK):
-            return _db_for_path(path)
+            db = _db_for_path(path)
         else:  # pragma: no cover
             warnings.warn(HypothesisWarning(
                 'The database setting is not configured, and the default '
                 'location is unusable - falling back to an in-memory '
                 'database for this session.  path=%r' % (path,)
             ))
-            return InMemoryExampleDatabase()
+            db = InMemoryExampleDatabase()
+        _default_databases[home] = db
+        return db
     if path in (None, ':memory:'):
         return InMemoryExampleDatabase()
     path = str(path)
     if os.path.isdir(path):
         return DirectoryBasedExampleDatabase(path)
+    if LOG_PATH.search(path):
+        return LogStructuredExampleDatabase(path)
     if os.path.exists(path):
         return SQLiteExampleDatabase(path)
     if SQLITE_PATH.search(path):
@@ -75,6 +138,54 @@ def _db_for_path(path=None):
         return DirectoryBasedExampleDatabase(path)
 
 
+class LazyValue(object):
+    """A value fetched from an example database, whose length is known but
+    which is only read when ``materialize`` is called."""
+
+    __slots__ = ('length', 'source', 'start')
+
+    def __init__(self, length, source, start=0):
+        self.length = length
+        self.source = source
+        self.start = start
+
+    def __len__(self):
+        return self.length
+
+    def __repr__(self):
+        return '%s(length=%d)' % (type(self).__name__, self.length)
+
+    def materialize(self):
+        """Return this value. Subclasses that read it from somewhere it can
+        be deleted from, such as FileValue, return None if it has been
+        deleted since it was fetched."""
+        return hbytes(self.source[self.start:self.start + self.length])
+
+    def digest(self):
+        """Return the sha1 digest of this value, reading it in place rather
+        than copying it out of source where possible."""
+        try:
+            view = memoryview(self.source)
+        except TypeError:  # pragma: no cover
+            # Python 2 mmaps only support the old buffer protocol, and some
+            # subclasses have a source that isn't data at all.
+            return sha1(self.materialize()).digest()
+        return sha1(view[self.start:self.start + self.length]).digest()
+
+
+class FileValue(LazyValue):
+    """A LazyValue that is the contents of the file at ``source``."""
+
+    __slots__ = ()
+
+    def materialize(self):
+        try:
+            with open(self.source, 'rb') as i:
+                return hbytes(i.read())
+        except FileNotFoundError:
+            return None
+
+
 class EDMeta(type):
 
     def __call__(self, *args, **kwargs):
@@ -126,6 +237,55 @@ class ExampleDatabase(
         """Return all values matching this key."""
         raise NotImplementedError('%s.fetch' % (type(self).__name__))
 
+    def save_many(self, key, values):
+        """Save each of ``values`` under ``key``. Equivalent to calling
+        save(key, value) for each of them but may have a more efficient
+        implementation."""
+        for value in values:
+            self.save(key, value)
+
+    def delete_many(self, key, values):
+        """Remove each of ``values`` from ``key``. Equivalent to calling
+        delete(key, value) for each of them but may have a more efficient
+        implementation."""
+        for value in values:
+            self.delete(key, value)
+
+    def keys(self):
+        """Return a list of every key that has values saved under it, and
+        possibly some that no longer do. Not every database can do this."""
+        raise NotImplementedError('%s.keys' % (type(self).__name__))
+
+    def fetch_lazy(self, key):
+        """Return a LazyValue for each value matching this key, which may be
+        much cheaper than fetch if only some of them are going to be used."""
+        for value in self.fetch(key):
+            yield LazyValue(len(value), value)
+
+    def fetch_many(self, keys, lazy=False):
+        """Return a dict mapping each of ``keys`` to a list of all the values
+        matching it, which are LazyValue objects if ``lazy`` is True."""
+        fetch = self.fetch_lazy if lazy else self.fetch
+        return dict((key, list(fetch(key))) for key in keys)
+
+    @contextmanager
+    def batch(self):
+        """A context manager inside which writes to this database may be
+        deferred, so that they can be merged and made together when it
+        exits. They are made whether or not the block raises an exception,
+        and reads from inside the block always see them.
+
+        By default every write is made immediately.
+        """
+        yield
+
+    def flush(self):
+        """Wait until any writes to this database that have been deferred
+        have actually been made, raising any error that occurred making them.
+
+        By default writes are never deferred, so this does nothing.
+        """
+
     def close(self):
         """Clear up any resources associated with this database."""
         raise NotImplementedError('%s.close' % (type(self).__name__))
@@ -140,7 +300,9 @@ class InMemoryExampleDatabase(ExampleDatabase):
         return 'InMemoryExampleDatabase(%r)' % (self.data,)
 
     def fetch(self, key):
-        for v in self.data.get(key, ()):
+        # Iterate over a copy, so that values can be saved or deleted from
+        # another thread while this is being consumed.
+        for v in list(self.data.get(key, ())):
             yield v
 
     def save(self, key, value):
@@ -149,15 +311,30 @@ class InMemoryExampleDatabase(ExampleDatabase):
     def delete(self, key, value):
         self.data.get(key, set()).discard(hbytes(value))
 
+    def save_many(self, key, values):
+        self.data.setdefault(key, set()).update(map(hbytes, values))
+
+    def delete_many(self, key, values):
+        self.data.get(key, set()).difference_update(map(hbytes, values))
+
+    def keys(self):
+        return [key for key, values in self.data.items() if values]
+
     def close(self):
         pass
 
 
 class SQLiteExampleDatabase(ExampleDatabase):
+    """An example database stored in a SQLite file, with keys and values as
+    BLOBs in a single table whose primary key starts with the key.
+
+    Each thread has its own connection. Files are put in WAL mode, which
+    lets several processes read and write them at once, and everything
+    written inside ``batch`` is committed as a single transaction.
+    """
 
     def __init__(self, path=u':memory:'):
         self.path = path
-        self.db_created = False
         self.current_connection = threading.local()
         global sqlite3
         import sqlite3
@@ -177,9 +354,60 @@ class SQLiteExampleDatabase(ExampleDatabase):
             )
 
     def connection(self):
-        if not hasattr(self.current_connection, 'connection'):
-            self.current_connection.connection = sqlite3.connect(self.path)
-        return self.current_connection.connection
+        local = self.current_connection
+        if not hasattr(local, 'connection'):
+            # sqlite3 keeps a cache of prepared statements for each
+            # connection, so we use the same SQL for every query we can.
+            connection = sqlite3.connect(self.path)
+            if self.path != u':memory:':
+                connection.execute('pragma journal_mode=wal')
+                # This is only unsafe if the OS crashes, and even then we
+                # only risk losing the latest examples.
+                connection.execute('pragma synchronous=normal')
+            self.__create_tables(connection)
+            local.connection = connection
+        return local.connection
+
+    def __create_tables(self, connection):
+        # We check what is there first so that, as is almost always the case,
+        # if there's nothing to do we don't need to wait for a write lock.
+        tables = set(name for name, in connection.execute(
+            "select name from sqlite_master where type = 'table'"))
+        if 'hypothesis_examples' not in tables:
+            connection.execute(SQLITE_CREATE)
+            connection.commit()
+        if 'hypothesis_data_mapping' not in tables:
+            return
+        # Databases created by older versions of Hypothesis stored keys and
+        # values base64 encoded in another table, which we move over and
+        # drop. Another process may be doing the same at the same time,
+        # which is fine as copying them twice does nothing.
+        connection.execute('begin immediate')
+        try:
+            rows = []
+            for key, value in connection.execute(
+                'select key, value from hypothesis_data_mapping'
+            ):
+                try:
+                    rows.append((
+                        sqlite3.Binary(b64decode(key)),
+                        sqlite3.Binary(b64decode(value)),
+                    ))
+                except (binascii.Error, TypeError):
+                    pass
+            connection.executemany(SQLITE_SAVE, rows)
+            connection.execute('drop table hypothesis_data_mapping')
+        except sqlite3.OperationalError:
+            # Someone else got there first and dropped the table.
+            connection.rollback()
+        except BaseException:
+            connection.rollback()
+            raise
+        else:
+            connection.commit()
+
+    def create_db_if_needed(self):
+        self.connection()
 
     def close(self):
         if hasattr(self.current_connection, 'connection'):
@@ -204,52 +432,69 @@ class SQLiteExampleDatabase(ExampleDatabase):
             conn.rollback()
             raise
         else:
-            conn.commit()
+            if not getattr(self.current_connection, 'batch_depth', 0):
+                conn.commit()
+
+    @contextmanager
+    def batch(self):
+        # Everything written inside the batch goes into a single transaction,
+        # which we commit on the way out.
+        local = self.current_connection
+        local.batch_depth = getattr(local, 'batch_depth', 0) + 1
+        try:
+            yield
+        finally:
+            local.batch_depth -= 1
+            if not local.batch_depth:
+                self.connection().commit()
 
     def save(self, key, value):
-        self.create_db_if_needed()
-        with self.cursor() as cursor:
-            try:
-                cursor.execute("""
-                    insert into hypothesis_data_mapping(key, value)
-                    values(?, ?)
-                """, (b64encode(key), b64encode(value)))
-            except sqlite3.IntegrityError:
-                pass
+        self.save_many(key, (value,))
 
     def delete(self, key, value):
-        self.create_db_if_needed()
-        with self.cursor() as cursor:
-            cursor.execute("""
-                delete from hypothesis_data_mapping
-                where key = ? and value = ?
-            """, (b64encode(key), b64encode(value)))
+        self.delete_many(key, (value,))
 
     def fetch(self, key):
-        self.create_db_if_needed()
         with self.cursor() as cursor:
-            cursor.execute("""
-                select value from hypothesis_data_mapping
-                where key = ?
-            """, (b64encode(key),))
-            for (value,) in cursor:
-                try:
-                    yield b64decode(value)
-                except (binascii.Error, TypeError):
-                    pass
+            cursor.execute(SQLITE_FETCH, (sqlite3.Binary(key),))
+            # Reading everything before we yield anything means that we don't
+            # hold a read transaction open for as long as the caller likes.
+            values = cursor.fetchall()
+        for (value,) in values:
+            yield hbytes(value)
 
-    def create_db_if_needed(self):
-        if self.db_created:
-            return
+    def keys(self):
+        with self.cursor() as cursor:
+            cursor.execute(SQLITE_KEYS)
+            return [hbytes(key) for (key,) in cursor.fetchall()]
+
+    def save_many(self, key, values):
+        key = sqlite3.Binary(key)
+        with self.cursor() as cursor:
+            cursor.executemany(SQLITE_SAVE, [
+                (key, sqlite3.Binary(value)) for value in values])
+
+    def delete_many(self, key, values):
+        key = sqlite3.Binary(key)
         with self.cursor() as cursor:
-            cursor.execute("""
-                create table if not exists hypothesis_data_mapping(
-                    key text,
-                    value text,
-                    unique(key, value)
-                )
-            """)
-        self.db_created = True
+            cursor.executemany(SQLITE_DELETE, [
+                (key, sqlite3.Binary(value)) for value in values])
+
+    def fetch_many(self, keys, lazy=False):
+        result = dict((hbytes(key), []) for key in keys)
+        if not result:
+            return result
+        with self.cursor() as cursor:
+            cursor.execute(
+                SQLITE_FETCH_MANY % (', '.join('?' * len(result)),),
+                [sqlite3.Binary(key) for key in result])
+            rows = cursor.fetchall()
+        for key, value in rows:
+            value = hbytes(value)
+            if lazy:
+                value = LazyValue(len(value), value)
+            result[hbytes(key)].append(value)
+        return result
 
 
 def mkdirp(path):
@@ -260,6 +505,17 @@ def mkdirp(path):
     return path
 
 
+try:
+    _replace = os.replace
+except AttributeError:  # pragma: no cover
+    # On Python 2 os.rename will do, except on Windows where we don't support
+    # concurrent use of a log anyway.
+    _replace = os.rename
+
+
+DIRECTORY_KEY_FILE = '.key'
+
+
 def _hash(key):
     return sha1(key).hexdigest()[:16]
 
@@ -269,6 +525,9 @@ class DirectoryBasedExampleDatabase(ExampleDatabase):
     def __init__(self, path):
         self.path = path
         self.keypaths = {}
+        # While inside batch(), a mapping of key -> value -> whether that
+        # value is to be saved (True) or deleted (False) when it exits.
+        self.pending = None
 
     def __repr__(self):
         return 'DirectoryBasedExampleDatabase(%r)' % (self.path,)
@@ -282,10 +541,47 @@ class DirectoryBasedExampleDatabase(ExampleDatabase):
         except KeyError:
             pass
         directory = os.path.join(self.path, _hash(key))
-        mkdirp(directory)
+        # The directory names are hashes, so we write the key itself next to
+        # the values to be able to list the keys. Its name has a dot in, so
+        # it is never mistaken for a value.
+        key_file = os.path.join(directory, DIRECTORY_KEY_FILE)
+        if not os.path.exists(key_file):
+            mkdirp(directory)
+            self.__write(key_file, key)
         self.keypaths[key] = directory
         return directory
 
+    def keys(self):
+        try:
+            names = os.listdir(self.path)
+        except OSError:
+            return []
+        result = []
+        for name in names:
+            try:
+                with open(
+                    os.path.join(self.path, name, DIRECTORY_KEY_FILE), 'rb'
+                ) as i:
+                    result.append(hbytes(i.read()))
+            except (IOError, OSError):
+                # Either not a directory, or one that was created by an
+                # older version of Hypothesis and not used since.
+                continue
+        return result
+
+    def _list(self, key):
+        """Returns the path of the directory for key, and the names of the
+        files in it."""
+        kp = self._key_path(key)
+        try:
+            names = os.listdir(kp)
+        except OSError:
+            # The directory has been deleted since we created it.
+            return kp, []
+        # Values are written to a file whose name has a random suffix and
+        # then renamed into place, and we don't want to read them until then.
+        return kp, [name for name in names if '.' not in name]
+
     def _value_path(self, key, value):
         return os.path.join(
             self._key_path(key),
@@ -293,34 +589,121 @@ class DirectoryBasedExampleDatabase(ExampleDatabase):
         )
 
     def fetch(self, key):
-        kp = self._key_path(key)
-        for path in os.listdir(kp):
+        changes = None
+        if self.pending is not None:
+            changes = self.pending.get(key)
+        kp, names = self._list(key)
+        for path in names:
             try:
                 with open(os.path.join(kp, path), 'rb') as i:
-                    yield hbytes(i.read())
+                    value = hbytes(i.read())
             except FileNotFoundError:
-                pass
+                continue
+            if changes is None or changes.get(value, True):
+                yield value
+        if changes is not None:
+            for value, saved in list(changes.items()):
+                if saved and not os.path.exists(self._value_path(key, value)):
+                    yield value
+
+    def fetch_lazy(self, key):
+        # We only need the size of each file now, and reading it later
+        # rather than now saves an open and close as well as the read.
+        changes = None
+        if self.pending is not None:
+            changes = self.pending.get(key)
+        deleted = set()
+        if changes is not None:
+            deleted = set(_hash(v) for v, keep in changes.items() if not keep)
+        kp, names = self._list(key)
+        seen = set()
+        for name in names:
+            if name in deleted:
+                continue
+            path = os.path.join(kp, name)
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                continue
+            seen.add(name)
+            yield FileValue(size, path)
+        if changes is not None:
+            for value, keep in list(changes.items()):
+                if keep and _hash(value) not in seen:
+                    yield LazyValue(len(value), value)
+
+    @contextmanager
+    def batch(self):
+        if self.pending is not None:
+            yield
+            return
+        self.pending = {}
+        try:
+            yield
+        finally:
+            pending = self.pending
+            self.pending = None
+            for key, changes in pending.items():
+                deleted = [v for v, keep in changes.items() if not keep]
+                if deleted:
+                    self.delete_many(key, deleted)
+                saved = [v for v, keep in changes.items() if keep]
+                if saved:
+                    self.save_many(key, saved)
+
+    def __write(self, path, value):
+        suffix = binascii.hexlify(os.urandom(16))
+        if not isinstance(suffix, str):  # pragma: no branch
+            # On Python 3, binascii.hexlify returns bytes
+            suffix = suffix.decode('ascii')
+        tmpname = path + '.' + suffix
+        try:
+            o = open(tmpname, 'wb')
+        except FileNotFoundError:
+            # Someone has deleted the directory since we created it, which
+            # is more likely now that default databases live for the whole
+            # session, so create it again.
+            mkdirp(os.path.dirname(path))
+            o = open(tmpname, 'wb')
+        with o:
+            o.write(value)
+        try:
+            os.rename(tmpname, path)
+        except OSError:  # pragma: no cover
+            os.unlink(tmpname)
+        assert not os.path.exists(tmpname)
 
     def save(self, key, value):
+        if self.pending is not None:
+            self.pending.setdefault(key, {})[hbytes(value)] = True
+            return
         path = self._value_path(key, value)
         if not os.path.exists(path):
-            suffix = binascii.hexlify(os.urandom(16))
-            if not isinstance(suffix, str):  # pragma: no branch
-                # On Python 3, binascii.hexlify returns bytes
-                suffix = suffix.decode('ascii')
-            tmpname = path + '.' + suffix
-            with open(tmpname, 'wb') as o:
-                o.write(value)
-            try:
-                os.rename(tmpname, path)
-            except OSError:  # pragma: no cover
-                os.unlink(tmpname)
-            assert not os.path.exists(tmpname)
+            self.__write(path, value)
+
+    def save_many(self, key, values):
+        if self.pending is not None:
+            for value in values:
+                self.save(key, value)
+            return
+        # Listing the directory once is much cheaper than checking for every
+        # value separately, especially on network file systems.
+        kp, names = self._list(key)
+        existing = set(names)
+        for value in values:
+            name = _hash(value)
+            if name not in existing:
+                self.__write(os.path.join(kp, name), value)
+                existing.add(name)
 
     def move(self, src, dest, value):
         if src == dest:
             self.save(src, value)
             return
+        if self.pending is not None:
+            self.delete(src, value)
+            self.save(dest, value)
+            return
         try:
             os.rename(
                 self._value_path(src, value), self._value_path(dest, value))
@@ -329,7 +712,1129 @@ class DirectoryBasedExampleDatabase(ExampleDatabase):
             self.save(dest, value)
 
     def delete(self, key, value):
+        if self.pending is not None:
+            self.pending.setdefault(key, {})[hbytes(value)] = False
+            return
         try:
             os.unlink(self._value_path(key, value))
         except OSError:
             pass
+
+    def delete_many(self, key, values):
+        if self.pending is not None:
+            for value in values:
+                self.delete(key, value)
+            return
+        kp, names = self._list(key)
+        existing = set(names)
+        for value in values:
+            name = _hash(value)
+            if name in existing:
+                existing.discard(name)
+                try:
+                    os.unlink(os.path.join(kp, name))
+                except OSError:
+                    pass
+
+
+# A log file starts with LOG_MAGIC and then some random bytes, which are
+# different every time the file is rewritten. Every record after that is a
+# header, then the key and value, then a CRC32 of everything before it in the
+# record. A record that is cut short or whose checksum does not match marks
+# the end of the usable part of the file.
+LOG_MAGIC = b'HYPLOG01'
+LOG_IDENTITY_SIZE = 16
+LOG_START = len(LOG_MAGIC) + LOG_IDENTITY_SIZE
+LOG_HEADER = struct.Struct('>BII')
+LOG_CHECKSUM = struct.Struct('>I')
+LOG_SAVE = 1
+LOG_DELETE = 0
+
+# We compact a log once it has more than this many records and at least half
+# of them are redundant.
+LOG_COMPACTION_THRESHOLD = 1000
+
+# On Windows a file cannot be replaced while it is mapped into memory, so
+# there we read new parts of a log into memory instead.
+MMAP_LOGS = os.name != 'nt'
+
+
+def _log_record(op, key, value):
+    record = bytearray(LOG_HEADER.pack(op, len(key), len(value)))
+    record.extend(key)
+    record.extend(value)
+    record.extend(LOG_CHECKSUM.pack(zlib.crc32(record) & 0xffffffff))
+    return record
+
+
+class LogStructuredExampleDatabase(ExampleDatabase):
+    """An example database that keeps everything in a single file, to which
+    saves and deletes are appended as records. The file is memory mapped and
+    indexed, so that values are only copied out of it when they are fetched,
+    and it is periodically compacted by rewriting it with only the values
+    that are still present.
+
+    Several processes can safely use the same file at once: it is only read
+    or written under an exclusive lock on a ``.lock`` file next to it, and a
+    process notices when another has compacted the file and reloads it. Locking
+    requires the fcntl module, so is not available on Windows.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.RLock()
+        # A mapping of key -> sha1 of value -> LazyValue, as of the first
+        # offset bytes of the file that starts with identity.
+        self.index = {}
+        self.identity = None
+        self.offset = 0
+        # The number of records in the file so far, and how many of them are
+        # saves of values that are still present.
+        self.records = 0
+        self.live = 0
+        # While inside batch(), a list of writes to make when it exits.
+        self.pending = None
+
+    def __repr__(self):
+        return 'LogStructuredExampleDatabase(%r)' % (self.path,)
+
+    def close(self):
+        pass
+
+    def __reset(self, identity):
+        self.index = {}
+        self.identity = identity
+        self.offset = 0 if identity is None else LOG_START
+        self.records = 0
+        self.live = 0
+
+    def __apply(self, op, key, value):
+        """Update the index with a write of the LazyValue value, returning
+        whether it changed anything."""
+        digest = value.digest()
+        values = self.index.get(key)
+        if op == LOG_SAVE:
+            if values is None:
+                values = {}
+                self.index[key] = values
+            elif digest in values:
+                return False
+            values[digest] = value
+            self.live += 1
+            return True
+        else:
+            if values is None or digest not in values:
+                return False
+            del values[digest]
+            if not values:
+                del self.index[key]
+            self.live -= 1
+            return True
+
+    def __refresh(self):
+        """Bring the index up to date with anything that has been appended to
+        the file since we last read it. Returns the size of the file, which
+        is more than self.offset if it ends in an incomplete record."""
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            self.__reset(None)
+            return 0
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            start = f.read(LOG_START)
+            if start[:len(LOG_MAGIC)] != LOG_MAGIC[:len(start)]:
+                raise ValueError(
+                    '%r is not an example database' % (self.path,))
+            if len(start) < LOG_START:
+                self.__reset(None)
+                return size
+            identity = start[len(LOG_MAGIC):]
+            if identity != self.identity or size < self.offset:
+                # The file has been compacted since we last read it.
+                self.__reset(identity)
+            if size == self.offset:
+                return size
+            # Values in the index keep a reference to the data they were read
+            # from, which stays valid even once the file has been compacted.
+            # Anything after the last complete record may be truncated by the
+            # next writer, but we only read that part while holding the lock.
+            if MMAP_LOGS:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                position = self.offset
+            else:  # pragma: no cover
+                f.seek(self.offset)
+                data = f.read()
+                position = 0
+        base = self.offset - position
+        while True:
+            start = position + LOG_HEADER.size
+            if start > len(data):
+                break
+            op, key_length, value_length = LOG_HEADER.unpack_from(
+                data, position)
+            end = start + key_length + value_length
+            if end + LOG_CHECKSUM.size > len(data):
+                break
+            checksum, = LOG_CHECKSUM.unpack_from(data, end)
+            if zlib.crc32(data[position:end]) & 0xffffffff != checksum:
+                break
+            self.__apply(
+                op, hbytes(data[start:start + key_length]),
+                LazyValue(value_length, data, start + key_length))
+            self.records += 1
+            position = end + LOG_CHECKSUM.size
+        self.offset = base + position
+        return size
+
+    @contextmanager
+    def __locked(self):
+        with self.lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                mkdirp(directory)
+            with open(self.path + '.lock', 'ab') as lock_file:
+                if fcntl is not None:  # pragma: no branch
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:  # pragma: no branch
+                        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def __write(self, writes):
+        with self.__locked():
+            try:
+                size = self.__refresh()
+                data = bytearray()
+                if self.identity is None:
+                    identity = os.urandom(LOG_IDENTITY_SIZE)
+                    data.extend(LOG_MAGIC)
+                    data.extend(identity)
+                records = 0
+                for op, key, value in writes:
+                    if self.__apply(op, key, LazyValue(len(value), value)):
+                        data.extend(_log_record(op, key, value))
+                        records += 1
+                if not records:
+                    return
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT)
+                with os.fdopen(fd, 'r+b') as f:
+                    if size > self.offset:
+                        # Whoever was writing the last record never got to
+                        # finish it, and we hold the lock so nobody else can.
+                        f.truncate(self.offset)
+                    f.seek(self.offset)
+                    f.write(data)
+                if self.identity is None:
+                    self.identity = identity
+                self.offset += len(data)
+                self.records += records
+            except BaseException:
+                # We can't be sure what state the file is in, so start again
+                # from scratch next time.
+                self.__reset(None)
+                raise
+        if (
+            self.records > LOG_COMPACTION_THRESHOLD and
+            self.records > 2 * self.live
+        ):
+            self.compact()
+
+    def compact(self):
+        """Atomically replace the file with one containing only the values
+        that are currently present."""
+        with self.__locked():
+            self.__refresh()
+            identity = os.urandom(LOG_IDENTITY_SIZE)
+            data = bytearray(LOG_MAGIC)
+            data.extend(identity)
+            for key, values in self.index.items():
+                for value in values.values():
+                    data.extend(
+                        _log_record(LOG_SAVE, key, value.materialize()))
+            suffix = binascii.hexlify(os.urandom(16))
+            if not isinstance(suffix, str):  # pragma: no branch
+                suffix = suffix.decode('ascii')
+            tmpname = self.path + '.' + suffix
+            try:
+                with open(tmpname, 'wb') as o:
+                    o.write(data)
+                    o.flush()
+                    os.fsync(o.fileno())
+                _replace(tmpname, self.path)
+            except BaseException:
+                try:
+                    os.unlink(tmpname)
+                except OSError:
+                    pass
+                raise
+            self.identity = identity
+            self.offset = len(data)
+            self.records = self.live
+
+    def __values(self, key):
+        values = self.index.get(key)
+        if not self.pending:
+            return list(values.values()) if values else []
+        values = dict(values or ())
+        for op, k, value in self.pending:
+            if k == key:
+                digest = sha1(value).digest()
+                if op == LOG_SAVE:
+                    values.setdefault(digest, LazyValue(len(value), value))
+                else:
+                    values.pop(digest, None)
+        return list(values.values())
+
+    def fetch_lazy(self, key):
+        with self.__locked():
+            self.__refresh()
+            values = self.__values(key)
+        for value in values:
+            yield value
+
+    def fetch(self, key):
+        for value in self.fetch_lazy(key):
+            yield value.materialize()
+
+    def keys(self):
+        with self.__locked():
+            self.__refresh()
+            return [key for key, values in self.index.items() if values]
+
+    def fetch_many(self, keys, lazy=False):
+        with self.__locked():
+            self.__refresh()
+            result = dict((key, self.__values(key)) for key in keys)
+        if not lazy:
+            for key, values in result.items():
+                result[key] = [v.materialize() for v in values]
+        return result
+
+    def save(self, key, value):
+        self.save_many(key, (value,))
+
+    def delete(self, key, value):
+        self.delete_many(key, (value,))
+
+    def save_many(self, key, values):
+        self.__writes([
+            (LOG_SAVE, hbytes(key), hbytes(value)) for value in values
+        ])
+
+    def delete_many(self, key, values):
+        self.__writes([
+            (LOG_DELETE, hbytes(key), hbytes(value)) for value in values
+        ])
+
+    def __writes(self, writes):
+        with self.lock:
+            if self.pending is not None:
+                self.pending.extend(writes)
+                return
+        if writes:
+            self.__write(writes)
+
+    @contextmanager
+    def batch(self):
+        with self.lock:
+            outermost = self.pending is None
+            if outermost:
+                self.pending = []
+        if not outermost:
+            yield
+            return
+        try:
+            yield
+        finally:
+            with self.lock:
+                pending = self.pending
+                self.pending = None
+            if pending:
+                self.__write(pending)
+
+
+# How long the thread that makes writes for a WriteBehindExampleDatabase
+# waits for more work before exiting.
+WRITE_BEHIND_IDLE_TIMEOUT = 1.0
+
+# Every WriteBehindExampleDatabase that is still in use, so that any writes
+# they have outstanding can be made when the interpreter exits without
+# keeping them alive until then.
+_write_behind_databases = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_write_behind_databases():
+    for db in list(_write_behind_databases):
+        db.flush()
+
+
+class WriteBehindExampleDatabase(ExampleDatabase):
+    """Wraps another example database so that writes to it are made by a
+    background thread, and never block the caller.
+
+    Writes are queued up while the thread is busy, and a save and delete of
+    the same value cancel out. Reads always see every write made before
+    them, whether or not it has reached the wrapped database yet. Writes
+    are all made by the time ``flush`` or ``close`` returns, and any that
+    are outstanding when the interpreter exits are made then.
+
+    If making a batch of writes fails they are queued up again, to be tried
+    with the next write or flush, and the error is raised by the next call
+    to ``flush``.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.condition = threading.Condition()
+        # Writes that the thread has yet to start on, and those it is
+        # currently making, each as a mapping of key -> value -> whether
+        # that value is to be saved (True) or deleted (False).
+        self.pending = {}
+        self.in_flight = {}
+        self.thread = None
+        self.error = None
+        _write_behind_databases.add(self)
+
+    def __repr__(self):
+        return 'WriteBehindExampleDatabase(%r)' % (self.db,)
+
+    def __queue(self, key, values, keep):
+        with self.condition:
+            changes = self.pending.setdefault(key, {})
+            for value in values:
+                changes[hbytes(value)] = keep
+            self.__start()
+            self.condition.notify_all()
+
+    def __start(self):
+        """Start the thread if it is not running. Must be called holding
+        self.condition."""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.__run)
+            self.thread.daemon = True
+            self.thread.start()
+
+    def __run(self):
+        while True:
+            with self.condition:
+                if not self.pending:
+                    self.condition.wait(WRITE_BEHIND_IDLE_TIMEOUT)
+                if not self.pending:
+                    self.thread = None
+                    self.condition.notify_all()
+                    return
+                self.in_flight = self.pending
+                self.pending = {}
+            try:
+                with self.db.batch():
+                    for key, changes in self.in_flight.items():
+                        deleted = [v for v, k in changes.items() if not k]
+                        if deleted:
+                            self.db.delete_many(key, deleted)
+                        saved = [v for v, k in changes.items() if k]
+                        if saved:
+                            self.db.save_many(key, saved)
+            except Exception as e:
+                with self.condition:
+                    if self.error is None:
+                        self.error = e
+                    # Put the writes back, without undoing any made to the
+                    # same values since, and stop until we are next asked
+                    # to make some rather than failing over and over.
+                    for key, changes in self.in_flight.items():
+                        changes.update(self.pending.get(key, ()))
+                        self.pending[key] = changes
+                    self.in_flight = {}
+                    self.thread = None
+                    self.condition.notify_all()
+                    return
+            with self.condition:
+                self.in_flight = {}
+                self.condition.notify_all()
+
+    def __changes(self, key):
+        """The writes to key that may not have been made yet, as a mapping of
+        value -> whether it is saved."""
+        with self.condition:
+            changes = dict(self.in_flight.get(key, ()))
+            changes.update(self.pending.get(key, ()))
+        return changes
+
+    def save(self, key, value):
+        self.__queue(key, (value,), True)
+
+    def delete(self, key, value):
+        self.__queue(key, (value,), False)
+
+    def save_many(self, key, values):
+        self.__queue(key, values, True)
+
+    def delete_many(self, key, values):
+        self.__queue(key, values, False)
+
+    def move(self, src, dest, value):
+        if src != dest:
+            self.delete(src, value)
+        self.save(dest, value)
+
+    def fetch(self, key):
+        # We must look at what is outstanding before reading from the wrapped
+        # database, as the thread may write it there in between.
+        # The thread may also be writing to the wrapped database, so we read
+        # everything from it before yielding anything.
+        changes = self.__changes(key)
+        for value in list(self.db.fetch(key)):
+            if changes.pop(value, True):
+                yield value
+        for value, keep in changes.items():
+            if keep:
+                yield value
+
+    def fetch_lazy(self, key):
+        changes = self.__changes(key)
+        if not changes:
+            for value in list(self.db.fetch_lazy(key)):
+                yield value
+            return
+        for value in self.fetch(key):
+            yield LazyValue(len(value), value)
+
+    def keys(self):
+        self.flush()
+        return self.db.keys()
+
+    def flush(self):
+        with self.condition:
+            if self.pending:
+                self.__start()
+            while self.thread is not None and (
+                self.pending or self.in_flight
+            ):
+                self.condition.wait()
+            error = self.error
+            self.error = None
+        if error is not None:
+            raise error
+        self.db.flush()
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+
+# The operations that a RemoteExampleDatabase can ask an
+# ExampleDatabaseServer to perform. Saves, deletes and moves get no reply,
+# so that they never wait on the server. Requests are handled in the order
+# they are sent, so replying to a fetch or a flush implies that every write
+# sent before it has been made.
+SERVER_SAVE = 0
+SERVER_DELETE = 1
+SERVER_MOVE = 2
+SERVER_FETCH = 3
+SERVER_FLUSH = 4
+SERVER_KEYS = 5
+
+SERVER_HEADER = struct.Struct('>BI')
+SERVER_LENGTH = struct.Struct('>I')
+
+# The number of keys whose values an ExampleDatabaseServer keeps in memory.
+SERVER_CACHE_SIZE = 1024
+
+
+def _pack_message(op, fields):
+    """Encode a message as a byte for the operation and a count of fields,
+    followed by each of fields prefixed with its length."""
+    message = bytearray(SERVER_HEADER.pack(op, len(fields)))
+    for field in fields:
+        message.extend(SERVER_LENGTH.pack(len(field)))
+        message.extend(field)
+    return bytes(message)
+
+
+def _unpack_message(message):
+    message = hbytes(message)
+    op, count = SERVER_HEADER.unpack_from(message)
+    position = SERVER_HEADER.size
+    fields = []
+    for _ in hrange(count):
+        length, = SERVER_LENGTH.unpack_from(message, position)
+        position += SERVER_LENGTH.size
+        fields.append(hbytes(message[position:position + length]))
+        position += length
+    return op, fields
+
+
+class ExampleDatabaseServer(object):
+    """Makes an example database available to RemoteExampleDatabase clients
+    in other processes, so that they all share one handle on its storage.
+
+    Each client connection is served by its own thread, but all requests are
+    made against db one at a time. The values for the keys that have been
+    fetched most recently are kept in memory, so that the same read from
+    many clients only touches the underlying storage once. Writes that are
+    not made through the server are not seen in those, so while it is
+    running the server must be the only writer to db.
+
+    address is anything that ``multiprocessing.connection.Listener``
+    accepts, and by default is a fresh Unix socket (or a named pipe on
+    Windows). Clients must be given the same authkey, which is random unless
+    one is passed in.
+    """
+
+    def __init__(self, db, address=None, authkey=None):
+        from multiprocessing.connection import Listener
+        self.db = db
+        if authkey is None:
+            authkey = os.urandom(16)
+        self.authkey = authkey
+        self.listener = Listener(address, authkey=authkey)
+        self.address = self.listener.address
+        self.lock = threading.Lock()
+        self.cache = LRUReusedCache(SERVER_CACHE_SIZE)
+        self.closed = False
+        self.thread = threading.Thread(target=self.__serve)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def __repr__(self):
+        return 'ExampleDatabaseServer(%r, %r)' % (self.db, self.address)
+
+    def __serve(self):
+        while True:
+            try:
+                connection = self.listener.accept()
+            except Exception:
+                # A client that fails to authenticate ends up here, as does
+                # the listener being closed underneath us.
+                if self.closed:
+                    return
+                continue
+            if self.closed:
+                connection.close()
+                return
+            thread = threading.Thread(
+                target=self.__handle, args=(connection,))
+            thread.daemon = True
+            thread.start()
+
+    def __handle(self, connection):
+        try:
+            while True:
+                try:
+                    message = connection.recv_bytes()
+                except (EOFError, IOError, OSError):
+                    return
+                op, fields = _unpack_message(message)
+                with self.lock:
+                    reply = self.__perform(op, fields)
+                if reply is not None:
+                    connection.send_bytes(reply)
+        finally:
+            connection.close()
+
+    def __cached(self, key):
+        """Return the set of values for key if we have it in memory, or None
+        if we would have to read them."""
+        try:
+            return self.cache[key]
+        except KeyError:
+            return None
+
+    def __perform(self, op, fields):
+        if op == SERVER_SAVE:
+            key, values = fields[0], fields[1:]
+            self.db.save_many(key, values)
+            cached = self.__cached(key)
+            if cached is not None:
+                cached.update(values)
+        elif op == SERVER_DELETE:
+            key, values = fields[0], fields[1:]
+            self.db.delete_many(key, values)
+            cached = self.__cached(key)
+            if cached is not None:
+                cached.difference_update(values)
+        elif op == SERVER_MOVE:
+            src, dest, value = fields
+            self.db.move(src, dest, value)
+            cached = self.__cached(src)
+            if src != dest and cached is not None:
+                cached.discard(value)
+            cached = self.__cached(dest)
+            if cached is not None:
+                cached.add(value)
+        elif op == SERVER_FETCH:
+            # A fetch of many keys may not all fit in the cache at once, so
+            # we answer it from what we found rather than reading back.
+            found = {}
+            missing = []
+            for key in fields:
+                cached = self.__cached(key)
+                if cached is None:
+                    missing.append(key)
+                else:
+                    found[key] = cached
+            if missing:
+                for key, values in self.db.fetch_many(missing).items():
+                    found[key] = set(map(hbytes, values))
+                    self.cache[key] = found[key]
+            counts = bytearray()
+            values = []
+            for key in fields:
+                counts.extend(SERVER_LENGTH.pack(len(found[key])))
+                values.extend(found[key])
+            return _pack_message(SERVER_FETCH, [counts] + values)
+        elif op == SERVER_FLUSH:
+            self.db.flush()
+            return _pack_message(SERVER_FLUSH, ())
+        elif op == SERVER_KEYS:
+            return _pack_message(SERVER_KEYS, list(self.db.keys()))
+        else:
+            raise ValueError('Unknown operation %r' % (op,))
+
+    def close(self):
+        """Stop accepting new clients and close db. Clients that are still
+        connected will fail the next time they use the server."""
+        from multiprocessing.connection import Client
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            # Wake the thread up from accept, so that it sees we are closed.
+            # We don't authenticate, as it may have already seen that and
+            # stopped accepting, and then nothing would answer us.
+            Client(self.address).close()
+        except Exception:  # pragma: no cover
+            pass
+        self.thread.join()
+        self.listener.close()
+        with self.lock:
+            self.db.close()
+
+
+class RemoteExampleDatabase(ExampleDatabase):
+    """An example database that is actually an ExampleDatabaseServer,
+    usually in another process, at the given address.
+
+    Writes are sent to the server without waiting for it to make them, and
+    are all made by the time ``flush`` returns. A process forked from one
+    using this database gets its own connection to the server.
+    """
+
+    def __init__(self, address, authkey=None):
+        self.address = address
+        self.authkey = authkey
+        self.lock = threading.Lock()
+        self.connection = None
+        self.pid = None
+
+    def __repr__(self):
+        return 'RemoteExampleDatabase(%r)' % (self.address,)
+
+    def __connection(self):
+        if self.connection is None or self.pid != os.getpid():
+            from multiprocessing.connection import Client
+            self.connection = Client(self.address, authkey=self.authkey)
+            self.pid = os.getpid()
+        return self.connection
+
+    def __send(self, op, fields):
+        with self.lock:
+            self.__connection().send_bytes(_pack_message(op, fields))
+
+    def __request(self, op, fields):
+        with self.lock:
+            connection = self.__connection()
+            connection.send_bytes(_pack_message(op, fields))
+            reply_op, reply = _unpack_message(connection.recv_bytes())
+        assert reply_op == op
+        return reply
+
+    def save(self, key, value):
+        self.save_many(key, (value,))
+
+    def delete(self, key, value):
+        self.delete_many(key, (value,))
+
+    def save_many(self, key, values):
+        values = list(values)
+        if values:
+            self.__send(SERVER_SAVE, [key] + values)
+
+    def delete_many(self, key, values):
+        values = list(values)
+        if values:
+            self.__send(SERVER_DELETE, [key] + values)
+
+    def move(self, src, dest, value):
+        self.__send(SERVER_MOVE, (src, dest, value))
+
+    def fetch(self, key):
+        for value in self.fetch_many((key,))[key]:
+            yield value
+
+    def fetch_many(self, keys, lazy=False):
+        keys = list(keys)
+        reply = self.__request(SERVER_FETCH, keys)
+        counts = reply[0]
+        values = iter(reply[1:])
+        result = {}
+        for i, key in enumerate(keys):
+            count, = SERVER_LENGTH.unpack_from(counts, i * SERVER_LENGTH.size)
+            found = [next(values) for _ in hrange(count)]
+            if lazy:
+                found = [LazyValue(len(v), v) for v in found]
+            result[key] = found
+        return result
+
+    def keys(self):
+        return self.__request(SERVER_KEYS, ())
+
+    def flush(self):
+        self.__request(SERVER_FLUSH, ())
+
+    def close(self):
+        with self.lock:
+            if self.connection is not None and self.pid == os.getpid():
+                self.connection.close()
+            self.connection = None
+
+
+# The ways in which CompressedExampleDatabase may store a value. Each stored
+# value starts with a COMPRESSION_HEADER of its format and the length of the
+# value, and for COMPRESSION_DICTIONARY the first DICTIONARY_DIGEST_SIZE
+# bytes of the sha1 of the dictionary it was compressed with.
+COMPRESSION_RAW = 0
+COMPRESSION_DEFLATE = 1
+COMPRESSION_DICTIONARY = 2
+COMPRESSION_HEADER = struct.Struct('>BI')
+DICTIONARY_DIGEST_SIZE = 4
+
+# The dictionaries for each family of keys are saved under the family's key
+# with this suffix, uncompressed.
+DICTIONARY_SUFFIX = b'.dictionary'
+
+# The suffixes that the engine adds to a test's key for its other corpora,
+# which are all in the same family and so share a dictionary.
+FAMILY_SUFFIXES = (b'.secondary', b'.coverage')
+
+# How many values of a family we must see before we train a dictionary for
+# it, and the largest that dictionary may be.
+DICTIONARY_TRAINING_SIZE = 32
+MAX_DICTIONARY_SIZE = 4096
+
+
+def _family(key):
+    for suffix in FAMILY_SUFFIXES:
+        if key.endswith(suffix):
+            return key[:-len(suffix)]
+    return key
+
+
+def _train_dictionary(values):
+    """Build a dictionary for compressing values similar to values, by
+    concatenating as many of them as fit. Deflate can refer back to the end
+    of a dictionary most cheaply, so the shortest values go there."""
+    chosen = []
+    size = 0
+    for value in sorted(set(values), key=lambda v: (len(v), v)):
+        if size + len(value) > MAX_DICTIONARY_SIZE:
+            break
+        chosen.append(value)
+        size += len(value)
+    return hbytes(b''.join(map(bytes, reversed(chosen))))
+
+
+class CompressionDictionary(object):
+    """A preset dictionary for deflate, which values shared between the
+    values compressed with it are only stored once in.
+
+    Python 2's zlib does not support preset dictionaries, so instead we
+    compress the dictionary itself and flush, and copy the compressor in
+    that state for each value. The output for the dictionary is not stored,
+    but is put in front of a stored value to decompress it.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.digest = sha1(data).digest()[:DICTIONARY_DIGEST_SIZE]
+        self.compressor = zlib.compressobj(9, zlib.DEFLATED, -15)
+        prefix = self.compressor.compress(bytes(data))
+        prefix += self.compressor.flush(zlib.Z_SYNC_FLUSH)
+        self.decompressor = zlib.decompressobj(-15)
+        self.decompressor.decompress(prefix)
+
+    def compress(self, value):
+        compressor = self.compressor.copy()
+        return compressor.compress(bytes(value)) + compressor.flush()
+
+    def decompress(self, data):
+        return self.decompressor.copy().decompress(bytes(data))
+
+
+class DecodedValue(LazyValue):
+    """A LazyValue that is the decoding of the LazyValue ``source``. Its
+    length is only known once it has been read, so asking for it reads it.
+    """
+
+    __slots__ = ('decode', 'value')
+
+    def __init__(self, source, decode):
+        super(DecodedValue, self).__init__(None, source)
+        self.decode = decode
+        self.value = None
+
+    def __len__(self):
+        value = self.materialize()
+        return 0 if value is None else len(value)
+
+    def __repr__(self):
+        return 'DecodedValue(%r)' % (self.source,)
+
+    def materialize(self):
+        if self.value is None:
+            stored = self.source.materialize()
+            if stored is not None:
+                self.value = self.decode(stored)
+        return self.value
+
+
+class CompressedExampleDatabase(ExampleDatabase):
+    """Wraps another example database so that values are stored in it
+    compressed, which saves a lot of space as most of them are long runs of
+    zero bytes with little variation between them.
+
+    Each value is compressed with deflate, and once enough values for a test
+    have been seen, a dictionary built from them is saved for it, which all
+    later values for the test are compressed against. This means that the
+    parts which the test's primary, secondary and coverage corpora have in
+    common are only stored in full once. Values are only stored compressed
+    if that makes them smaller, and any stored value can be read whatever
+    dictionaries have been saved since.
+
+    The same value may be stored in several different ways, for example if
+    it was saved before a dictionary was trained, so to delete a value we
+    look up how it is stored rather than working out how it might be. For
+    each key we have read, we keep an index of the stored values under it by
+    the digest of the value they decode to.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        # A mapping of family -> digest -> CompressionDictionary, for every
+        # family that we have looked up the dictionaries of.
+        self.dictionaries = {}
+        # Pairs of family and digest that values refer to, but which we still
+        # could not find a dictionary for after looking them up again.
+        self.unknown = set()
+        # The values we have seen for each family that has no dictionary,
+        # until there are enough of them to train one.
+        self.training = {}
+        # A mapping of key -> value digest -> set of stored values, for
+        # every key that we have read all of the stored values for.
+        self.indexes = {}
+
+    def __repr__(self):
+        return 'CompressedExampleDatabase(%r)' % (self.db,)
+
+    def __dictionaries(self, family, refresh=False):
+        """The dictionaries saved for family, by digest. These are looked up
+        once, and again if refresh is True, because another process sharing
+        the database may have saved one since."""
+        dictionaries = self.dictionaries.get(family)
+        if dictionaries is not None and not refresh:
+            return dictionaries
+        if dictionaries is None:
+            dictionaries = {}
+            self.dictionaries[family] = dictionaries
+        for data in self.db.fetch(family + DICTIONARY_SUFFIX):
+            digest = sha1(data).digest()[:DICTIONARY_DIGEST_SIZE]
+            if digest not in dictionaries:
+                dictionaries[digest] = CompressionDictionary(data)
+        return dictionaries
+
+    def __dictionary(self, family):
+        """The dictionary that values in family are compressed with, if
+        any. If several processes have each saved one we all pick the same
+        one, so that every value has a single canonical encoding."""
+        dictionaries = self.__dictionaries(family)
+        if dictionaries:
+            return dictionaries[min(dictionaries)]
+        return None
+
+    def __observe(self, key, values):
+        family = _family(key)
+        if family.endswith(DICTIONARY_SUFFIX) or self.__dictionaries(family):
+            return
+        seen = self.training.setdefault(family, set())
+        seen.update(map(hbytes, values))
+        if len(seen) >= DICTIONARY_TRAINING_SIZE:
+            del self.training[family]
+            if self.__dictionaries(family, refresh=True):
+                # Someone else has trained one since we last looked.
+                return
+            data = _train_dictionary(seen)
+            self.db.save(family + DICTIONARY_SUFFIX, data)
+            dictionary = CompressionDictionary(data)
+            self.dictionaries[family][dictionary.digest] = dictionary
+
+    def __encode(self, key, value):
+        """The way value is stored under key: compressed with the family's
+        dictionary if it has one and with plain deflate otherwise, unless
+        that makes it no smaller."""
+        value = hbytes(value)
+        dictionary = self.__dictionary(_family(key))
+        if dictionary is not None:
+            encoded = hbytes(
+                COMPRESSION_HEADER.pack(COMPRESSION_DICTIONARY, len(value)) +
+                dictionary.digest + dictionary.compress(value))
+        else:
+            encoded = hbytes(
+                COMPRESSION_HEADER.pack(COMPRESSION_DEFLATE, len(value)) +
+                zlib.compress(bytes(value), 9)[2:-4])
+        raw = hbytes(
+            COMPRESSION_HEADER.pack(COMPRESSION_RAW, len(value)) + value)
+        if len(encoded) < len(raw):
+            return encoded
+        return raw
+
+    def __index(self, key, stored):
+        """Replace the index for key with one of stored, every value that
+        is stored under it, and return the values that they decode to."""
+        index = {}
+        values = set()
+        for s in stored:
+            value = self.__decode(key, s)
+            if value is not None:
+                index.setdefault(
+                    sha1(value).digest(), set()).add(hbytes(s))
+                values.add(value)
+        self.indexes[key] = index
+        return values
+
+    def __take(self, key, values):
+        """Remove values from the index for key and return every way in
+        which they are stored. If we have not read key, or it looks like
+        one of the values is missing, we read it again first, as another
+        process may have saved values to it since."""
+        digests = [sha1(hbytes(v)).digest() for v in values]
+        index = self.indexes.get(key)
+        if index is None or any(d not in index for d in digests):
+            self.__index(key, self.db.fetch(key))
+            index = self.indexes[key]
+        stored = []
+        for d in digests:
+            stored.extend(index.pop(d, ()))
+        return stored
+
+    def __decode(self, key, stored):
+        """Returns the value that stored is the encoding of, or None if it
+        cannot be read."""
+        if len(stored) < COMPRESSION_HEADER.size:
+            return None
+        fmt, length = COMPRESSION_HEADER.unpack_from(stored)
+        data = stored[COMPRESSION_HEADER.size:]
+        try:
+            if fmt == COMPRESSION_RAW:
+                value = data
+            elif fmt == COMPRESSION_DEFLATE:
+                value = zlib.decompress(bytes(data), -15)
+            elif fmt == COMPRESSION_DICTIONARY:
+                family = _family(key)
+                digest = bytes(data[:DICTIONARY_DIGEST_SIZE])
+                dictionary = self.__dictionaries(family).get(digest)
+                if dictionary is None and (family, digest) not in self.unknown:
+                    dictionary = self.__dictionaries(
+                        family, refresh=True).get(digest)
+                    if dictionary is None:
+                        self.unknown.add((family, digest))
+                if dictionary is None:
+                    return None
+                value = dictionary.decompress(data[DICTIONARY_DIGEST_SIZE:])
+            else:
+                return None
+        except zlib.error:
+            return None
+        if len(value) != length:
+            return None
+        return hbytes(value)
+
+    def __decoder(self, key):
+        return lambda stored: self.__decode(key, stored)
+
+    def save(self, key, value):
+        self.save_many(key, (value,))
+
+    def delete(self, key, value):
+        self.delete_many(key, (value,))
+
+    def save_many(self, key, values):
+        values = list(map(hbytes, values))
+        self.__observe(key, values)
+        stored = [self.__encode(key, v) for v in values]
+        index = self.indexes.get(key)
+        if index is not None:
+            for v, s in zip(values, stored):
+                index.setdefault(sha1(v).digest(), set()).add(s)
+        self.db.save_many(key, stored)
+
+    def delete_many(self, key, values):
+        stored = self.__take(key, list(values))
+        if stored:
+            self.db.delete_many(key, stored)
+
+    def move(self, src, dest, value):
+        if src == dest:
+            self.save(src, value)
+            return
+        if _family(src) == _family(dest):
+            # Both keys share a dictionary, so the value can move as it is.
+            stored = self.__take(src, [value])
+            if not stored:
+                self.save(dest, value)
+                return
+            index = self.indexes.get(dest)
+            if index is not None:
+                index.setdefault(
+                    sha1(hbytes(value)).digest(), set()).add(stored[0])
+            with self.db.batch():
+                self.db.move(src, dest, stored[0])
+                self.db.delete_many(src, stored[1:])
+        else:
+            with self.db.batch():
+                self.delete(src, value)
+                self.save(dest, value)
+
+    def fetch(self, key):
+        for value in self.fetch_many((key,))[key]:
+            yield value
+
+    def fetch_lazy(self, key):
+        for value in self.fetch_many((key,), lazy=True)[key]:
+            yield value
+
+    def fetch_many(self, keys, lazy=False):
+        result = {}
+        for key, stored in self.db.fetch_many(keys, lazy=lazy).items():
+            if lazy:
+                decode = self.__decoder(key)
+                result[key] = [DecodedValue(s, decode) for s in stored]
+            else:
+                result[key] = list(self.__index(key, stored))
+                self.__observe(key, result[key])
+        return result
+
+    def keys(self):
+        return [
+            k for k in self.db.keys() if not k.endswith(DICTIONARY_SUFFIX)]
+
+    def batch(self):
+        return self.db.batch()
+
+    def flush(self):
+        self.db.flush()
+
+    def close(self):
+        self.db.close()
@@ -23,11 +23,16 @@ import numpy as np
 
 import hypothesis.strategies as st
 import hypothesis.internal.conjecture.utils as cu
+import hypothesis.internal.conjecture.floats as flt
 from hypothesis.errors import InvalidArgument
 from hypothesis.searchstrategy import SearchStrategy
 from hypothesis.internal.compat import hrange, text_type
 from hypothesis.internal.coverage import check_function
 from hypothesis.internal.reflection import proxies
+from hypothesis.searchstrategy.lazy import unwrap_strategies
+from hypothesis.searchstrategy.misc import BoolStrategy
+from hypothesis.searchstrategy.numbers import NASTY_FLOATS, \
+    FloatStrategy, BoundedIntStrategy
 
 if False:
     from typing import Any, Union, Sequence, Tuple  # noqa
@@ -101,9 +106,285 @@ def order_check(name, floor, small, large):
     )
 
 
+class BulkDecoder(object):
+    """Turns bytes drawn all at once for every element of an array into the
+    values of those elements, for element strategies whose values we know
+    how to decode with vectorized numpy operations.
+
+    The bytes for each element are drawn as a run of blocks with the sizes
+    in self.sizes, each of which is read as a big-endian unsigned integer,
+    so that every element shrinks independently and shrinking its bytes
+    makes it simpler.
+    """
+
+    sizes = ()
+
+    def raw_dtype(self, offset=0, itemsize=None):
+        """Returns the dtype of a structured array with a field for each of
+        our blocks, starting offset bytes into records of itemsize bytes."""
+        offsets = []
+        for n in self.sizes:
+            offsets.append(offset)
+            offset += n
+        return np.dtype({
+            'names': ['f%d' % (i,) for i in hrange(len(self.sizes))],
+            'formats': ['>u%d' % (n,) for n in self.sizes],
+            'offsets': offsets,
+            'itemsize': offset if itemsize is None else itemsize,
+        })
+
+    def draw(self, data, count):
+        buf = data.draw_blocks(self.sizes, count)
+        return self.decode(np.frombuffer(buf, dtype=self.raw_dtype()))
+
+    def decode(self, raw):
+        """Returns an array of the values for the elements in raw, a
+        structured array with a field f0, f1, ... for each of their
+        blocks."""
+        raise NotImplementedError()
+
+
+def draw_interleaved(data, decoders, count):
+    """Returns a list of count values decoded by each of decoders, drawn
+    all at once with the blocks for the i'th value of each of them next to
+    each other.
+
+    This is useful for the columns of a table, because it means that
+    deleting the data for a row deletes it from every column.
+    """
+    sizes = [n for d in decoders for n in d.sizes]
+    buf = data.draw_blocks(sizes, count)
+    result = []
+    offset = 0
+    for d in decoders:
+        raw = np.frombuffer(buf, dtype=d.raw_dtype(offset, sum(sizes)))
+        result.append(d.decode(raw))
+        offset += sum(d.sizes)
+    return result
+
+
+class BooleanDecoder(BulkDecoder):
+    sizes = (1,)
+
+    def decode(self, raw):
+        return (raw['f0'] & 1).astype(bool)
+
+
+def integer_size(n):
+    """Returns the smallest number of bytes that numpy has an integer type
+    for that can hold n."""
+    for size in (1, 2, 4, 8):
+        if n < 256 ** size:
+            return size
+    raise ValueError('%d is too large for a numpy integer' % (n,))
+
+
+class UnsignedDecoder(BulkDecoder):
+    """Decodes integers between lower >= 0 and upper inclusive, shrinking
+    towards lower."""
+
+    def __init__(self, lower, upper):
+        assert 0 <= lower <= upper
+        self.lower = lower
+        self.upper = upper
+        self.sizes = (integer_size(upper - lower),)
+
+    def decode(self, raw):
+        values = raw['f0'].astype(np.uint64)
+        if self.upper - self.lower + 1 < 256 ** self.sizes[0]:
+            values %= np.uint64(self.upper - self.lower + 1)
+        return values + np.uint64(self.lower)
+
+
+class SignedDecoder(BulkDecoder):
+    """Decodes any integer that fits in size bytes, as two's complement but
+    with the sign bit inverted, so that the non-negative integers come first
+    and the negative ones shrink towards -1."""
+
+    def __init__(self, size):
+        self.sizes = (size,)
+
+    def decode(self, raw):
+        values = raw['f0'].astype(np.uint64)
+        half = np.uint64(2 ** (8 * self.sizes[0] - 1))
+        magnitude = (values & (half - np.uint64(1))).astype(np.int64)
+        return np.where(values >= half, ~magnitude, magnitude)
+
+
+FLOAT_EXPONENTS = np.array(flt.ENCODING_TABLE, dtype=np.uint64)
+REVERSED_BYTES = np.array(flt.REVERSE_BITS_TABLE, dtype=np.uint8)
+
+
+def reverse64(values):
+    """Reverse each of an array of 64-bit unsigned integers bitwise, as
+    conjecture.floats.reverse64 does for one."""
+    as_bytes = REVERSED_BYTES[values.view(np.uint8).reshape(-1, 8)]
+    return np.ascontiguousarray(as_bytes[:, ::-1]).view(np.uint64)[:, 0]
+
+
+def lex_to_floats(lex):
+    """Decode an array of 64-bit unsigned integers to floats in the same way
+    as conjecture.floats.lex_to_float."""
+    lex = lex.astype(np.uint64)
+    exponent = FLOAT_EXPONENTS[(lex >> np.uint64(52)) & np.uint64(0x7ff)]
+    unbiased = exponent.astype(np.int64) - flt.BIAS
+    mantissa = lex & np.uint64(flt.MANTISSA_MASK)
+    # The number of fractional bits of the mantissa, whose order we reverse.
+    n = np.clip(52 - unbiased, 0, 52).astype(np.uint64)
+    fractional = mantissa & ((np.uint64(1) << n) - np.uint64(1))
+    reversed_fractional = np.where(
+        n > 0, reverse64(fractional) >> (np.uint64(64) - n), 0
+    ).astype(np.uint64)
+    mantissa = (mantissa ^ fractional) | reversed_fractional
+    encoded = ((exponent << np.uint64(52)) | mantissa).view(np.float64)
+    simple = (lex & np.uint64((1 << 56) - 1)).astype(np.float64)
+    return np.where(lex >> np.uint64(63) == 1, encoded, simple)
+
+
+class FloatDecoder(BulkDecoder):
+    """Decodes floats the way FloatStrategy draws them: Each element has a
+    byte choosing between one of the nasty floats and a float drawn as by
+    conjecture.floats.draw_float, which takes up the other two blocks."""
+
+    sizes = (1, 8, 1)
+
+    def __init__(self, nasty_floats):
+        self.nasty_floats = np.array(nasty_floats, dtype=np.float64)
+        # FloatStrategy draws a float rather than a nasty one a fifth of the
+        # time. Choosing with a whole byte means that the nasty floats near
+        # the start of the list are drawn slightly more often than the rest.
+        self.threshold = 256 // 5
+
+    def decode(self, raw):
+        choice = raw['f0'].astype(np.intp)
+        drawn = lex_to_floats(raw['f1'])
+        drawn = np.where(raw['f2'] & 1, -drawn, drawn)
+        if not len(self.nasty_floats):
+            return drawn
+        nasty = self.nasty_floats[
+            np.maximum(choice - self.threshold, 0) % len(self.nasty_floats)]
+        return np.where(choice < self.threshold, drawn, nasty)
+
+
+def bulk_decoder_for(dtype, elements=None):
+    """Returns a BulkDecoder which gives values for an array of dtype like
+    those from elements, or like those from from_dtype(dtype) if elements is
+    None, or None if we don't know how to decode them."""
+    if elements is None:
+        if dtype.kind == u'b':
+            return BooleanDecoder()
+        if dtype.kind == u'f':
+            return FloatDecoder(NASTY_FLOATS)
+        if dtype.kind == u'u':
+            return UnsignedDecoder(0, 2 ** (8 * dtype.itemsize) - 1)
+        if dtype.kind == u'i':
+            return SignedDecoder(dtype.itemsize)
+        if dtype.kind in (u'm', u'M') and u'[' in dtype.str:
+            # from_dtype draws times with a fixed unit from every int64.
+            return SignedDecoder(8)
+        return None
+    elements = unwrap_strategies(elements)
+    if isinstance(elements, BoolStrategy):
+        if dtype.kind in (u'b', u'u', u'i', u'f'):
+            return BooleanDecoder()
+    if isinstance(elements, FloatStrategy):
+        if dtype.kind == u'f' and elements.allow_nan and \
+                elements.allow_infinity:
+            return FloatDecoder(elements.nasty_floats)
+    if isinstance(elements, BoundedIntStrategy):
+        # integers() only uses this strategy for non-negative ranges.
+        if dtype.kind in (u'u', u'i') and 0 <= elements.start and \
+                elements.end <= np.iinfo(dtype).max:
+            return UnsignedDecoder(elements.start, elements.end)
+    return None
+
+
+def draw_array_elements(data, elements, dtype, n, decoder=None):
+    """Returns an array of n values of dtype, decoded in bulk by decoder if
+    that is not None and otherwise drawn from elements one at a time."""
+    if decoder is not None:
+        with np.errstate(over='ignore', invalid='ignore'):
+            return decoder.draw(data, n).astype(dtype)
+    result = np.zeros(shape=n, dtype=dtype)
+    for i in hrange(n):
+        result[i] = data.draw(elements)
+    return result
+
+
+def distinct_new_values(candidates, existing):
+    """Returns a mask of the candidates that are the first of their value in
+    candidates and do not appear in existing.
+
+    NaN and NaT values are always included, as they are not equal to
+    anything, just as when we check each element against a set of those we
+    have seen.
+    """
+    if candidates.dtype.kind in (u'm', u'M'):
+        # Comparing NaT warns, so we compare the underlying integers instead,
+        # in which NaT is the smallest int64. This is what np.isnat checks
+        # for, but that needs a newer numpy than we support.
+        candidates = candidates.view(np.int64)
+        existing = existing.view(np.int64)
+        nulls = candidates == np.iinfo(np.int64).min
+    elif candidates.dtype.kind in (u'f', u'c'):
+        nulls = np.isnan(candidates)
+    else:
+        nulls = None
+    keep = np.zeros(len(candidates), dtype=bool)
+    # Comparing NaNs gives a warning that we don't care about.
+    with np.errstate(invalid='ignore'):
+        keep[np.unique(candidates, return_index=True)[1]] = True
+        if len(existing):
+            keep &= ~np.isin(candidates, existing)
+    if nulls is not None:
+        keep |= nulls
+    return keep
+
+
+# How many duplicates we will draw for a unique array before we start to
+# give up on it if we are not finding enough new values.
+UNIQUE_REJECTION_ALLOWANCE = 10
+
+
+def draw_distinct(data, draw_values, result, existing=None, min_size=None):
+    """Fill result with distinct values, none of which are in existing if
+    that is given, from draw_values(data, n), which returns an array of n
+    values of result's dtype. Returns the number of places filled.
+
+    We draw candidates for all of the places left to fill at once, keep
+    the ones that are distinct from each other and from those we already
+    have, and draw again for the rest. We compare the values after numpy
+    has converted them to the array's dtype, and as in the one at a time
+    check NaN is never equal to anything, so may appear many times.
+
+    If min_size is not None, like cu.many we stop early once we have filled
+    at least min_size places but are not finding enough new values.
+    """
+    if existing is None:
+        existing = result[:0]
+    filled = 0
+    rejected = 0
+    while filled < len(result):
+        candidates = draw_values(data, len(result) - filled)
+        new = candidates[distinct_new_values(
+            candidates, np.concatenate([existing, result[:filled]]))]
+        result[filled:filled + len(new)] = new
+        filled += len(new)
+        rejected += len(candidates) - len(new)
+        # Like cu.many, give up if most of what we draw is rejected, but
+        # only judge that once we have had a chance to fill some places.
+        if rejected > 2 * filled + UNIQUE_REJECTION_ALLOWANCE:
+            if min_size is not None and filled >= min_size:
+                break
+            data.mark_invalid()
+    return filled
+
+
 class ArrayStrategy(SearchStrategy):
 
-    def __init__(self, element_strategy, shape, dtype, fill, unique):
+    def __init__(
+        self, element_strategy, shape, dtype, fill, unique, decoder=None
+    ):
         self.shape = tuple(shape)
         self.fill = fill
         check_argument(shape,
@@ -116,6 +397,7 @@ class ArrayStrategy(SearchStrategy):
         self.dtype = dtype
         self.element_strategy = element_strategy
         self.unique = unique
+        self.decoder = decoder
 
     def do_draw(self, data):
         if 0 in self.shape:
@@ -132,7 +414,11 @@ class ArrayStrategy(SearchStrategy):
             # elements strategy does not produce reusable values), so we must
             # generate a fully dense array with a freshly drawn value for each
             # entry.
-            if self.unique:
+            if self.unique and self.dtype.kind not in (u'O', u'V'):
+                draw_distinct(data, self.draw_elements, result)
+            elif self.unique:
+                # Objects and structured values can't be sorted in general,
+                # so we have to check these for duplicates one at a time.
                 seen = set()
                 elements = cu.many(
                     data,
@@ -152,8 +438,7 @@ class ArrayStrategy(SearchStrategy):
                     else:
                         elements.reject()
             else:
-                for i in hrange(len(result)):
-                    result[i] = data.draw(self.element_strategy)
+                result[:] = self.draw_elements(data, self.array_size)
         else:
             # We draw numpy arrays as "sparse with an offset". We draw a
             # collection of index assignments within the array and assign
@@ -217,6 +502,11 @@ class ArrayStrategy(SearchStrategy):
 
         return result.reshape(self.shape)
 
+    def draw_elements(self, data, n):
+        """Returns an array of n freshly drawn elements."""
+        return draw_array_elements(
+            data, self.element_strategy, self.dtype, n, self.decoder)
+
 
 @check_function
 def fill_for(elements, unique, fill, name=''):
@@ -296,6 +586,13 @@ def arrays(
     You can set fill to :func:`~hypothesis.strategies.nothing` if you want to
     disable this behaviour and draw a value for every element.
 
+    When every element is drawn like this and the elements strategy is
+    inferred, or is :func:`~hypothesis.strategies.booleans`, a bounded
+    :func:`~hypothesis.strategies.integers` with ``min_value >= 0``, or
+    :func:`~hypothesis.strategies.floats` with no bounds and both ``NaN`` and
+    infinity allowed, the values for all of the elements are drawn at once
+    and decoded by numpy, which is much faster for large arrays.
+
     If fill is set to None then it will attempt to infer the correct behaviour
     automatically: If unique is True, no filling will occur by default.
     Otherwise, if it looks safe to reuse the values of elements across
@@ -313,6 +610,7 @@ def arrays(
     if isinstance(dtype, SearchStrategy):
         dtype = draw(dtype)
     dtype = np.dtype(dtype)
+    decoder = bulk_decoder_for(dtype, elements)
     if elements is None:
         elements = from_dtype(dtype)
     if isinstance(shape, SearchStrategy):
@@ -326,7 +624,8 @@ def arrays(
     fill = fill_for(
         elements=elements, unique=unique, fill=fill
     )
-    return draw(ArrayStrategy(elements, shape, dtype, fill, unique))
+    return draw(ArrayStrategy(
+        elements, shape, dtype, fill, unique, decoder=decoder))
 
 
 @st.defines_strategy
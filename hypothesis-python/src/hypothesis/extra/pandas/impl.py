@@ -112,16 +112,42 @@ def elements_and_dtype(elements, dtype, source=None):
     return elements, dtype
 
 
+# The kinds of dtype whose values we can draw straight into a numpy array,
+# rather than a list of Python objects, and then build an Index from.
+ARRAY_KINDS = (u'b', u'i', u'u', u'f', u'c', u'm', u'M')
+
+
 class ValueIndexStrategy(st.SearchStrategy):
-    def __init__(self, elements, dtype, min_size, max_size, unique):
+    def __init__(
+        self, elements, dtype, min_size, max_size, unique, decoder=None
+    ):
         super(ValueIndexStrategy, self).__init__()
         self.elements = elements
         self.dtype = dtype
         self.min_size = min_size
         self.max_size = max_size
         self.unique = unique
+        self.decoder = decoder
 
     def do_draw(self, data):
+        if self.dtype is None or self.dtype.kind not in ARRAY_KINDS:
+            return self.draw_values_one_at_a_time(data)
+
+        size = cu.integer_range(data, self.min_size, self.max_size)
+
+        def draw_values(data, n):
+            return npst.draw_array_elements(
+                data, self.elements, self.dtype, n, self.decoder)
+
+        if self.unique:
+            values = np.zeros(shape=size, dtype=self.dtype)
+            values = values[:npst.draw_distinct(
+                data, draw_values, values, min_size=self.min_size)]
+        else:
+            values = draw_values(data, size)
+        return pandas.Index(values, dtype=self.dtype, tupleize_cols=False)
+
+    def draw_values_one_at_a_time(self, data):
         result = []
         seen = set()
 
@@ -204,12 +230,16 @@ def indexes(
     check_valid_interval(min_size, max_size, 'min_size', 'max_size')
     check_type(bool, unique, 'unique')
 
+    explicit_elements = elements
     elements, dtype = elements_and_dtype(elements, dtype)
+    decoder = None
+    if dtype is not None:
+        decoder = npst.bulk_decoder_for(dtype, explicit_elements)
 
     if max_size is None:
         max_size = min_size + DEFAULT_MAX_SIZE
     return ValueIndexStrategy(
-        elements, dtype, min_size, max_size, unique)
+        elements, dtype, min_size, max_size, unique, decoder=decoder)
 
 
 @st.defines_strategy
@@ -259,6 +289,7 @@ def series(
     else:
         check_strategy(index)
 
+    explicit_elements = elements
     elements, dtype = elements_and_dtype(elements, dtype)
     index_strategy = index
 
@@ -268,8 +299,10 @@ def series(
 
         if len(index) > 0:
             if dtype is not None:
+                # If we infer the elements, arrays can decode them in bulk.
                 result_data = draw(npst.arrays(
-                    dtype=dtype, elements=elements, shape=len(index),
+                    dtype=dtype, shape=len(index),
+                    elements=None if explicit_elements is None else elements,
                     fill=fill, unique=unique,
                 ))
             else:
@@ -342,6 +375,44 @@ def columns(
     ]
 
 
+class BulkColumnsStrategy(st.SearchStrategy):
+    """Draws an array of values for each of some columns with no fill whose
+    values we can decode in bulk, with the data for each row next to each
+    other so that the shrinker can delete whole rows."""
+
+    def __init__(self, columns, decoders, size):
+        super(BulkColumnsStrategy, self).__init__()
+        self.columns = columns
+        self.decoders = decoders
+        self.size = size
+
+    def do_draw(self, data):
+        with np.errstate(over='ignore', invalid='ignore'):
+            result = [
+                values.astype(c.dtype) for c, values in zip(
+                    self.columns,
+                    npst.draw_interleaved(data, self.decoders, self.size))
+            ]
+        for c, decoder, values in zip(self.columns, self.decoders, result):
+            if not c.unique:
+                continue
+            # Values that duplicate an earlier one in the column are drawn
+            # again, all at once, after the rows.
+            keep = npst.distinct_new_values(values, values[:0])
+            if keep.all():
+                continue
+
+            def draw_values(data, n):
+                return npst.draw_array_elements(
+                    data, None, c.dtype, n, decoder)
+
+            replacements = np.zeros(shape=(~keep).sum(), dtype=c.dtype)
+            npst.draw_distinct(
+                data, draw_values, replacements, existing=values[keep])
+            values[~keep] = replacements
+        return result
+
+
 @st.defines_strategy
 def data_frames(
     columns=None,  # type: Sequence[column]
@@ -492,6 +563,7 @@ def data_frames(
 
     rewritten_columns = []
     column_names = set()  # type: Set[str]
+    decoders = {}
 
     for i, c in enumerate(cols):
         check_type(column, c, 'columns[%d]' % (i,))
@@ -516,9 +588,13 @@ def data_frames(
 
         column_names.add(c.name)
 
+        explicit_elements = c.elements
         c.elements, c.dtype = elements_and_dtype(
             c.elements, c.dtype, label
         )
+        if c.dtype is not None:
+            decoders[c.name] = npst.bulk_decoder_for(
+                c.dtype, explicit_elements)
 
         if c.dtype is None and rows is not None:
             raise InvalidArgument(
@@ -558,27 +634,42 @@ def data_frames(
                 c for c in rewritten_columns if c.fill.is_empty]
 
             if columns_without_fill:
-                for c in columns_without_fill:
-                    data[c.name] = pandas.Series(
-                        np.zeros(shape=len(index), dtype=c.dtype),
-                        index=index,
-                    )
-                seen = {
-                    c.name: set() for c in columns_without_fill if c.unique}
-
-                for i in hrange(len(index)):
-                    for c in columns_without_fill:
-                        if c.unique:
-                            for _ in range(5):
-                                value = draw(c.elements)
-                                if value not in seen[c.name]:
-                                    seen[c.name].add(value)
-                                    break
+                column_decoders = [
+                    decoders.get(c.name) for c in columns_without_fill]
+                if all(d is not None for d in column_decoders):
+                    buffers = draw(BulkColumnsStrategy(
+                        columns_without_fill, column_decoders, len(index)))
+                else:
+                    buffers = [
+                        np.zeros(
+                            shape=len(index), dtype=np.dtype(object)
+                            if c.dtype is None else c.dtype)
+                        for c in columns_without_fill
+                    ]
+                    seen = [set() for c in columns_without_fill]
+
+                    for i in hrange(len(index)):
+                        for c, buffer, s in zip(
+                            columns_without_fill, buffers, seen
+                        ):
+                            if c.unique:
+                                for _ in range(5):
+                                    value = draw(c.elements)
+                                    if value not in s:
+                                        s.add(value)
+                                        break
+                                else:
+                                    reject()
                             else:
-                                reject()
-                        else:
-                            value = draw(c.elements)
-                        data[c.name][i] = value
+                                value = draw(c.elements)
+                            buffer[i] = value
+
+                for c, values in zip(columns_without_fill, buffers):
+                    if c.dtype is None:
+                        # Let pandas infer the dtype, as series() does.
+                        values = list(values)
+                    data[c.name] = pandas.Series(
+                        values, index=index, dtype=c.dtype)
 
             for c in rewritten_columns:
                 if not c.fill.is_empty:
@@ -593,11 +684,13 @@ def data_frames(
         def assign_rows(draw):
             index = draw(index_strategy)
 
-            result = pandas.DataFrame(OrderedDict(
-                (c.name, pandas.Series(
-                    np.zeros(dtype=c.dtype, shape=len(index)), dtype=c.dtype))
+            # We write each row into a numpy array per column, and only hand
+            # them to pandas once they are complete, because assigning to a
+            # DataFrame one row at a time is very slow.
+            buffers = [
+                np.zeros(dtype=c.dtype, shape=len(index))
                 for c in rewritten_columns
-            ), index=index)
+            ]
 
             fills = {}
 
@@ -654,9 +747,13 @@ def data_frames(
                         ))
                     while len(row) < len(rewritten_columns):
                         row.append(draw(rewritten_columns[len(row)].fill))
-                    result.iloc[row_index] = row
+                    for buffer, value in zip(buffers, row):
+                        buffer[row_index] = value
                     break
                 else:
                     reject()
-            return result
+            return pandas.DataFrame(OrderedDict(
+                (c.name, pandas.Series(buffer, index=index, dtype=c.dtype))
+                for c, buffer in zip(rewritten_columns, buffers)
+            ), index=index)
         return assign_rows()
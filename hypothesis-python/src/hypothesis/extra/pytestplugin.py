@@ -17,18 +17,23 @@
 
 from __future__ import division, print_function, absolute_import
 
+import binascii
+
 import pytest
 
 import hypothesis.core as core
 from hypothesis.reporting import default as default_reporter
 from hypothesis.reporting import with_reporter
-from hypothesis.statistics import collector
+from hypothesis.statistics import collector, describe_caches
 from hypothesis.internal.compat import OrderedDict, text_type
+from hypothesis.utils.conventions import not_set
 from hypothesis.internal.detection import is_hypothesis_test
 
 LOAD_PROFILE_OPTION = '--hypothesis-profile'
 PRINT_STATISTICS_OPTION = '--hypothesis-show-statistics'
 SEED_OPTION = '--hypothesis-seed'
+DATABASE_SERVER_OPTION = '--hypothesis-database-server'
+DATABASE_SERVER_INPUT = 'hypothesis_database_server'
 
 
 class StoringReporter(object):
@@ -63,6 +68,54 @@ def pytest_addoption(parser):
         action='store',
         help='Set a seed to use for all Hypothesis tests'
     )
+    group.addoption(
+        DATABASE_SERVER_OPTION,
+        action='store_true',
+        help='Share the default example database between pytest-xdist '
+        'workers through a server in the main process',
+        default=False
+    )
+
+
+class DatabaseServerPlugin(object):
+    """Tells each pytest-xdist worker where to find the example database
+    server, and shuts it down at the end of the session."""
+
+    def __init__(self, server):
+        self.server = server
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_configure_node(self, node):
+        workerinput = getattr(node, 'workerinput', None)
+        if workerinput is None:  # pragma: no cover
+            # Versions of pytest-xdist before 1.22
+            workerinput = node.slaveinput
+        workerinput[DATABASE_SERVER_INPUT] = (
+            self.server.address, binascii.hexlify(self.server.authkey),
+        )
+
+    def pytest_unconfigure(self, config):
+        self.server.close()
+
+
+def configure_database_server(config):
+    from hypothesis import database
+    workerinput = getattr(
+        config, 'workerinput', getattr(config, 'slaveinput', None))
+    if workerinput is not None:
+        if DATABASE_SERVER_INPUT in workerinput:
+            address, authkey = workerinput[DATABASE_SERVER_INPUT]
+            database.set_default_database(database.RemoteExampleDatabase(
+                address, binascii.unhexlify(authkey)
+            ))
+    elif (
+        config.getoption(DATABASE_SERVER_OPTION) and
+        config.pluginmanager.hasplugin('xdist') and
+        getattr(config.option, 'dist', 'no') != 'no'
+    ):
+        server = database.ExampleDatabaseServer(
+            database.ExampleDatabase(not_set))
+        config.pluginmanager.register(DatabaseServerPlugin(server))
 
 
 def pytest_configure(config):
@@ -78,6 +131,7 @@ def pytest_configure(config):
         except ValueError:
             pass
         core.global_force_seed = seed
+    configure_database_server(config)
     config.addinivalue_line(
         'markers',
         'hypothesis: Tests which use hypothesis.')
@@ -147,6 +201,10 @@ def pytest_terminal_summary(terminalreporter):
                     '    * %s' % (event,)
                 )
         terminalreporter.write_line('')
+    terminalreporter.write_line('Caches:')
+    terminalreporter.write_line('')
+    for line in describe_caches():
+        terminalreporter.write_line('  - %s' % (line,))
 
 
 def pytest_collection_modifyitems(items):
@@ -17,8 +17,14 @@
 
 from __future__ import division, print_function, absolute_import
 
+import sys
+import weakref
+import threading
+
 import attr
 
+from hypothesis.internal.compat import hrange
+
 
 @attr.s(slots=True)
 class Entry(object):
@@ -219,3 +225,293 @@ class LRUReusedCache(GenericCache):
         score[0] = 2
         score[1] = self.tick()
         return score
+
+
+@attr.s(slots=True)
+class ClockEntry(object):
+    key = attr.ib()
+    value = attr.ib()
+    referenced = attr.ib(default=False)
+
+
+class ClockCache(object):
+    """A dict-like mapping with a maximum size, which may be safely used
+    from several threads at once.
+
+    When full, it evicts an entry that has not been read since the last
+    time it was considered for eviction, using the CLOCK approximation to
+    least recently used eviction: entries sit in a ring, and a hand sweeps
+    around it, clearing the referenced flag of each entry it passes and
+    evicting the first whose flag is already clear. New entries start with
+    the flag clear, so like LRUReusedCache this prefers to evict keys that
+    have only been used once.
+
+    Reading a key only sets its flag, so unlike GenericCache nothing needs
+    rebalancing and reads need no lock. Writes take a lock. The counts of
+    hits, misses and evictions are not kept under the lock, so may very
+    occasionally miss an update when two threads race on one.
+    """
+
+    __slots__ = (
+        'max_size', 'entries', 'ring', 'hand', 'lock',
+        'hits', 'misses', 'evictions',
+    )
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        # A mapping of key -> ClockEntry, and the same entries in the order
+        # the hand passes over them.
+        self.entries = {}
+        self.ring = []
+        self.hand = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, key):
+        try:
+            entry = self.entries[key]
+        except KeyError:
+            self.misses += 1
+            raise
+        entry.referenced = True
+        self.hits += 1
+        return entry.value
+
+    def __setitem__(self, key, value):
+        if self.max_size == 0:
+            return
+        with self.lock:
+            try:
+                entry = self.entries[key]
+            except KeyError:
+                pass
+            else:
+                entry.value = value
+                entry.referenced = True
+                return
+            entry = ClockEntry(key, value)
+            if len(self.ring) < self.max_size:
+                self.ring.append(entry)
+            else:
+                self.__sweep()
+                del self.entries[self.ring[self.hand].key]
+                self.ring[self.hand] = entry
+                self.hand = (self.hand + 1) % len(self.ring)
+                self.evictions += 1
+            self.entries[key] = entry
+
+    def __sweep(self):
+        """Move the hand to the next entry that should be evicted."""
+        ring = self.ring
+        # Readers may set flags behind the hand as fast as it clears them, so
+        # after one full turn we stop at whatever it is at.
+        for _ in hrange(len(ring)):
+            if not ring[self.hand].referenced:
+                break
+            ring[self.hand].referenced = False
+            self.hand = (self.hand + 1) % len(ring)
+
+    def resize(self, max_size):
+        """Change the maximum size of the cache, evicting entries as usual
+        if it now holds too many."""
+        with self.lock:
+            self.max_size = max_size
+            while len(self.ring) > max_size:
+                self.__sweep()
+                del self.entries[self.ring.pop(self.hand).key]
+                self.hand = self.hand % max(1, len(self.ring))
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            del self.ring[:]
+            self.hand = 0
+
+    def __repr__(self):
+        return '{%s}' % (', '.join(
+            '%r: %r' % (e.key, e.value) for e in list(self.ring)),)
+
+    def estimated_memory(self):
+        """Returns a rough estimate of the memory used by the cache in bytes,
+        counting the keys and values themselves but nothing they refer to."""
+        ring = list(self.ring)
+        total = sys.getsizeof(self.entries) + sys.getsizeof(ring)
+        for e in ring:
+            total += (
+                sys.getsizeof(e) + sys.getsizeof(e.key) +
+                sys.getsizeof(e.value)
+            )
+        return total
+
+    def check_valid(self):
+        """Debugging method for use in tests.
+
+        Asserts that all of the cache's invariants hold.
+        """
+        assert len(self.ring) == len(self.entries) <= self.max_size
+        for e in self.ring:
+            assert self.entries[e.key] is e
+        assert self.hand < max(1, len(self.ring))
+
+
+class InternTable(object):
+    """A mapping from keys to canonical objects built from them, for objects
+    that are compared by identity.
+
+    Looking up a key that is not present calls factory(key) and stores the
+    result. Dropping the object for a key while it is still in use would
+    give out a second, different, object for that key, so instead of having
+    a maximum size the table only holds weak references to the objects, and
+    an entry goes away once nothing else is using its object.
+    """
+
+    __slots__ = ('factory', 'table', 'hits', 'misses')
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.table = weakref.WeakValueDictionary()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def max_size(self):
+        return None
+
+    def __len__(self):
+        return len(self.table)
+
+    def __getitem__(self, key):
+        try:
+            result = self.table[key]
+        except KeyError:
+            self.misses += 1
+            # If another thread got here first we must use its object.
+            return self.table.setdefault(key, self.factory(key))
+        self.hits += 1
+        return result
+
+    def clear(self):
+        self.table.clear()
+
+    def estimated_memory(self):
+        """Returns a rough estimate of the memory used by the table in bytes,
+        counting the keys and objects themselves but nothing they refer
+        to."""
+        items = list(self.table.items())
+        total = sys.getsizeof(self.table.data)
+        for key, value in items:
+            total += sys.getsizeof(key) + sys.getsizeof(value)
+        return total
+
+
+class NestedDictView(object):
+    """A view for cache_statistics of a cache that is a plain nested dict,
+    depth levels deep, for caches that are looked up so often that going
+    through a cache object would slow things down.
+
+    Entries are only ever added to such a cache, each one on a miss, so the
+    number of misses is the number of entries. Hits are not counted.
+    """
+
+    __slots__ = ('table', 'depth')
+
+    max_size = None
+    hits = None
+
+    def __init__(self, table, depth):
+        self.table = table
+        self.depth = depth
+
+    def __levels(self):
+        """Returns a list of the dicts at each level of the table, the last
+        of which holds the entries themselves."""
+        levels = [[self.table]]
+        for _ in hrange(self.depth - 1):
+            levels.append([v for d in levels[-1] for v in list(d.values())])
+        return levels
+
+    def __len__(self):
+        return sum(len(d) for d in self.__levels()[-1])
+
+    @property
+    def misses(self):
+        return len(self)
+
+    def estimated_memory(self):
+        """Returns a rough estimate of the memory used by the table in bytes,
+        counting the dicts, keys and entries themselves but nothing they
+        refer to."""
+        levels = self.__levels()
+        total = 0
+        for level in levels:
+            for d in level:
+                total += sys.getsizeof(d)
+                for key in list(d):
+                    total += sys.getsizeof(key)
+        for d in levels[-1]:
+            for value in list(d.values()):
+                total += sys.getsizeof(value)
+        return total
+
+
+@attr.s(slots=True)
+class CacheStatistics(object):
+    name = attr.ib()
+    size = attr.ib()
+    max_size = attr.ib()
+    hits = attr.ib()
+    misses = attr.ib()
+    memory = attr.ib()
+
+    @property
+    def hit_rate(self):
+        if self.hits is None:
+            return None
+        lookups = self.hits + self.misses
+        if not lookups:
+            return None
+        return self.hits / lookups
+
+
+# All of the caches that Hypothesis keeps for the life of the process, by
+# name, so that we can keep an eye on how big they get.
+CACHES = {}
+
+
+def register_cache(name, cache):
+    """Add cache to the caches reported on by cache_statistics, under name,
+    and return it.
+
+    cache must be a ClockCache, an InternTable or a NestedDictView.
+    """
+    CACHES[name] = cache
+    return cache
+
+
+def set_cache_size(name, max_size):
+    """Change the maximum size of the registered cache called name."""
+    cache = CACHES[name]
+    if not isinstance(cache, ClockCache):
+        raise ValueError((
+            'The %s cache does not have a maximum size, so its size cannot '
+            'be set.') % (name,))
+    cache.resize(max_size)
+
+
+def cache_statistics():
+    """Returns a list of CacheStatistics for every registered cache, in
+    order of name."""
+    return [
+        CacheStatistics(
+            name=name, size=len(cache), max_size=cache.max_size,
+            hits=cache.hits, misses=cache.misses,
+            memory=cache.estimated_memory(),
+        )
+        for name, cache in sorted(CACHES.items())
+    ]
@@ -26,12 +26,12 @@ import unicodedata
 
 from hypothesis._settings import note_deprecation
 from hypothesis.configuration import tmpdir, storage_directory
+from hypothesis.internal.cache import ClockCache, register_cache
 from hypothesis.internal.compat import hunichr
 
 if False:
-    from typing import Dict, Tuple
+    from typing import Tuple
     intervals = Tuple[Tuple[int, int], ...]
-    cache_type = Dict[Tuple[Tuple[str, ...], int, int, intervals], intervals]
 
 
 def charmap_file():
@@ -261,9 +261,8 @@ def _intervals(s):
     return _union_intervals(intervals, intervals)
 
 
-category_index_cache = {
-    (): (),
-}
+category_index_cache = register_cache(
+    'category intervals', ClockCache(1024))
 
 
 def _category_key(exclude, include):
@@ -298,11 +297,12 @@ def _query_for_key(key):
     >>> _query_for_key(('Zl', 'Zp', 'Co'))
     ((8232, 8233), (57344, 63743), (983040, 1048573), (1048576, 1114109))
     """
+    if not key:
+        return ()
     try:
         return category_index_cache[key]
     except KeyError:
         pass
-    assert key
     if set(key) == set(categories()):
         result = ((0, sys.maxunicode),)
     else:
@@ -313,7 +313,8 @@ def _query_for_key(key):
     return result
 
 
-limited_category_index_cache = {}  # type: cache_type
+limited_category_index_cache = register_cache(
+    'limited category intervals', ClockCache(1024))
 
 
 def query(
@@ -0,0 +1,264 @@
+# coding=utf-8
+#
+# This file is part of Hypothesis, which may be found at
+# https://github.com/HypothesisWorks/hypothesis-python
+#
+# Most of this work is copyright (C) 2013-2018 David R. MacIver
+# (david@drmaciver.com), but it contains contributions by others. See
+# CONTRIBUTING.rst for a full list of people who may hold copyright, and
+# consult the git log if you need to determine who owns an individual
+# contribution.
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+#
+# END HEADER
+
+from __future__ import division, print_function, absolute_import
+
+import time
+import heapq
+import struct
+from hashlib import sha1
+
+import attr
+
+from hypothesis.internal.compat import hbytes, hrange
+
+# The keys of the corpora that the engine only keeps as a source of examples
+# that might be interesting to replay, so that it is always safe to delete
+# values from them. The primary corpus of failing examples is never touched.
+CORPUS_SUFFIXES = (b'.secondary', b'.coverage')
+
+USAGE_SUFFIX = b'.usage'
+USAGE_RECORD = struct.Struct('>dI')
+DIGEST_SIZE = 16
+
+# The most values that the engine keeps in any one corpus.
+MAX_CORPUS_SIZE = 500
+
+
+def usage_key(key):
+    return key + USAGE_SUFFIX
+
+
+def digest(value):
+    return sha1(value).digest()[:DIGEST_SIZE]
+
+
+@attr.s(slots=True)
+class Usage(object):
+    last_used = attr.ib()
+    hits = attr.ib(default=0)
+
+
+class CorpusPolicy(object):
+    """Decides which values in some corpora to evict when there are more
+    than max_size of them, by keeping the max_size values with the highest
+    score. Subclasses define score, which should be lowest for the values
+    least worth keeping.
+    """
+
+    __slots__ = ('max_size',)
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+
+    def evict(self, entries):
+        """Takes a list of (key, value, Usage) triples, and returns the
+        (key, value) pairs of those that are not kept."""
+        if len(entries) <= self.max_size:
+            return []
+        kept = set(heapq.nlargest(
+            max(self.max_size, 0), hrange(len(entries)),
+            key=lambda i: self.score(entries[i][1], entries[i][2])
+        ))
+        return [
+            (key, value) for i, (key, value, _) in enumerate(entries)
+            if i not in kept
+        ]
+
+    def score(self, value, usage):
+        raise NotImplementedError()
+
+
+class LeastRecentlyUsed(CorpusPolicy):
+    """Evicts the value that has gone longest without being used, breaking
+    ties in favour of keeping those that have been used more often and then
+    the smallest."""
+
+    __slots__ = ()
+
+    def score(self, value, usage):
+        return (usage.last_used, usage.hits, -len(value))
+
+
+class LeastFrequentlyUsed(CorpusPolicy):
+    """Evicts the value that has been used the fewest times, breaking ties in
+    favour of keeping the most recently used and then the smallest."""
+
+    __slots__ = ()
+
+    def score(self, value, usage):
+        return (usage.hits, usage.last_used, -len(value))
+
+
+POLICIES = {
+    'lru': LeastRecentlyUsed,
+    'lfu': LeastFrequentlyUsed,
+}
+
+
+class CorpusManager(object):
+    """Keeps track of when each value in the corpora of an example database
+    was last used and how often, and deletes the values least worth keeping
+    from corpora that are over budget.
+
+    The usage of the values under key is stored in the database itself,
+    under usage_key(key), as one record per value of a digest of the value
+    followed by its Usage. A value that has no record is treated as having
+    just been used, so that new values are not immediately evicted.
+    """
+
+    def __init__(
+        self, db, policy=LeastRecentlyUsed, max_corpus_size=MAX_CORPUS_SIZE,
+        max_size=None, now=None,
+    ):
+        self.db = db
+        self.policy = policy
+        self.max_corpus_size = max_corpus_size
+        self.max_size = max_size
+        self.now = time.time() if now is None else now
+        # A mapping of key -> digest -> [stored record or None, Usage]
+        self.usage = {}
+        self.changed = set()
+
+    def __records(self, key):
+        try:
+            return self.usage[key]
+        except KeyError:
+            pass
+        records = {}
+        bad = []
+        for record in self.db.fetch(usage_key(key)):
+            if len(record) == DIGEST_SIZE + USAGE_RECORD.size:
+                usage = Usage(*USAGE_RECORD.unpack_from(record, DIGEST_SIZE))
+                records[record[:DIGEST_SIZE]] = [record, usage]
+            else:
+                bad.append(record)
+        self.db.delete_many(usage_key(key), bad)
+        self.usage[key] = records
+        return records
+
+    def usage_of(self, key, value):
+        records = self.__records(key)
+        d = digest(value)
+        try:
+            return records[d][1]
+        except KeyError:
+            records[d] = [None, Usage(self.now)]
+            self.changed.add((key, d))
+            return records[d][1]
+
+    def record_use(self, key, values):
+        """Note that each of values under key has just been used."""
+        for value in values:
+            usage = self.usage_of(key, value)
+            usage.last_used = self.now
+            usage.hits += 1
+            self.changed.add((key, digest(value)))
+
+    def __evict(self, entries, max_size):
+        return self.policy(max_size).evict(entries)
+
+    def collect(self, keys):
+        """Bring each corpus in keys within max_corpus_size values, and all
+        of them together within max_size values if that is set, deleting the
+        values that the policy evicts. Returns the number of values deleted.
+
+        Only corpora that are over budget are read, and the usage records of
+        any of their values that are no longer present are deleted too.
+        """
+        sizes = dict(
+            (key, len(values))
+            for key, values in self.db.fetch_many(keys, lazy=True).items()
+        )
+        if self.max_size is not None and sum(sizes.values()) > self.max_size:
+            keys = sorted(sizes)
+        else:
+            keys = sorted(
+                k for k, n in sizes.items() if n > self.max_corpus_size)
+        if not keys:
+            return 0
+        corpora = self.db.fetch_many(keys)
+        entries = []
+        evicted = []
+        for key in keys:
+            corpus = [
+                (key, value, self.usage_of(key, value))
+                for value in corpora[key]
+            ]
+            evicted.extend(self.__evict(corpus, self.max_corpus_size))
+            entries.extend(corpus)
+        if self.max_size is not None:
+            dead = set(evicted)
+            evicted.extend(self.__evict(
+                [e for e in entries if (e[0], e[1]) not in dead],
+                self.max_size
+            ))
+        doomed = {}
+        for key, value in evicted:
+            doomed.setdefault(key, []).append(value)
+        with self.db.batch():
+            for key in keys:
+                deleted = doomed.get(key, ())
+                if deleted:
+                    self.db.delete_many(key, deleted)
+                live = set(digest(v) for v in corpora[key])
+                live.difference_update(digest(v) for v in deleted)
+                records = self.__records(key)
+                stale = [d for d in records if d not in live]
+                self.db.delete_many(usage_key(key), [
+                    records[d][0] for d in stale
+                    if records[d][0] is not None
+                ])
+                for d in stale:
+                    del records[d]
+                    self.changed.discard((key, d))
+            self.save()
+        return len(evicted)
+
+    def save(self):
+        """Write the usage records that have changed to the database."""
+        with self.db.batch():
+            for key, d in sorted(self.changed):
+                record = self.usage[key][d]
+                if record[0] is not None:
+                    self.db.delete(usage_key(key), record[0])
+                usage = record[1]
+                record[0] = hbytes(d + USAGE_RECORD.pack(
+                    usage.last_used, usage.hits))
+                self.db.save(usage_key(key), record[0])
+        self.changed.clear()
+
+
+def collect_garbage(db, **kwargs):
+    """Delete the values least worth keeping from every corpus in db that
+    is over budget, and the usage records of values and corpora that are
+    no longer present. The keyword arguments are passed to CorpusManager.
+    Returns the number of values deleted.
+
+    This needs db to be able to list its keys.
+    """
+    keys = set(db.keys())
+    corpora = sorted(k for k in keys if k.endswith(CORPUS_SUFFIXES))
+    manager = CorpusManager(db, **kwargs)
+    deleted = manager.collect(corpora)
+    with db.batch():
+        for key in keys:
+            if key.endswith(USAGE_SUFFIX) and (
+                key[:-len(USAGE_SUFFIX)] not in keys
+            ):
+                db.delete_many(key, list(db.fetch(key)))
+    return deleted
@@ -19,10 +19,12 @@ from __future__ import division, print_function, absolute_import
 
 import sys
 from enum import IntEnum
+from array import array
 
 import attr
 
 from hypothesis.errors import Frozen, StopTest, InvalidArgument
+from hypothesis.internal.cache import InternTable, register_cache
 from hypothesis.internal.compat import hbytes, hrange, text_type, \
     bit_length, benchmark_time, int_from_bytes, unicode_safe_repr
 from hypothesis.internal.coverage import IN_COVERAGE_TESTS
@@ -31,6 +33,7 @@ from hypothesis.internal.conjecture.utils import calc_label_from_name
 
 TOP_LABEL = calc_label_from_name('top')
 DRAW_BYTES_LABEL = calc_label_from_name('draw_bytes() in ConjectureData')
+DRAW_BLOCKS_LABEL = calc_label_from_name('draw_blocks() in ConjectureData')
 
 
 class Status(IntEnum):
@@ -53,21 +56,100 @@ class Example(object):
         return self.end - self.start
 
 
-@attr.s(hash=False, cmp=False, slots=True)
+@attr.s(hash=False, cmp=False)
 class StructuralTag(object):
     label = attr.ib()
 
+    def __reduce__(self):
+        # Tags are compared by identity, so unpickling one (e.g. when it comes
+        # back from a worker process) must give us the interned instance.
+        return (structural_tag, (self.label,))
 
-STRUCTURAL_TAGS = {}  # type: dict
+
+STRUCTURAL_TAGS = register_cache(
+    'structural tags', InternTable(StructuralTag))
 
 
 def structural_tag(label):
-    try:
-        return STRUCTURAL_TAGS[label]
-    except KeyError:
-        result = StructuralTag(label)
-        STRUCTURAL_TAGS[label] = result
-        return result
+    return STRUCTURAL_TAGS[label]
+
+
+class Examples(object):
+    """A read-only sequence of Example objects, stored as parallel columns
+    of integers and built on demand when an element is accessed.
+
+    This takes up a small fraction of the memory of a list of Example
+    objects, which matters because we keep one of these for every result we
+    have stored in the tree of previously run examples."""
+
+    __slots__ = ('starts', 'ends', 'depths', 'label_indices', 'discarded',
+                 'labels')
+
+    def __init__(self, examples):
+        self.starts = array('i')
+        self.ends = array('i')
+        self.depths = array('i')
+        self.label_indices = array('i')
+        self.discarded = bytearray()
+        label_indices = {}
+        for ex in examples:
+            self.starts.append(ex.start)
+            self.ends.append(ex.end)
+            self.depths.append(ex.depth)
+            self.label_indices.append(
+                label_indices.setdefault(ex.label, len(label_indices)))
+            self.discarded.append(bool(ex.discarded))
+        self.labels = [None] * len(label_indices)
+        for label, i in label_indices.items():
+            self.labels[i] = label
+        self.labels = tuple(self.labels)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, i):
+        return Example(
+            depth=self.depths[i],
+            label=self.labels[self.label_indices[i]],
+            start=self.starts[i],
+            end=self.ends[i],
+            discarded=bool(self.discarded[i]),
+        )
+
+
+class Blocks(object):
+    """A read-only sequence of (start, end) pairs for the blocks of a
+    buffer. Blocks always cover the buffer contiguously, so we only need to
+    store where each one ends."""
+
+    __slots__ = ('ends',)
+
+    def __init__(self, blocks):
+        self.ends = array('i', [v for _, v in blocks])
+
+    def __len__(self):
+        return len(self.ends)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self.ends)
+        end = self.ends[i]
+        return (self.ends[i - 1] if i > 0 else 0, end)
+
+
+@attr.s(slots=True, hash=False, cmp=False)
+class ConjectureResult(object):
+    """A compact, immutable record of the result of running a test on a
+    ConjectureData object, with everything that is only needed while it
+    is running stripped away. See ConjectureData.as_result."""
+
+    status = attr.ib()
+    interesting_origin = attr.ib()
+    buffer = attr.ib()
+    blocks = attr.ib()
+    examples = attr.ib()
+    tags = attr.ib()
+    has_discards = attr.ib()
 
 
 global_test_counter = 0
@@ -78,19 +160,43 @@ MAX_DEPTH = 100
 
 class ConjectureData(object):
 
+    __slots__ = (
+        'max_length', 'is_find', '_draw_bytes', '__source', 'overdraw',
+        'level', 'block_starts', 'blocks', 'buffer', 'output', 'status',
+        'frozen', 'testcounter', 'start_time', 'finish_time', 'events',
+        'forced_indices', 'capped_indices', 'interesting_origin', 'tags',
+        'draw_times', 'examples', 'example_stack', 'has_discards',
+        '__result',
+
+        # These are set from outside this module, by the strategies and test
+        # runners that use this object to store their own per-example state.
+        # Code outside Hypothesis may do the same, so anything not listed
+        # here still goes in __dict__.
+        'can_reproduce_example_from_repr', 'hypothesis_runner',
+        'hypothesis_shared_data_strategy', '_hypothesis_shared_strategies',
+        'hit_zero_bound', 'expected_exception', 'expected_traceback',
+        '__dict__',
+    )
+
     @classmethod
     def for_buffer(self, buffer):
         buffer = hbytes(buffer)
-        return ConjectureData(
+        result = ConjectureData(
             max_length=len(buffer),
             draw_bytes=lambda data, n:
             hbytes(buffer[data.index:data.index + n])
         )
+        result.__source = buffer
+        return result
 
     def __init__(self, max_length, draw_bytes):
         self.max_length = max_length
         self.is_find = False
         self._draw_bytes = draw_bytes
+        # When we are reading from a fixed buffer, this is that buffer. Draws
+        # then take slices of it directly rather than going through a call to
+        # _draw_bytes.
+        self.__source = None
         self.overdraw = 0
         self.level = 0
         self.block_starts = {}
@@ -109,7 +215,7 @@ class ConjectureData(object):
         self.interesting_origin = None
         self.tags = set()
         self.draw_times = []
-        self.__intervals = None
+        self.__result = None
 
         self.examples = []
         self.example_stack = []
@@ -246,6 +352,24 @@ class ConjectureData(object):
         self.buffer = hbytes(self.buffer)
         self.events = frozenset(self.events)
         del self._draw_bytes
+        self.__source = None
+
+    def as_result(self):
+        """Convert the result of running this test into a ConjectureResult,
+        which uses much less memory. This must only be called once the data
+        is frozen, and always returns the same object."""
+        assert self.frozen
+        if self.__result is None:
+            self.__result = ConjectureResult(
+                status=self.status,
+                interesting_origin=self.interesting_origin,
+                buffer=self.buffer,
+                blocks=Blocks(self.blocks),
+                examples=Examples(self.examples),
+                tags=self.tags,
+                has_discards=self.has_discards,
+            )
+        return self.__result
 
     def draw_bits(self, n):
         self.__assert_not_frozen('draw_bits')
@@ -256,7 +380,10 @@ class ConjectureData(object):
         else:
             n_bytes = (n // 8) + 1
             self.__check_capacity(n_bytes)
-            buf = bytearray(self._draw_bytes(self, n_bytes))
+            if self.__source is None:
+                buf = bytearray(self._draw_bytes(self, n_bytes))
+            else:
+                buf = bytearray(self.__source[self.index:self.index + n_bytes])
             assert len(buf) == n_bytes
             mask = (1 << (n % 8)) - 1
             buf[0] &= mask
@@ -298,12 +425,49 @@ class ConjectureData(object):
             return hbytes(b'')
         self.__check_capacity(n)
         self.start_example(DRAW_BYTES_LABEL)
-        result = self._draw_bytes(self, n)
+        if self.__source is None:
+            result = self._draw_bytes(self, n)
+        else:
+            result = self.__source[self.index:self.index + n]
         assert len(result) == n
         self.__write(result)
         self.stop_example()
         return hbytes(result)
 
+    def draw_blocks(self, sizes, count):
+        """Draw the bytes for count runs of blocks with the given sizes, and
+        return them all concatenated.
+
+        This gives the same blocks and examples as calling draw_bytes for
+        each size in turn, count times over, with each run of more than one
+        block in an example of its own, so that shrinking can delete whole
+        runs. It is faster than that for large collections of values of a
+        fixed layout because it asks for all of the bytes at once.
+        """
+        self.__assert_not_frozen('draw_blocks')
+        sizes = [n for n in sizes if n > 0]
+        total = sum(sizes) * count
+        if total == 0:
+            return hbytes(b'')
+        self.__check_capacity(total)
+        if self.__source is None:
+            result = self._draw_bytes(self, total)
+        else:
+            result = self.__source[self.index:self.index + total]
+        assert len(result) == total
+        i = 0
+        for _ in hrange(count):
+            if len(sizes) > 1:
+                self.start_example(DRAW_BLOCKS_LABEL)
+            for n in sizes:
+                self.start_example(DRAW_BYTES_LABEL)
+                self.__write(result[i:i + n])
+                self.stop_example()
+                i += n
+            if len(sizes) > 1:
+                self.stop_example()
+        return hbytes(result)
+
     def mark_interesting(self, interesting_origin=None):
         self.__assert_not_frozen('mark_interesting')
         self.interesting_origin = interesting_origin
@@ -0,0 +1,753 @@
+# coding=utf-8
+#
+# This file is part of Hypothesis, which may be found at
+# https://github.com/HypothesisWorks/hypothesis-python
+#
+# Most of this work is copyright (C) 2013-2018 David R. MacIver
+# (david@drmaciver.com), but it contains contributions by others. See
+# CONTRIBUTING.rst for a full list of people who may hold copyright, and
+# consult the git log if you need to determine who owns an individual
+# contribution.
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+#
+# END HEADER
+
+from __future__ import division, print_function, absolute_import
+
+from array import array
+from collections import deque
+
+from hypothesis.internal.compat import hbytes, hrange, int_to_bytes, \
+    int_from_bytes
+from hypothesis.internal.conjecture.data import Status
+
+# Marker for "no byte" in the signed per-node byte arrays below.
+NO_BYTE = -1
+
+# A rough estimate of the memory used by a ConjectureResult and the dict
+# entry pointing to it, not counting its buffer, examples and blocks, and
+# of the memory used by each example and block. See result_size.
+RESULT_OVERHEAD = 400
+EXAMPLE_SIZE = 17
+BLOCK_SIZE = 4
+
+
+# The kinds of node in the output of DataTree.dump.
+DEAD_NODE = 0
+LIVE_NODE = 1
+FORCED_NODE = 2
+
+
+def result_size(result):
+    """Returns an estimate of the number of bytes of memory that result is
+    responsible for."""
+    return (
+        RESULT_OVERHEAD + len(result.buffer) +
+        EXAMPLE_SIZE * len(result.examples) + BLOCK_SIZE * len(result.blocks)
+    )
+
+
+class DataTree(object):
+    """A trie of every buffer that has been run so far, recording enough
+    about each prefix to tell which parts of the search space are still
+    worth exploring.
+
+    Nodes are identified by integer indices, with the root at 0. Rather than
+    a dict (or other object) per node, everything we know about a node is
+    stored in a set of flat arrays indexed by node. The vast majority of
+    nodes only ever have a single child (every novel suffix of a buffer
+    becomes a chain of them), so that child is stored inline in the arrays
+    and only nodes that branch pay for a dict of their other children. This
+    keeps the tree to a small constant number of bytes per node, where a
+    dict per node costs hundreds.
+
+    Chains of such nodes are also what lookups spend most of their time
+    walking, so for each node we record the length of the run of single
+    child nodes starting from it. As these are numbered consecutively when
+    they are created, the bytes along a run are a contiguous slice of the
+    array of first bytes, and a lookup can compare the whole run against the
+    buffer at once rather than stepping through it a node at a time.
+
+    A node is dead if there is nothing left to explore past that point.
+    Recursively, a node is dead if either it is a leaf or every byte leads to
+    a dead node when starting from here. Rather than checking every child
+    of a node whenever one of them dies, we keep a count of how many of each
+    node's valid children are dead. A node has one valid child if it is
+    forced and capped + 1 otherwise, so it is dead exactly when that many of
+    its children are, and we can propagate exhaustion up the tree with a
+    single integer comparison per level. Which children are valid changes
+    if a later run forces or caps the node differently, so we count them
+    again whenever that happens.
+
+    We also track, for each node, the unique byte that is valid there if it
+    was written with data.write() (forced), the maximum byte that is valid
+    there (capped, currently only produced by draw_bits), and the size of
+    any block that starts there. The latter provides a lower bound on how
+    many more bytes are required, which allows us to rule out buffers that
+    are too short even when they go off the explored region of the tree.
+
+    If leaf_budget is not None, once the results stored at leaves take up
+    more than about that many bytes the oldest are thrown away, keeping only
+    their status. Interesting results are always kept, and the structure of
+    the tree is unaffected, so this only means we sometimes can't say what
+    the result of a buffer was, never that we lose track of it being dead.
+    """
+
+    def __init__(self, leaf_budget=None):
+        self.__forced = array('h')
+        self.__capped = array('h')
+        self.__block_sizes = array('i')
+        self.__dead = bytearray()
+        self.__dead_children = array('h')
+
+        # The first child added to each node, as a byte and a node index.
+        # The root is never anyone's child, so a first child of 0 means that
+        # the node has no children. Any further children live in __branches.
+        self.__first_byte = bytearray()
+        self.__first_child = array('i')
+        self.__branches = {}
+
+        # The number of steps that can be taken from each node without
+        # looking anything up: i.e. following first children where each
+        # node is one more than its parent, has no other children, is not
+        # forced, and is not dead.
+        self.__runs = array('i')
+
+        # Maps leaf nodes to the result that was seen from following the
+        # path to them, or just its Status if that result has been evicted.
+        self.__leaves = {}
+
+        # The total result_size of the results in __leaves that may be
+        # evicted, and the nodes they are at, oldest first.
+        self.__leaf_budget = leaf_budget
+        self.__leaf_usage = 0
+        self.__evictable = deque()
+
+        # The most recent result of __follow, and the buffer it was for.
+        # Incremented whenever we add anything, so that we know when cached
+        # results from __follow might be extended further.
+        self.__version = 0
+        self.__followed_buffer = None
+        self.__followed_nodes = None
+        self.__followed_reach = None
+        self.__followed_version = None
+
+        self.__new_node()
+
+    def __len__(self):
+        return len(self.__dead)
+
+    def __new_node(self):
+        result = len(self.__dead)
+        self.__forced.append(NO_BYTE)
+        self.__capped.append(255)
+        self.__block_sizes.append(0)
+        self.__dead.append(0)
+        self.__dead_children.append(0)
+        self.__first_byte.append(0)
+        self.__first_child.append(0)
+        self.__runs.append(0)
+        return result
+
+    @property
+    def exhausted(self):
+        """True if there is nothing left to explore anywhere in the tree."""
+        return self.__dead[0] != 0
+
+    def is_dead(self, node):
+        return self.__dead[node] != 0
+
+    def child(self, node, b):
+        """Returns the node reached by following byte b from node, or None if
+        we have never done so."""
+        result = self.__first_child[node]
+        if result and self.__first_byte[node] == b:
+            return result
+        branches = self.__branches.get(node)
+        if branches is None:
+            return None
+        return branches.get(b)
+
+    def children(self, node):
+        """Returns a list of (byte, node) pairs for every child of node that
+        we have seen."""
+        child = self.__first_child[node]
+        if not child:
+            return []
+        result = [(self.__first_byte[node], child)]
+        result.extend(self.__branches.get(node, {}).items())
+        return result
+
+    def leaf(self, node):
+        """Returns the result stored at node if it is a leaf, or None
+        otherwise. This is the ConjectureData itself for interesting examples,
+        and its ConjectureResult for everything else. It is also None if the
+        result has been evicted to stay within leaf_budget."""
+        result = self.__leaves.get(node)
+        if isinstance(result, Status):
+            return None
+        return result
+
+    def status(self, node):
+        """Returns the Status of the result at node if it is a leaf, or None
+        otherwise. Unlike leaf this is still available after eviction."""
+        result = self.__leaves.get(node)
+        if result is None or isinstance(result, Status):
+            return result
+        return result.status
+
+    def forced(self, node):
+        """Returns the only valid byte at node, or None if any is allowed."""
+        c = self.__forced[node]
+        if c == NO_BYTE:
+            return None
+        return c
+
+    def capped(self, node):
+        """Returns the largest byte that is valid at node."""
+        return self.__capped[node]
+
+    def __valid_children(self, node):
+        """Returns the number of bytes that are valid at node."""
+        if self.__forced[node] != NO_BYTE:
+            return 1
+        return self.__capped[node] + 1
+
+    def __count_dead_children(self, node):
+        """Returns the number of children of node that are dead and reached
+        by a byte that is valid there."""
+        c = self.__forced[node]
+        dead = self.__dead
+        if c != NO_BYTE:
+            child = self.child(node, c)
+            return int(child is not None and dead[child] != 0)
+        cap = self.__capped[node]
+        return sum(
+            1 for b, child in self.children(node) if b <= cap and dead[child])
+
+    def __add_chain(self, data, i, indices):
+        """Add the rest of data.buffer from index i onwards as a new chain of
+        nodes hanging off the last node in indices, which does not yet have a
+        child for data.buffer[i]. Extends indices with the new nodes and
+        returns the final one."""
+        buffer = data.buffer
+        parent = indices[-1]
+        start = len(self)
+        # One node for every remaining byte and one for where they end up.
+        n = len(buffer) - i
+        end = start + n
+
+        if not self.__first_child[parent]:
+            self.__first_byte[parent] = buffer[i]
+            self.__first_child[parent] = start
+        else:
+            self.__branches.setdefault(parent, {})[buffer[i]] = start
+
+        self.__forced.extend(array('h', [NO_BYTE]) * n)
+        self.__capped.extend(array('h', [255]) * n)
+        self.__block_sizes.extend(array('i', [0]) * n)
+        self.__dead.extend(bytearray(n))
+        self.__dead_children.extend(array('h', [0]) * n)
+        self.__first_byte.extend(buffer[i + 1:])
+        self.__first_byte.append(0)
+        self.__first_child.extend(hrange(start + 1, end))
+        self.__first_child.append(0)
+        self.__runs.extend(array('i', [0]) * n)
+
+        # Node start + k is reached by buffer[i + k], so corresponds to index
+        # i + k + 1 in the buffer.
+        offset = start - i - 1
+        for j in data.forced_indices:
+            if j > i:
+                self.__forced[offset + j] = buffer[j]
+        for j, c in data.capped_indices.items():
+            if j > i:
+                self.__capped[offset + j] = c
+
+        indices.extend(hrange(start, end - 1))
+        return end - 1
+
+    def add(self, data, cap):
+        """Record the result of running data, which must be frozen. Any node
+        at a depth of cap or more is immediately marked as dead, as we do not
+        want to explore further past that point."""
+        self.__version += 1
+        forced = self.__forced
+        capped = self.__capped
+        dead = self.__dead
+        first_byte = self.__first_byte
+        first_child = self.__first_child
+        branches = self.__branches
+
+        # The earliest point on the path at which we have changed anything
+        # that the run lengths depend on.
+        changed = len(data.buffer)
+        # The earliest point on the path at which we have changed anything
+        # about an existing node other than adding children to it.
+        modified = len(data.buffer)
+        # The points on the path at which we have changed which bytes are
+        # valid, so whose dead children need to be counted again.
+        recount = []
+
+        indices = []
+        node_index = 0
+        for i, b in enumerate(data.buffer):
+            indices.append(node_index)
+            if i in data.forced_indices and forced[node_index] != b:
+                forced[node_index] = b
+                changed = min(changed, i)
+                modified = min(modified, i)
+                recount.append(i)
+            try:
+                c = data.capped_indices[i]
+            except KeyError:
+                pass
+            else:
+                if capped[node_index] != c:
+                    capped[node_index] = c
+                    modified = min(modified, i)
+                    if not recount or recount[-1] != i:
+                        recount.append(i)
+            child = first_child[node_index]
+            if child and first_byte[node_index] == b:
+                node_index = child
+            else:
+                try:
+                    node_index = branches[node_index][b]
+                except KeyError:
+                    changed = min(changed, i)
+                    node_index = self.__add_chain(data, i, indices)
+                    break
+            if dead[node_index]:
+                break
+
+        for u, v in data.blocks:
+            # This can happen if we hit a dead node when walking the buffer.
+            # In that case we already have this section of the tree mapped.
+            if u >= len(indices):
+                break
+            if self.__block_sizes[indices[u]] != v - u:
+                self.__block_sizes[indices[u]] = v - u
+                modified = min(modified, u)
+
+        path = indices + [node_index]
+
+        for i in recount:
+            j = path[i]
+            self.__dead_children[j] = self.__count_dead_children(j)
+            if (
+                not dead[j] and
+                self.__dead_children[j] >= self.__valid_children(j)
+            ):
+                changed = min(changed, self.__kill(path, data.buffer, i))
+
+        for i in hrange(len(indices) - 1, cap - 1, -1):
+            changed = min(changed, self.__kill(path, data.buffer, i))
+
+        if data.status != Status.OVERRUN and not dead[node_index]:
+            if data.status < Status.INTERESTING:
+                # Everything that only matters while the test is running can
+                # be thrown away. Interesting examples are kept whole because
+                # the shrinker needs all of their details.
+                self.__leaves[node_index] = data.as_result()
+                if self.__leaf_budget is not None:
+                    self.__leaf_usage += result_size(data.as_result())
+                    self.__evictable.append(node_index)
+                    self.__evict()
+            else:
+                self.__leaves[node_index] = data
+            changed = min(
+                changed, self.__kill(path, data.buffer, len(indices)))
+
+        modified = min(modified, changed)
+        nodes = self.__followed_nodes
+        if (
+            nodes is not None and
+            modified < min(len(nodes), len(path)) and
+            nodes[modified] == path[modified]
+        ):
+            # We've changed something on the path that __follow last
+            # computed, so it's only valid up to that point.
+            del nodes[modified + 1:]
+            del self.__followed_reach[modified + 1:]
+
+        # Everything we have changed is on this path, and a node's run only
+        # depends on the nodes below it, so once we are above the changes
+        # we can stop as soon as a run comes out the same as before.
+        runs = self.__runs
+        for i in hrange(len(indices) - 1, -1, -1):
+            j = indices[i]
+            c = path[i + 1]
+            if (
+                c == j + 1 and first_child[j] == c and
+                forced[j] == NO_BYTE and not dead[c] and
+                j not in branches
+            ):
+                run = runs[c] + 1
+            else:
+                run = 0
+            if i < changed and runs[j] == run:
+                break
+            runs[j] = run
+
+    def __evict(self):
+        """Replace the oldest evictable results with their status until we
+        are back within our budget."""
+        while self.__leaf_usage > self.__leaf_budget:
+            node = self.__evictable.popleft()
+            result = self.__leaves[node]
+            self.__leaf_usage -= result_size(result)
+            self.__leaves[node] = result.status
+
+    def __kill(self, path, buffer, i):
+        """Mark path[i] as dead, along with any of its ancestors on path that
+        this leaves with no live children, where path is the nodes reached by
+        following buffer. Returns the index of the shallowest node on path
+        whose run might have changed as a result."""
+        dead = self.__dead
+        dead_children = self.__dead_children
+        forced = self.__forced
+        capped = self.__capped
+        while not dead[path[i]]:
+            dead[path[i]] = 1
+            if i == 0:
+                break
+            i -= 1
+            parent = path[i]
+            c = forced[parent]
+            if c != NO_BYTE:
+                if buffer[i] != c:
+                    break
+                possible_children = 1
+            else:
+                if buffer[i] > capped[parent]:
+                    break
+                possible_children = capped[parent] + 1
+            dead_children[parent] += 1
+            if dead_children[parent] < possible_children:
+                break
+        return i
+
+    def dump(self, max_nodes):
+        """Returns a compact serialization of which parts of the tree are
+        dead, which load can restore into an empty tree, or None if that
+        would take more than max_nodes nodes.
+
+        We only include nodes that lead to a dead node, along with what we
+        know about which bytes are valid at each of them so that exhaustion
+        propagates after loading exactly as it would have here. Results,
+        block sizes and everything below a dead node are left out.
+
+        Nodes are written out in pre-order. Each is a byte saying whether it
+        is dead, forced or neither. Live nodes follow this with their forced
+        or capped byte and a two byte count of their children, and each child
+        is preceded by the byte that leads to it.
+        """
+        dead = self.__dead
+        forced = self.__forced
+        capped = self.__capped
+
+        # A node is worth including if it is dead or has a child that is.
+        # Children are always created after their parents, so a single pass
+        # over the nodes in reverse order is enough to work this out.
+        useful = bytearray(dead)
+        for node in hrange(len(self) - 1, -1, -1):
+            if not useful[node]:
+                for _, child in self.children(node):
+                    if useful[child]:
+                        useful[node] = 1
+                        break
+
+        out = bytearray()
+        count = 0
+        stack = [(None, 0)]
+        while stack:
+            b, node = stack.pop()
+            count += 1
+            if count > max_nodes:
+                return None
+            if b is not None:
+                out.append(b)
+            if dead[node]:
+                out.append(DEAD_NODE)
+                continue
+            c = forced[node]
+            if c != NO_BYTE:
+                out.append(FORCED_NODE)
+                out.append(c)
+            else:
+                out.append(LIVE_NODE)
+                out.append(capped[node])
+            children = sorted(
+                (b, child) for b, child in self.children(node)
+                if useful[child]
+            )
+            out.extend(int_to_bytes(len(children), 2))
+            stack.extend(reversed(children))
+        return hbytes(out)
+
+    def load(self, serialized):
+        """Restore the nodes in serialized, which must have come from dump,
+        into this tree, which must be empty. Raises ValueError if serialized
+        is not valid. In that case the tree is left in an inconsistent state,
+        so should be thrown away."""
+        assert len(self) == 1
+        serialized = bytearray(serialized)
+        forced = self.__forced
+        capped = self.__capped
+        dead = self.__dead
+        first_byte = self.__first_byte
+        first_child = self.__first_child
+        branches = self.__branches
+
+        try:
+            i = 0
+            node = 0
+            # Nodes that we are reading the children of, and how many of
+            # their children are still to come.
+            pending = []
+            while True:
+                kind = serialized[i]
+                i += 1
+                if kind == DEAD_NODE:
+                    dead[node] = 1
+                else:
+                    if kind == FORCED_NODE:
+                        forced[node] = serialized[i]
+                    elif kind == LIVE_NODE:
+                        capped[node] = serialized[i]
+                    else:
+                        raise ValueError('Invalid node kind %d' % (kind,))
+                    count = int_from_bytes(serialized[i + 1:i + 3])
+                    i += 3
+                    if count > 0:
+                        pending.append([node, count])
+                while pending and pending[-1][1] == 0:
+                    pending.pop()
+                if not pending:
+                    break
+                parent = pending[-1][0]
+                pending[-1][1] -= 1
+                b = serialized[i]
+                i += 1
+                node = self.__new_node()
+                if not first_child[parent]:
+                    first_byte[parent] = b
+                    first_child[parent] = node
+                else:
+                    branches.setdefault(parent, {})[b] = node
+        except IndexError:
+            raise ValueError('Serialized tree ends unexpectedly')
+        if i != len(serialized):
+            raise ValueError('Unexpected data after serialized tree')
+
+        runs = self.__runs
+        for node in hrange(len(self) - 1, -1, -1):
+            self.__dead_children[node] = self.__count_dead_children(node)
+            child = first_child[node]
+            if (
+                child == node + 1 and forced[node] == NO_BYTE and
+                not dead[child] and node not in branches
+            ):
+                runs[node] = runs[child] + 1
+
+    def generate_novel_prefix(self, random, cap):
+        """Return a prefix of some buffer that has not been seen before, by
+        walking randomly down the tree while avoiding dead nodes."""
+        assert not self.exhausted
+        prefix = bytearray()
+        node = 0
+        while True:
+            assert len(prefix) < cap
+            assert not self.__dead[node]
+            c = self.__forced[node]
+            if c != NO_BYTE:
+                prefix.append(c)
+                node = self.child(node, c)
+                continue
+            upper_bound = self.__capped[node] + 1
+            c = random.randrange(0, upper_bound)
+            next_node = self.child(node, c)
+            prefix.append(c)
+            if next_node is None:
+                break
+            if self.__dead[next_node]:
+                choices = []
+                for b in hrange(upper_bound):
+                    child = self.child(node, b)
+                    if child is None or not self.__dead[child]:
+                        choices.append(b)
+                assert choices
+                c = random.choice(choices)
+                prefix[-1] = c
+                next_node = self.child(node, c)
+                if next_node is None:
+                    break
+            node = next_node
+        return hbytes(prefix)
+
+    def __follow(self, near):
+        """Returns a pair (nodes, reach) describing the path that rejects
+        and lookup would take through the tree for the buffer near.
+
+        nodes[k] is the node they reach after k bytes, and reach[k] is the
+        largest j + block_sizes[nodes[j]] for j < k. Every node but the last
+        is not dead, and we stop at any byte that rejects and lookup would
+        treat differently, so for any buffer that agrees with near on its
+        first k bytes they can start from nodes[k] and skip the walk there.
+
+        The result is cached between calls with the same near. add cuts it
+        short if it changes anything on the path, and otherwise we only need
+        to check whether it can be extended any further than last time.
+        """
+        if self.__followed_buffer != near:
+            self.__followed_buffer = hbytes(near)
+            self.__followed_nodes = array('i', [0])
+            self.__followed_reach = array('i', [0])
+            self.__followed_version = None
+        nodes = self.__followed_nodes
+        reach = self.__followed_reach
+        if self.__followed_version == self.__version:
+            return nodes, reach
+        self.__followed_version = self.__version
+
+        forced = self.__forced
+        capped = self.__capped
+        dead = self.__dead
+        block_sizes = self.__block_sizes
+
+        k = len(nodes) - 1
+        node_index = nodes[k]
+        r = reach[k]
+        for k in hrange(k, len(near)):
+            b = near[k]
+            if dead[node_index] or b > capped[node_index]:
+                break
+            c = forced[node_index]
+            if c != NO_BYTE and c != b:
+                break
+            r = max(r, k + block_sizes[node_index])
+            node_index = self.child(node_index, b)
+            if node_index is None:
+                break
+            nodes.append(node_index)
+            reach.append(r)
+        return nodes, reach
+
+    def __start(self, buffer, near):
+        """Returns a triple (k, nodes[k], reach[k]) from __follow(near), with
+        k the length of the longest prefix that buffer and near have in
+        common, or of the path if that is shorter."""
+        if near is None:
+            return 0, 0, 0
+        nodes, reach = self.__follow(near)
+        k = common_prefix_length(buffer, near, len(nodes) - 1)
+        return k, nodes[k], reach[k]
+
+    def rejects(self, buffer, near=None):
+        """Returns True if we know for sure that running this buffer will not
+        produce anything we have not already seen, either because it follows
+        an explored path to a dead node or because it is too short for the
+        block it would end in.
+
+        If near is provided it should be a buffer that this one is likely to
+        share a long prefix with, such as the one it was derived from. Calls
+        with the same value of near can then skip walking that prefix."""
+        forced = self.__forced
+        capped = self.__capped
+        dead = self.__dead
+        block_sizes = self.__block_sizes
+        first_byte = self.__first_byte
+        first_child = self.__first_child
+        branches = self.__branches
+
+        n = len(buffer)
+        start, node_index, reach = self.__start(buffer, near)
+        if reach > n:
+            return True
+        for k in hrange(start, n):
+            if dead[node_index]:
+                return True
+            if k + block_sizes[node_index] > n:
+                return True
+            b = forced[node_index]
+            if b == NO_BYTE:
+                b = buffer[k]
+            b = min(b, capped[node_index])
+            child = first_child[node_index]
+            if child and first_byte[node_index] == b:
+                node_index = child
+            else:
+                try:
+                    node_index = branches[node_index][b]
+                except KeyError:
+                    return False
+        return True
+
+    def lookup(self, buffer, max_length, near=None):
+        """Returns the result we would get from running buffer (padded with
+        zeroes up to max_length) if we already know it, or None. See leaf for
+        what form this takes. near is as for rejects."""
+        forced = self.__forced
+        dead = self.__dead
+        first_byte = self.__first_byte
+        first_child = self.__first_child
+        branches = self.__branches
+
+        runs = self.__runs
+
+        n = len(buffer)
+        i, node_index, _ = self.__start(buffer, near)
+        if i > 0 and dead[node_index]:
+            result = self.__leaves.get(node_index)
+            if result is not None and not isinstance(result, Status):
+                return result
+        while i < max_length:
+            k = runs[node_index]
+            if (
+                k > 1 and i + k <= n and
+                buffer[i:i + k] == first_byte[node_index:node_index + k]
+            ):
+                node_index += k
+                i += k
+                continue
+            c = forced[node_index]
+            if c == NO_BYTE:
+                c = buffer[i] if i < n else 0
+            i += 1
+            child = first_child[node_index]
+            if child and first_byte[node_index] == c:
+                node_index = child
+            else:
+                try:
+                    node_index = branches[node_index][c]
+                except KeyError:
+                    return None
+            # Every leaf is dead, so this saves us a dict lookup for most of
+            # the nodes we pass through.
+            if dead[node_index]:
+                result = self.__leaves.get(node_index)
+                if result is not None and not isinstance(result, Status):
+                    return result
+        return None
+
+
+def common_prefix_length(a, b, limit):
+    """Returns the length of the longest common prefix of a and b, or limit
+    if that is smaller. This does a binary search with slice comparisons,
+    which is much faster than comparing a byte at a time in Python."""
+    hi = min(len(a), len(b), limit)
+    if a[:hi] == b[:hi]:
+        return hi
+    # Invariant: a[:lo] == b[:lo] and a[:hi] != b[:hi]
+    lo = 0
+    while lo + 1 < hi:
+        mid = (lo + hi) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid
+    return lo
@@ -20,6 +20,7 @@ from __future__ import division, print_function, absolute_import
 import heapq
 from enum import Enum
 from random import Random, getrandbits
+from hashlib import sha1
 from weakref import WeakKeyDictionary
 from collections import defaultdict
 
@@ -28,13 +29,19 @@ import attr
 from hypothesis import Phase, Verbosity, HealthCheck
 from hypothesis import settings as Settings
 from hypothesis.reporting import debug_report
+from hypothesis.internal.cache import InternTable, register_cache
 from hypothesis.internal.compat import Counter, ceil, hbytes, hrange, \
-    int_to_text, int_to_bytes, benchmark_time, int_from_bytes, \
-    to_bytes_sequence, unicode_safe_repr
+    bit_length, int_to_text, int_to_bytes, benchmark_time, \
+    int_from_bytes, to_bytes_sequence, unicode_safe_repr
+from hypothesis.internal.sketch import QuantileSketch
 from hypothesis.utils.conventions import UniqueIdentifier
 from hypothesis.internal.healthcheck import fail_health_check
 from hypothesis.internal.conjecture.data import MAX_DEPTH, Status, \
     StopTest, ConjectureData
+from hypothesis.internal.conjecture.pool import WorkerPool, can_fork
+from hypothesis.internal.conjecture.corpus import MAX_CORPUS_SIZE, \
+    CorpusManager
+from hypothesis.internal.conjecture.datatree import DataTree
 from hypothesis.internal.conjecture.minimizer import minimize, minimize_int
 
 # Tell pytest to omit the body of this module from tracebacks
@@ -44,6 +51,17 @@ __tracebackhide__ = True
 
 HUNG_TEST_TIME_LIMIT = 5 * 60
 
+# How many random bytes at a time the prefix drawer adds to its buffer.
+PREFIX_CHUNK_SIZE = 32
+
+# When settings.memory_budget is set, the most examples the target selector
+# keeps around for each tag.
+MAX_EXAMPLES_PER_TAG = 100
+
+# When settings.remember_explored is set, the most nodes of the tree that we
+# will save to the database. Anything bigger is not worth the space.
+MAX_SAVED_TREE_NODES = 10000
+
 
 @attr.s
 class HealthCheckState(object):
@@ -62,15 +80,35 @@ class ExitReason(Enum):
     flaky = 5
 
 
+def materialize(values):
+    """Read each of a list of LazyValues, skipping any that have been
+    deleted."""
+    result = []
+    for v in values:
+        v = v.materialize()
+        if v is not None:
+            result.append(v)
+    return result
+
+
 class RunIsComplete(Exception):
     pass
 
 
+@attr.s(slots=True)
+class MutationTarget(object):
+    """The parts of an example that the mutator looks at, in a form that is
+    cheap to send to a worker process."""
+
+    buffer = attr.ib()
+    blocks = attr.ib()
+
+
 class ConjectureRunner(object):
 
     def __init__(
         self, test_function, settings=None, random=None,
-        database_key=None,
+        database_key=None, fingerprint=None,
     ):
         self._test_function = test_function
         self.settings = settings or Settings()
@@ -81,54 +119,47 @@ class ConjectureRunner(object):
         self.start_time = benchmark_time()
         self.random = random or Random(getrandbits(128))
         self.database_key = database_key
-        self.status_runtimes = {}
-
-        self.all_drawtimes = []
-        self.all_runtimes = []
+        # Identifies the test and strategy that database_key belongs to, so
+        # that we can tell when the tree we saved under it is out of date.
+        self.fingerprint = fingerprint
+        self.status_counts = Counter()
+
+        # These are only used for reporting statistics, so we keep a summary
+        # rather than every individual timing. Overruns are left out of the
+        # distribution of runtimes, but do count towards the total.
+        self.runtimes = QuantileSketch()
+        self.total_runtime = 0.0
+        self.total_drawtime = 0.0
 
         self.events_to_strings = WeakKeyDictionary()
 
-        self.target_selector = TargetSelector(self.random)
-
-        # Tree nodes are stored in an array to prevent heavy nesting of data
-        # structures. Branches are dicts mapping bytes to child nodes (which
-        # will in general only be partially populated). Leaves are
-        # ConjectureData objects that have been previously seen as the result
-        # of following that path.
-        self.tree = [{}]
-
-        # A node is dead if there is nothing left to explore past that point.
-        # Recursively, a node is dead if either it is a leaf or every byte
-        # leads to a dead node when starting from here.
-        self.dead = set()
-
-        # We rewrite the byte stream at various points during parsing, to one
-        # that will produce an equivalent result but is in some sense more
-        # canonical. We keep track of these so that when walking the tree we
-        # can identify nodes where the exact byte value doesn't matter and
-        # treat all bytes there as equivalent. This significantly reduces the
-        # size of the search space and removes a lot of redundant examples.
-
-        # Maps tree indices where to the unique byte that is valid at that
-        # point. Corresponds to data.write() calls.
-        self.forced = {}
-
-        # Maps tree indices to the maximum byte that is valid at that point.
-        # Currently this is only used inside draw_bits, but it potentially
-        # could get used elsewhere.
-        self.capped = {}
-
-        # Where a tree node consists of the beginning of a block we track the
-        # size of said block. This allows us to tell when an example is too
-        # short even if it goes off the unexplored region of the tree - if it
-        # is at the beginning of a block of size 4 but only has 3 bytes left,
-        # it's going to overrun the end of the buffer regardless of the
-        # buffer contents.
-        self.block_sizes = {}
+        if self.settings.memory_budget is None:
+            self.target_selector = TargetSelector(self.random)
+        else:
+            self.target_selector = TargetSelector(
+                self.random, max_examples_per_tag=MAX_EXAMPLES_PER_TAG)
+
+        # A record of every buffer we have run so far, which we use to
+        # avoid running the same example twice and to direct generation
+        # towards unexplored regions of the search space.
+        self.tree = DataTree(leaf_budget=self.settings.memory_budget)
 
         self.interesting_examples = {}
         self.covering_examples = {}
 
+        # Writes to the covering corpus that we have yet to make, as a
+        # mapping of buffer -> whether it is to be saved (True) or deleted
+        # (False). We make them at the end of each phase of the run rather
+        # than whenever a tag gets a better example, as the best example
+        # for a tag is often replaced many times in quick succession.
+        self.covering_changes = {}
+
+        # The number of values in each extra corpus when we read it, and the
+        # values replayed from any that were too big to replay in full, so
+        # that we can keep their size under control at the end of the run.
+        self.corpus_sizes = {}
+        self.sampled_corpora = {}
+
         self.shrunk_examples = set()
 
         self.tag_intern_table = {}
@@ -137,10 +168,18 @@ class ConjectureRunner(object):
 
         self.used_examples_from_database = False
 
+        # Where random_bytes gets its data from. This is tied to self.random,
+        # and replaced if that ever is.
+        self.__byte_pool = None
+
+        # A WorkerPool for running examples in parallel, if the settings ask
+        # for one. This only exists for the duration of run().
+        self.worker_pool = None
+
     def __tree_is_exhausted(self):
-        return 0 in self.dead
+        return self.tree.exhausted
 
-    def test_function(self, data):
+    def __check_for_hung_test(self):
         if benchmark_time() - self.start_time >= HUNG_TEST_TIME_LIMIT:
             fail_health_check(self.settings, (
                 'Your test has been running for at least five minutes. This '
@@ -148,6 +187,9 @@ class ConjectureRunner(object):
                 'turns it into an error.'
             ), HealthCheck.hung_test)
 
+    def test_function(self, data):
+        self.__check_for_hung_test()
+
         self.call_count += 1
         try:
             self._test_function(data)
@@ -163,13 +205,26 @@ class ConjectureRunner(object):
             data.freeze()
             self.note_details(data)
 
-        self.target_selector.add(data)
+        self.__record_test_data(data)
 
+    def __record_test_data(self, data):
+        """Update all of our state to reflect data, which has just finished
+        running (either here or in a worker process)."""
         self.debug_data(data)
 
         tags = frozenset(data.tags)
         data.tags = self.tag_intern_table.setdefault(tags, tags)
 
+        # We hold on to a lot of examples, so where we can we keep the compact
+        # ConjectureResult form rather than the full data. Interesting
+        # examples are kept as they are, because we go on to shrink them.
+        if data.status < Status.INTERESTING:
+            result = data.as_result()
+        else:
+            result = data
+
+        self.target_selector.add(result)
+
         if data.status == Status.VALID:
             self.valid_examples += 1
             for t in data.tags:
@@ -178,57 +233,13 @@ class ConjectureRunner(object):
                     existing is None or
                     sort_key(data.buffer) < sort_key(existing.buffer)
                 ):
-                    self.covering_examples[t] = data
+                    self.covering_examples[t] = result
                     if self.database is not None:
-                        self.database.save(self.covering_key, data.buffer)
+                        self.covering_changes[data.buffer] = True
                         if existing is not None:
-                            self.database.delete(
-                                self.covering_key, existing.buffer)
-
-        tree_node = self.tree[0]
-        indices = []
-        node_index = 0
-        for i, b in enumerate(data.buffer):
-            indices.append(node_index)
-            if i in data.forced_indices:
-                self.forced[node_index] = b
-            try:
-                self.capped[node_index] = data.capped_indices[i]
-            except KeyError:
-                pass
-            try:
-                node_index = tree_node[b]
-            except KeyError:
-                node_index = len(self.tree)
-                self.tree.append({})
-                tree_node[b] = node_index
-            tree_node = self.tree[node_index]
-            if node_index in self.dead:
-                break
-
-        for u, v in data.blocks:
-            # This can happen if we hit a dead node when walking the buffer.
-            # In that case we alrady have this section of the tree mapped.
-            if u >= len(indices):
-                break
-            self.block_sizes[indices[u]] = v - u
-
-        self.dead.update(indices[self.cap:])
-
-        if data.status != Status.OVERRUN and node_index not in self.dead:
-            self.dead.add(node_index)
-            self.tree[node_index] = data
+                            self.covering_changes[existing.buffer] = False
 
-            for j in reversed(indices):
-                if (
-                    len(self.tree[j]) < self.capped.get(j, 255) + 1 and
-                    j not in self.forced
-                ):
-                    break
-                if set(self.tree[j].values()).issubset(self.dead):
-                    self.dead.add(j)
-                else:
-                    break
+        self.tree.add(data, self.cap)
 
         if data.status == Status.INTERESTING:
             key = data.interesting_origin
@@ -273,38 +284,7 @@ class ConjectureRunner(object):
         self.record_for_health_check(data)
 
     def generate_novel_prefix(self):
-        prefix = bytearray()
-        node = 0
-        while True:
-            assert len(prefix) < self.cap
-            assert node not in self.dead
-            upper_bound = self.capped.get(node, 255) + 1
-            try:
-                c = self.forced[node]
-                prefix.append(c)
-                node = self.tree[node][c]
-                continue
-            except KeyError:
-                pass
-            c = self.random.randrange(0, upper_bound)
-            try:
-                next_node = self.tree[node][c]
-                if next_node in self.dead:
-                    choices = [
-                        b for b in hrange(upper_bound)
-                        if self.tree[node].get(b) not in self.dead
-                    ]
-                    assert choices
-                    c = self.random.choice(choices)
-                    node = self.tree[node][c]
-                else:
-                    node = next_node
-                prefix.append(c)
-            except KeyError:
-                prefix.append(c)
-                break
-        assert node not in self.dead
-        return hbytes(prefix)
+        return self.tree.generate_novel_prefix(self.random, self.cap)
 
     @property
     def cap(self):
@@ -396,11 +376,103 @@ class ConjectureRunner(object):
     def covering_key(self):
         return b'.'.join((self.database_key, b'coverage'))
 
+    @property
+    def tree_key(self):
+        return b'.'.join((self.database_key, b'tree'))
+
+    def __remembers_explored(self):
+        return (
+            self.settings.remember_explored and
+            self.database is not None and
+            self.fingerprint is not None
+        )
+
+    def __tree_prefix(self):
+        """The prefix of a saved tree that was explored by this test with
+        these settings. Anything saved under tree_key without it is out of
+        date."""
+        return sha1(
+            self.fingerprint + int_to_bytes(self.settings.buffer_size, 8)
+        ).digest()
+
+    def load_explored_tree(self):
+        """If settings.remember_explored is set, restore the tree saved by a
+        previous run of this test, deleting any that are out of date."""
+        if not self.__remembers_explored():
+            return
+        prefix = self.__tree_prefix()
+        for value in list(self.database.fetch(self.tree_key)):
+            if value[:len(prefix)] == prefix:
+                tree = DataTree(leaf_budget=self.settings.memory_budget)
+                try:
+                    tree.load(value[len(prefix):])
+                except ValueError:
+                    pass
+                else:
+                    self.tree = tree
+                    self.debug('Loaded %d nodes of tree from database' % (
+                        len(tree),))
+                    continue
+            self.database.delete(self.tree_key, value)
+
+    def save_covering_examples(self):
+        """Make the writes to the covering corpus that have built up since
+        we last did this: each new best example for a tag is saved, and the
+        one it replaced is deleted."""
+        if not self.covering_changes:
+            return
+        changes = self.covering_changes
+        self.covering_changes = {}
+        with self.database.batch():
+            self.database.delete_many(
+                self.covering_key, [b for b, k in changes.items() if not k])
+            self.database.save_many(
+                self.covering_key, [b for b, k in changes.items() if k])
+
+    def manage_corpora(self):
+        """Note the use of the values we replayed from extra corpora that we
+        had to sample from and that were still useful, so that they are kept
+        in preference to the rest, and trim any extra corpus that has grown
+        past MAX_CORPUS_SIZE."""
+        if self.database is None or not self.corpus_sizes:
+            return
+        manager = CorpusManager(
+            self.database, max_corpus_size=MAX_CORPUS_SIZE)
+        best = set(v.buffer for v in self.covering_examples.values())
+        with self.database.batch():
+            for key, values in self.sampled_corpora.items():
+                if key == self.covering_key:
+                    values = [v for v in values if v in best]
+                manager.record_use(key, values)
+            manager.save()
+            if max(self.corpus_sizes.values()) > MAX_CORPUS_SIZE:
+                manager.collect(sorted(self.corpus_sizes))
+
+    def save_explored_tree(self):
+        """If settings.remember_explored is set, replace the tree saved for
+        this test with the current one. We only save it after a passing run,
+        so that once a test has failed it is fully explored again."""
+        if not self.__remembers_explored():
+            return
+        self.database.delete_many(
+            self.tree_key, list(self.database.fetch(self.tree_key)))
+        if (
+            self.interesting_examples or
+            self.exit_reason == ExitReason.flaky
+        ):
+            return
+        serialized = self.tree.dump(MAX_SAVED_TREE_NODES)
+        if serialized is not None:
+            self.database.save(
+                self.tree_key, self.__tree_prefix() + serialized)
+
     def note_details(self, data):
         runtime = max(data.finish_time - data.start_time, 0.0)
-        self.all_runtimes.append(runtime)
-        self.all_drawtimes.extend(data.draw_times)
-        self.status_runtimes.setdefault(data.status, []).append(runtime)
+        self.total_runtime += runtime
+        self.total_drawtime += sum(data.draw_times)
+        self.status_counts[data.status] += 1
+        if data.status != Status.OVERRUN:
+            self.runtimes.add(runtime)
         for event in set(map(self.event_to_string, data.events)):
             self.event_call_counts[event] += 1
 
@@ -434,35 +506,73 @@ class ConjectureRunner(object):
 
     def run(self):
         with self.settings:
+            self.load_explored_tree()
             try:
                 self._run()
             except RunIsComplete:
                 pass
+            finally:
+                self.save_covering_examples()
+                self.manage_corpora()
+            self.save_explored_tree()
+            if self.database is not None:
+                # Some databases make writes in the background, and we want
+                # them all to have been made once the run is over.
+                self.database.flush()
             for v in self.interesting_examples.values():
                 self.debug_data(v)
             self.debug(
                 u'Run complete after %d examples (%d valid) and %d shrinks'
                 % (self.call_count, self.valid_examples, self.shrinks))
 
+    def random_bytes(self, n):
+        """Returns n uniformly random bytes drawn from self.random."""
+        pool = self.__byte_pool
+        if pool is None or pool.random is not self.random:
+            pool = BytePool(self.random)
+            self.__byte_pool = pool
+        return pool.draw(n)
+
+    def _new_prefix_drawer(self, prefix):
+        # Rather than generating random data a draw at a time, we extend the
+        # prefix with random bytes in chunks whenever the test runs past the
+        # end of what we have, and every draw is then just a slice.
+        buffer = bytearray(prefix)
+        cap = self.cap
+
+        def draw_bytes(data, n):
+            start = data.index
+            end = start + n
+            if end > len(buffer):
+                buffer.extend(self.random_bytes(
+                    max(end - len(buffer), PREFIX_CHUNK_SIZE)))
+            result = hbytes(buffer[start:end])
+            if end < cap and data.depth * 2 < MAX_DEPTH:
+                # We're nowhere near any of the bounds that __zero_bound
+                # enforces, so can skip calling it.
+                return result
+            return self.__zero_bound(data, result)
+        return draw_bytes
+
     def _new_mutator(self):
         target_data = [None]
 
         def draw_new(data, n):
-            return uniform(self.random, n)
+            return self.random_bytes(n)
 
         def draw_existing(data, n):
             return target_data[0].buffer[data.index:data.index + n]
 
         def draw_smaller(data, n):
             existing = target_data[0].buffer[data.index:data.index + n]
-            r = uniform(self.random, n)
+            r = self.random_bytes(n)
             if r <= existing:
                 return r
             return _draw_predecessor(self.random, existing)
 
         def draw_larger(data, n):
             existing = target_data[0].buffer[data.index:data.index + n]
-            r = uniform(self.random, n)
+            r = self.random_bytes(n)
             if r >= existing:
                 return r
             return _draw_successor(self.random, existing)
@@ -473,7 +583,7 @@ class ConjectureRunner(object):
                 i = self.random.choice(choices)
                 return hbytes(data.buffer[i:i + n])
             else:
-                result = uniform(self.random, n)
+                result = self.random_bytes(n)
                 assert isinstance(result, hbytes)
                 return result
 
@@ -499,7 +609,7 @@ class ConjectureRunner(object):
             if data.index + n <= u:
                 return target_data[0].buffer[data.index:data.index + n]
             else:
-                return uniform(self.random, n)
+                return self.random_bytes(n)
 
         options = [
             draw_new,
@@ -517,14 +627,16 @@ class ConjectureRunner(object):
 
         prefix = [None]
 
-        def mutate_from(origin):
+        def mutate_from(origin, novel_prefix=None):
             target_data[0] = origin
-            prefix[0] = self.generate_novel_prefix()
+            if novel_prefix is None:
+                novel_prefix = self.generate_novel_prefix()
+            prefix[0] = novel_prefix
             return draw_mutated
 
         def draw_mutated(data, n):
             if data.index + n > len(target_data[0].buffer):
-                result = uniform(self.random, n)
+                result = self.random_bytes(n)
             else:
                 result = self.random.choice(bits)(data, n)
             p = prefix[0]
@@ -598,39 +710,50 @@ class ConjectureRunner(object):
             # interesting examples, but there are a lot of them, so we down
             # sample the secondary corpus to a more manageable size.
 
+            # Values are only read out of the database once we have decided
+            # to replay them, as most of the extra corpora are not used.
+            database = self.settings.database
+            corpora = database.fetch_many([
+                self.database_key, self.secondary_key, self.covering_key
+            ], lazy=True)
             corpus = sorted(
-                self.settings.database.fetch(self.database_key),
-                key=sort_key
-            )
+                materialize(corpora[self.database_key]), key=sort_key)
             desired_size = max(2, ceil(0.1 * self.settings.max_examples))
 
             for extra_key in [self.secondary_key, self.covering_key]:
+                extra_corpus = corpora[extra_key]
+                self.corpus_sizes[extra_key] = len(extra_corpus)
                 if len(corpus) < desired_size:
-                    extra_corpus = list(
-                        self.settings.database.fetch(extra_key),
-                    )
-
                     shortfall = desired_size - len(corpus)
 
                     if len(extra_corpus) <= shortfall:
                         extra = extra_corpus
                     else:
                         extra = self.random.sample(extra_corpus, shortfall)
+                    extra = materialize(extra)
                     extra.sort(key=sort_key)
                     corpus.extend(extra)
+                    if len(extra_corpus) > shortfall:
+                        self.sampled_corpora[extra_key] = extra
 
             self.used_examples_from_database = len(corpus) > 0
 
-            for existing in corpus:
-                last_data = ConjectureData.for_buffer(existing)
-                try:
-                    self.test_function(last_data)
-                finally:
-                    if last_data.status != Status.INTERESTING:
-                        self.settings.database.delete(
-                            self.database_key, existing)
-                        self.settings.database.delete(
-                            self.secondary_key, existing)
+            failed = set()
+            with database.batch():
+                for existing in corpus:
+                    last_data = ConjectureData.for_buffer(existing)
+                    try:
+                        self.test_function(last_data)
+                    finally:
+                        if last_data.status != Status.INTERESTING:
+                            failed.add(existing)
+                            database.delete(self.database_key, existing)
+                            database.delete(self.secondary_key, existing)
+            if self.secondary_key in self.sampled_corpora:
+                self.sampled_corpora[self.secondary_key] = [
+                    v for v in self.sampled_corpora[self.secondary_key]
+                    if v not in failed
+                ]
 
     def exit_with(self, reason):
         self.exit_reason = reason
@@ -663,26 +786,20 @@ class ConjectureRunner(object):
 
         self.health_check_state = HealthCheckState()
 
+        if self.worker_pool is not None:
+            self.__generate_new_examples_in_parallel(self.worker_pool)
+            return
+
         count = 0
         while not self.interesting_examples and (
             count < 10 or self.health_check_state is not None
         ):
-            prefix = self.generate_novel_prefix()
-
-            def draw_bytes(data, n):
-                if data.index < len(prefix):
-                    result = prefix[data.index:data.index + n]
-                    if len(result) < n:
-                        result += uniform(self.random, n - len(result))
-                else:
-                    result = uniform(self.random, n)
-                return self.__zero_bound(data, result)
-
             targets_found = len(self.covering_examples)
 
             last_data = ConjectureData(
                 max_length=self.settings.buffer_size,
-                draw_bytes=draw_bytes
+                draw_bytes=self._new_prefix_drawer(
+                    self.generate_novel_prefix()),
             )
             self.test_function(last_data)
             last_data.freeze()
@@ -765,12 +882,157 @@ class ConjectureRunner(object):
                 zero_bound_queue.append(data)
             mutations += 1
 
+    def __generate_new_examples_in_parallel(self, pool):
+        """Equivalent to the main loops of generate_new_examples, but farms
+        out the actual test execution to worker processes.
+
+        Each batch consists of one job per worker. Everything random about a
+        job - its prefix and the seed that the worker will use to draw the
+        rest of the data - is decided here before the batch is sent off, and
+        the results are incorporated in the order the jobs were created, so
+        for a given number of workers this is exactly as deterministic as the
+        sequential version. Any novelty found by a job is only visible to
+        jobs in later batches.
+        """
+        count = 0
+        while not self.interesting_examples and (
+            count < 10 or self.health_check_state is not None
+        ):
+            jobs = [
+                (self.generate_novel_prefix(), self.random.getrandbits(64),
+                 None)
+                for _ in hrange(pool.size)
+            ]
+            for result in pool.map(jobs):
+                targets_found = len(self.covering_examples)
+                self.__incorporate_job_result(result)
+                if len(self.covering_examples) > targets_found:
+                    count = 0
+                else:
+                    count += 1
+
+        zero_bound_queue = []
+
+        while not self.interesting_examples:
+            jobs = []
+            while len(jobs) < pool.size:
+                if zero_bound_queue:
+                    # See the comment in generate_new_examples about why we
+                    # do this. The only difference here is that the shuffled
+                    # buffer is used as a prefix, so if the test draws past
+                    # its end we fill the remainder randomly rather than with
+                    # zeros.
+                    overdrawn = zero_bound_queue.pop()
+                    buffer = bytearray(overdrawn.buffer)
+                    for i in overdrawn.forced_indices:
+                        buffer[i] = 0
+                    self.random.shuffle(buffer)
+                    jobs.append((
+                        hbytes(buffer), self.random.getrandbits(64), None))
+                else:
+                    _, origin = self.target_selector.select()
+                    jobs.append((
+                        self.generate_novel_prefix(),
+                        self.random.getrandbits(64),
+                        MutationTarget(origin.buffer, origin.blocks),
+                    ))
+            for result in pool.map(jobs):
+                data = self.__incorporate_job_result(result)
+                if getattr(data, 'hit_zero_bound', False):
+                    zero_bound_queue.append(data)
+
+    def execute_job(self, job):
+        """Run a single job created by __generate_new_examples_in_parallel or
+        test_buffers_in_parallel. A job without a seed is an exact buffer to
+        run, as with ConjectureData.for_buffer.
+
+        This is only ever called inside a worker process, on the worker's own
+        copy of the runner, so it may freely replace self.random. It does not
+        update any of the runner's state: That's the parent's job, once it has
+        got the result back.
+
+        Returns a pair (buffer, data). data is the frozen ConjectureData that
+        running the test produced, or None if the parent should rerun buffer
+        itself: We do this for interesting examples and for any other
+        exception, as their details only make sense in the parent process.
+        """
+        prefix, seed, origin = job
+        if seed is None:
+            data = ConjectureData.for_buffer(prefix)
+        else:
+            self.random = Random(seed)
+            if origin is None:
+                draw_bytes = self._new_prefix_drawer(prefix)
+            else:
+                draw_bytes = self._new_mutator()(origin, prefix)
+            data = ConjectureData(
+                max_length=self.settings.buffer_size, draw_bytes=draw_bytes,
+            )
+        try:
+            self._test_function(data)
+        except StopTest as e:
+            if e.testcounter != data.testcounter:
+                return (hbytes(data.buffer), None)
+        except BaseException:
+            return (hbytes(data.buffer), None)
+        data.freeze()
+        if data.status == Status.INTERESTING:
+            return (data.buffer, None)
+        # Events may be arbitrary objects, which we don't want to have to
+        # pickle, and the parent is only going to use their string forms.
+        data.events = frozenset(map(self.event_to_string, data.events))
+        return (data.buffer, data)
+
+    def __incorporate_job_result(self, result):
+        buffer, data = result
+        if data is None:
+            data = ConjectureData.for_buffer(buffer)
+            self.test_function(data)
+        else:
+            self.__check_for_hung_test()
+            self.call_count += 1
+            self.note_details(data)
+            self.__record_test_data(data)
+        return data
+
+    def test_buffers_in_parallel(self, buffers):
+        """Run each of buffers through the test function in a worker process
+        and record the results here, as test_function would.
+
+        Interesting examples (and anything else that did not complete
+        normally) are not recorded. Instead we return the list of those
+        buffers, in the order they were passed in, and it's up to the caller
+        to run them here with test_function if it cares about them. This lets
+        the shrinker run only the one it's actually going to use.
+
+        If we have no worker pool, this does nothing and returns buffers.
+        """
+        if self.worker_pool is None:
+            return list(buffers)
+        rerun = []
+        jobs = [(buffer, None, None) for buffer in buffers]
+        for buffer, data in self.worker_pool.map(jobs):
+            if data is None:
+                rerun.append(buffer)
+            else:
+                self.__incorporate_job_result((buffer, data))
+        return rerun
+
     def _run(self):
         self.start_time = benchmark_time()
 
-        self.reuse_existing_examples()
-        self.generate_new_examples()
-        self.shrink_interesting_examples()
+        if self.settings.workers > 1 and can_fork():
+            self.worker_pool = WorkerPool(self, self.settings.workers)
+        try:
+            self.reuse_existing_examples()
+            self.save_covering_examples()
+            self.generate_new_examples()
+            self.save_covering_examples()
+            self.shrink_interesting_examples()
+        finally:
+            if self.worker_pool is not None:
+                self.worker_pool.close()
+                self.worker_pool = None
 
         self.exit_with(ExitReason.finished)
 
@@ -833,18 +1095,19 @@ class ConjectureRunner(object):
                 sort_key(v.buffer)
                 for v in self.interesting_examples.values()
             )
-            for c in corpus:
-                if sort_key(c) >= cap:
-                    break
-                else:
-                    data = self.cached_test_function(c)
-                    if (
-                        data.status != Status.INTERESTING or
-                        self.interesting_examples[data.interesting_origin]
-                        is not data
-                    ):
-                        self.settings.database.delete(
-                            self.secondary_key, c)
+            with self.settings.database.batch():
+                for c in corpus:
+                    if sort_key(c) >= cap:
+                        break
+                    else:
+                        data = self.cached_test_function(c)
+                        if (
+                            data.status != Status.INTERESTING or
+                            self.interesting_examples[
+                                data.interesting_origin] is not data
+                        ):
+                            self.settings.database.delete(
+                                self.secondary_key, c)
 
     def shrink(self, example, predicate):
         s = self.new_shrinker(example, predicate)
@@ -854,7 +1117,7 @@ class ConjectureRunner(object):
     def new_shrinker(self, example, predicate):
         return Shrinker(self, example, predicate)
 
-    def prescreen_buffer(self, buffer):
+    def prescreen_buffer(self, buffer, near=None):
         """Attempt to rule out buffer as a possible interesting candidate.
 
         Returns False if we know for sure that running this buffer will not
@@ -863,53 +1126,17 @@ class ConjectureRunner(object):
 
         This is purely an optimisation to try to reduce the number of tests we
         run. "return True" would be a valid but inefficient implementation.
+
+        near is an optional buffer that this one probably shares a long
+        prefix with, which lets repeated calls skip most of the work of
+        walking the tree. See DataTree.rejects.
         """
-        node_index = 0
-        n = len(buffer)
-        for k, b in enumerate(buffer):
-            if node_index in self.dead:
-                return False
-            try:
-                # The block size at that point provides a lower bound on how
-                # many more bytes are required. If the buffer does not have
-                # enough bytes to fulfill that block size then we can rule out
-                # this buffer.
-                if k + self.block_sizes[node_index] > n:
-                    return False
-            except KeyError:
-                pass
-            try:
-                b = self.forced[node_index]
-            except KeyError:
-                pass
-            try:
-                b = min(b, self.capped[node_index])
-            except KeyError:
-                pass
-            try:
-                node_index = self.tree[node_index][b]
-            except KeyError:
-                return True
-        else:
-            return False
+        return not self.tree.rejects(buffer, near)
 
-    def cached_test_function(self, buffer):
-        node_index = 0
-        for i in hrange(self.settings.buffer_size):
-            try:
-                c = self.forced[node_index]
-            except KeyError:
-                if i < len(buffer):
-                    c = buffer[i]
-                else:
-                    c = 0
-            try:
-                node_index = self.tree[node_index][c]
-            except KeyError:
-                break
-            node = self.tree[node_index]
-            if isinstance(node, ConjectureData):
-                return node
+    def cached_test_function(self, buffer, near=None):
+        result = self.tree.lookup(buffer, self.settings.buffer_size, near)
+        if result is not None:
+            return result
         result = ConjectureData.for_buffer(buffer)
         self.test_function(result)
         return result
@@ -962,6 +1189,38 @@ def uniform(random, n):
     return int_to_bytes(random.getrandbits(n * 8), n)
 
 
+BYTE_POOL_SIZE = 4096
+
+
+class BytePool(object):
+    """A source of uniformly random bytes that generates them from random
+    in large batches and then hands them out in slices.
+
+    Most draws are for a handful of bytes, so generating each of them with
+    its own call to uniform spends most of its time on call overhead rather
+    than on producing random data. As every byte comes from random, the
+    results are exactly as deterministic as random is.
+    """
+
+    def __init__(self, random, size=BYTE_POOL_SIZE):
+        self.random = random
+        self.__size = size
+        self.__buffer = hbytes()
+        self.__index = 0
+
+    def draw(self, n):
+        i = self.__index
+        j = i + n
+        if j > len(self.__buffer):
+            if n > self.__size:
+                return uniform(self.random, n)
+            self.__buffer = uniform(self.random, self.__size)
+            i = 0
+            j = n
+        self.__index = j
+        return self.__buffer[i:j]
+
+
 class SampleSet(object):
     """Set data type with the ability to sample uniformly at random from it.
 
@@ -1012,22 +1271,17 @@ class SampleSet(object):
 
 
 class Negated(object):
-    __slots__ = ('tag',)
+    __slots__ = ('tag', '__weakref__')
 
     def __init__(self, tag):
         self.tag = tag
 
 
-NEGATED_CACHE = {}  # type: dict
+NEGATED_CACHE = register_cache('negated tags', InternTable(Negated))
 
 
 def negated(tag):
-    try:
-        return NEGATED_CACHE[tag]
-    except KeyError:
-        result = Negated(tag)
-        NEGATED_CACHE[tag] = result
-        return result
+    return NEGATED_CACHE[tag]
 
 
 universal = UniqueIdentifier('universal')
@@ -1079,15 +1333,22 @@ class TargetSelector(object):
     4. Among the interesting deduplicated coverage targets we essentially
        round-robin between them, but with a more consistent distribution than
        uniformly at random, which is important particularly for short runs.
+
+    If max_examples_per_tag is not None, then rather than every example for
+    each tag we keep a uniform random sample of at most that many of them,
+    so that memory use does not grow without bound on long runs. Scores are
+    still based on the total number of examples seen with each tag.
     """
 
-    def __init__(self, random):
+    def __init__(self, random, max_examples_per_tag=None):
         self.random = random
+        self.max_examples_per_tag = max_examples_per_tag
         self.best_status = Status.OVERRUN
         self.reset()
 
     def reset(self):
         self.examples_by_tags = defaultdict(list)
+        self.tag_example_counts = Counter()
         self.tag_usage_counts = Counter()
         self.tags_by_score = defaultdict(SampleSet)
         self.scores_by_tag = {}
@@ -1116,6 +1377,8 @@ class TargetSelector(object):
                 self.examples_by_tags[t] = list(
                     self.examples_by_tags[universal]
                 )
+                self.tag_example_counts[t] = self.tag_example_counts[
+                    universal]
 
         new_tags = data.tags - self.non_universal_tags
 
@@ -1124,12 +1387,30 @@ class TargetSelector(object):
             self.examples_by_tags[negated(t)] = list(
                 self.examples_by_tags[universal]
             )
+            self.tag_example_counts[negated(t)] = self.tag_example_counts[
+                universal]
 
         self.example_counts += 1
         for t in self.tags_for(data):
-            self.examples_by_tags[t].append(data)
+            self.__add_example(t, data)
             self.rescore(t)
 
+    def __add_example(self, tag, data):
+        self.tag_example_counts[tag] += 1
+        examples = self.examples_by_tags[tag]
+        if (
+            self.max_examples_per_tag is None or
+            len(examples) < self.max_examples_per_tag
+        ):
+            examples.append(data)
+        else:
+            # Reservoir sampling: Replacing a uniformly chosen element with
+            # the right probability keeps examples a uniform sample of every
+            # example we have seen with this tag.
+            i = self.random.randint(0, self.tag_example_counts[tag] - 1)
+            if i < len(examples):
+                examples[i] = data
+
     def has_tag(self, tag, data):
         if tag is universal:
             return True
@@ -1147,13 +1428,19 @@ class TargetSelector(object):
 
     def rescore(self, tag):
         new_score = (
-            self.tag_usage_counts[tag], len(self.examples_by_tags[tag]))
+            self.tag_usage_counts[tag], self.tag_example_counts[tag])
         try:
             old_score = self.scores_by_tag[tag]
         except KeyError:
             pass
         else:
-            self.tags_by_score[old_score].remove(tag)
+            old_sample = self.tags_by_score[old_score]
+            old_sample.remove(tag)
+            if len(old_sample) == 0:
+                # Scores only ever go up, so most of them will never be used
+                # again, and keeping them around would leak memory on long
+                # runs. Its entry in self.scores is cleared by select_tag.
+                del self.tags_by_score[old_score]
         self.scores_by_tag[tag] = new_score
 
         sample = self.tags_by_score[new_score]
@@ -1164,8 +1451,8 @@ class TargetSelector(object):
     def select_tag(self):
         while True:
             peek = self.scores[0]
-            sample = self.tags_by_score[peek]
-            if len(sample) == 0:
+            sample = self.tags_by_score.get(peek)
+            if sample is None:
                 heapq.heappop(self.scores)
             else:
                 return sample.choice(self.random)
@@ -1225,7 +1512,9 @@ class Shrinker(object):
         if self.shrink_target.buffer.startswith(buffer):
             return False
 
-        if not self.__engine.prescreen_buffer(buffer):
+        if not self.__engine.prescreen_buffer(
+            buffer, self.shrink_target.buffer
+        ):
             return False
 
         assert sort_key(buffer) <= sort_key(self.shrink_target.buffer)
@@ -1233,6 +1522,43 @@ class Shrinker(object):
         self.__engine.test_function(data)
         return self.incorporate_test_data(data)
 
+    def incorporate_best_buffer(self, buffers):
+        """Consider every buffer in buffers as a possible shrink and update
+        shrink_target to the smallest one that satisfies the predicate.
+        Returns True if any of them did.
+
+        When the engine has a worker pool the candidates are all run at once,
+        so this is the main way that passes can take advantage of multiple
+        cores. Only the successful candidates then need running again here,
+        and we stop as soon as one of them works, so we usually pay for a
+        single sequential test execution per batch.
+        """
+        target = self.shrink_target
+        candidates = set()
+        for buffer in buffers:
+            buffer = hbytes(buffer[:target.index])
+            if (
+                sort_key(buffer) < sort_key(target.buffer) and
+                not target.buffer.startswith(buffer) and
+                self.__engine.prescreen_buffer(buffer, target.buffer)
+            ):
+                candidates.add(buffer)
+
+        for buffer in self.__engine.test_buffers_in_parallel(
+            sorted(candidates, key=sort_key)
+        ):
+            data = ConjectureData.for_buffer(buffer)
+            self.__engine.test_function(data)
+            if self.incorporate_test_data(data):
+                return True
+        return False
+
+    @property
+    def parallel(self):
+        """Whether passes should batch up their attempts for
+        incorporate_best_buffer, rather than trying them one at a time."""
+        return self.__engine.worker_pool is not None
+
     def incorporate_test_data(self, data):
         if (
             self.__predicate(data) and
@@ -1246,7 +1572,8 @@ class Shrinker(object):
         return False
 
     def cached_test_function(self, buffer):
-        result = self.__engine.cached_test_function(buffer)
+        result = self.__engine.cached_test_function(
+            buffer, self.shrink_target.buffer)
         self.incorporate_test_data(result)
         return result
 
@@ -1435,6 +1762,19 @@ class Shrinker(object):
             ex = self.shrink_target.examples[i]
             changed = False
 
+            if self.parallel:
+                buf = self.shrink_target.buffer
+                changed = self.incorporate_best_buffer([
+                    buf[:ex.start] + buf[child.start:child.end] +
+                    buf[ex.end:]
+                    for child in self.shrink_target.examples[i + 1:]
+                    if ex.start <= child.start < ex.end and
+                    child.length < ex.length
+                ])
+                if not changed:
+                    i += 1
+                continue
+
             for j in hrange(i + 1, len(self.shrink_target.examples)):
                 child = self.shrink_target.examples[j]
                 if child.start >= ex.end:
@@ -1582,13 +1922,16 @@ class Shrinker(object):
                     i_block_val = int_from_block(i)
                     if not self.is_shrinking_block(j) \
                        and block_val > 0 and i_block_val > 0:
-                        offset = min(int_from_block(i),
-                                     int_from_block(j))
-                        # Save current before shrinking
+                        # Save current before shrinking. This has to come
+                        # before we work out the offset, as shrinking the
+                        # previous pair may have lowered these blocks.
                         current = [self.shrink_target.buffer[u:v]
                                    for u, v in self.blocks]
-                        minimize_int(
-                            offset, lambda o: reoffset_pair((i, j), o))
+                        offset = min(int_from_block(i),
+                                     int_from_block(j))
+                        if offset > 0:
+                            minimize_int(
+                                offset, lambda o: reoffset_pair((i, j), o))
                     j += 1
             i += 1
 
@@ -1674,7 +2017,7 @@ class Shrinker(object):
             # Everything non-structural, we redraw uniformly at random.
             for i, (u, v) in enumerate(self.blocks):
                 if not self.is_shrinking_block(i):
-                    attempt_buf[u:v] = uniform(self.__engine.random, v - u)
+                    attempt_buf[u:v] = self.__engine.random_bytes(v - u)
             attempt = self.cached_test_function(attempt_buf)
             if self.__predicate(attempt):
                 prev = self.shrink_target
@@ -1816,6 +2159,10 @@ class Shrinker(object):
         self.debug('greedy interval deletes')
         i = 0
         while i < len(self.shrink_target.examples):
+            if self.parallel:
+                self.__speculatively_delete_examples(i)
+                if i >= len(self.shrink_target.examples):
+                    break
             if self.shrink_target.examples[i].length == 0:
                 i += 1
                 continue
@@ -1894,6 +2241,43 @@ class Shrinker(object):
             # next example to be undeletable.
             i += 1
 
+    def __speculatively_delete_examples(self, i):
+        """Try deleting every run of up to one example per worker starting
+        from example i all at once, and jump straight to the best of them.
+        While that makes progress we go again, which finds the long runs of
+        deletions that the adaptive probing in adaptive_example_deletion is
+        designed to find.
+
+        This only ever gets us to the sequential pass sooner: it still runs
+        afterwards from the same point, so everything it would have tried is
+        still tried.
+        """
+        while i < len(self.shrink_target.examples):
+            target = self.shrink_target
+            if target.examples[i].length == 0:
+                return
+
+            attempts = []
+            deleted = []
+            j = i
+            while (
+                len(attempts) < self.__engine.worker_pool.size and
+                j < len(target.examples)
+            ):
+                ex = target.examples[j]
+                if ex.length > 0 and (
+                    not deleted or deleted[-1][1] <= ex.start
+                ):
+                    deleted.append((ex.start, ex.end))
+                    attempt = bytearray(target.buffer)
+                    for u, v in reversed(deleted):
+                        del attempt[u:v]
+                    attempts.append(attempt)
+                j += 1
+
+            if not self.incorporate_best_buffer(attempts):
+                return
+
     def minimize_duplicated_blocks(self):
         """Find blocks that have been duplicated in multiple places and attempt
         to minimize all of the duplicates simultaneously.
@@ -1961,6 +2345,10 @@ class Shrinker(object):
         self.debug('Shrinking of individual blocks')
         i = 0
         while i < len(self.blocks):
+            if self.parallel:
+                self.__speculatively_lower_block(i)
+                if i >= len(self.blocks):
+                    break
             u, v = self.blocks[i]
             minimize(
                 self.shrink_target.buffer[u:v],
@@ -1969,6 +2357,34 @@ class Shrinker(object):
             )
             i += 1
 
+    def __speculatively_lower_block(self, i):
+        """Try a batch of the values that the minimizer would be likely to try
+        for block i all at once, and jump straight to the best of them.
+
+        The sequential minimize call that follows this still runs, so we get
+        exactly the same guarantees about the result as we would have without
+        this, but when the block has a lot of room to shrink most of the work
+        will have been done in parallel by the time it starts.
+        """
+        u, v = self.blocks[i]
+        buf = self.shrink_target.buffer
+        block = buf[u:v]
+        n = v - u
+        value = int_from_bytes(block)
+        if value == 0:
+            return
+
+        replacements = set([hbytes(n), int_to_bytes(1, n)])
+        for k in hrange(1, n):
+            replacements.add(hbytes(k) + block[k:])
+            replacements.add(hbytes(k) + block[:-k])
+        for k in hrange(1, bit_length(value) + 1):
+            replacements.add(int_to_bytes(value >> k, n))
+        replacements.add(int_to_bytes(value - 1, n))
+        self.incorporate_best_buffer([
+            buf[:u] + r + buf[v:] for r in replacements if r < block
+        ])
+
     def reorder_blocks(self):
         """Attempt to reorder blocks of the same size so that lexically larger
         values go later.
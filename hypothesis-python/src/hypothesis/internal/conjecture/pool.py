@@ -0,0 +1,79 @@
+# coding=utf-8
+#
+# This file is part of Hypothesis, which may be found at
+# https://github.com/HypothesisWorks/hypothesis-python
+#
+# Most of this work is copyright (C) 2013-2018 David R. MacIver
+# (david@drmaciver.com), but it contains contributions by others. See
+# CONTRIBUTING.rst for a full list of people who may hold copyright, and
+# consult the git log if you need to determine who owns an individual
+# contribution.
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+#
+# END HEADER
+
+from __future__ import division, print_function, absolute_import
+
+import os
+import multiprocessing
+
+from hypothesis.internal.compat import WINDOWS
+
+# The runner that jobs are executed against in a worker process. This is
+# inherited from the parent when the worker is forked, so is never pickled.
+_worker_runner = None
+
+
+def _initialize_worker(runner):
+    global _worker_runner
+    _worker_runner = runner
+
+
+def _execute_job(job):
+    return _worker_runner.execute_job(job)
+
+
+def can_fork():
+    return hasattr(os, 'fork') and not WINDOWS
+
+
+def _fork_context():
+    try:
+        return multiprocessing.get_context('fork')
+    except AttributeError:  # pragma: no cover
+        # Python 2 has no contexts, but always forks on platforms that
+        # support it, which can_fork has already checked for.
+        return multiprocessing
+
+
+class WorkerPool(object):
+    """A pool of forked processes that run jobs on behalf of a
+    ConjectureRunner.
+
+    Test functions are generally closures over arbitrary user state, so
+    rather than trying to send them anywhere we fork the process that owns
+    the runner and have each worker call back into its own copy of it. Only
+    jobs and their results ever cross a process boundary, and as these are
+    returned in the order they were submitted, the parent can incorporate
+    them in a deterministic order regardless of which worker finished
+    first.
+    """
+
+    def __init__(self, runner, size):
+        assert can_fork()
+        self.size = size
+        self.__pool = _fork_context().Pool(
+            size, initializer=_initialize_worker, initargs=(runner,)
+        )
+
+    def map(self, jobs):
+        """Run runner.execute_job on each job in a worker and return the
+        results in the order the jobs were passed in."""
+        return self.__pool.map(_execute_job, jobs, chunksize=1)
+
+    def close(self):
+        self.__pool.terminate()
+        self.__pool.join()
@@ -22,6 +22,7 @@ import sys
 import json
 from contextlib import contextmanager
 
+from hypothesis.internal.cache import ClockCache, register_cache
 from hypothesis.internal.reflection import proxies
 
 if False:
@@ -40,7 +41,8 @@ When not running with a magic environment variable set, this module disables
 itself and has essentially no overhead.
 """
 
-pretty_file_name_cache = {}  # type: Dict[str, str]
+pretty_file_name_cache = register_cache(
+    'pretty file names', ClockCache(1024))
 
 
 def pretty_file_name(f):
@@ -17,17 +17,31 @@
 
 from __future__ import division, print_function, absolute_import
 
+from array import array
+from bisect import bisect_right
+
+# Sets with at most this many values keep a table of all of them, so that
+# looking one up by its index is a single array access.
+SMALL_SIZE = 1024
+
 
 class IntervalSet(object):
 
     def __init__(self, intervals):
         self.intervals = tuple(intervals)
-        self.offsets = [0]
+        # starts[j] is the first value in the j'th interval and offsets[j] is
+        # its index in the set, which we find values from with bisect.
+        self.starts = array('l', [u for u, _ in self.intervals])
+        self.offsets = array('l', [0])
         for u, v in self.intervals:
             self.offsets.append(
                 self.offsets[-1] + v - u + 1
             )
         self.size = self.offsets.pop()
+        if self.size <= SMALL_SIZE:
+            self.table = array('l', iter(self))
+        else:
+            self.table = None
 
     def __len__(self):
         return self.size
@@ -42,43 +56,25 @@ class IntervalSet(object):
             i = self.size + i
         if i < 0 or i >= self.size:
             raise IndexError('Invalid index %d for [0, %d)' % (i, self.size))
+        if self.table is not None:
+            return self.table[i]
         # Want j = maximal such that offsets[j] <= i
-
-        j = len(self.intervals) - 1
-        if self.offsets[j] > i:
-            hi = j
-            lo = 0
-            # Invariant: offsets[lo] <= i < offsets[hi]
-            while lo + 1 < hi:
-                mid = (lo + hi) // 2
-                if self.offsets[mid] <= i:
-                    lo = mid
-                else:
-                    hi = mid
-            j = lo
-        t = i - self.offsets[j]
-        u, v = self.intervals[j]
-        r = u + t
-        assert r <= v
-        return r
+        j = bisect_right(self.offsets, i) - 1
+        return self.starts[j] + i - self.offsets[j]
 
     def __repr__(self):
         return 'IntervalSet(%r)' % (self.intervals,)
 
     def index(self, value):
-        for offset, (u, v) in zip(self.offsets, self.intervals):
-            if u == value:
-                return offset
-            elif u > value:
-                raise ValueError('%d is not in list' % (value,))
-            if value <= v:
-                return offset + (value - u)
+        j = bisect_right(self.starts, value) - 1
+        if j >= 0 and value <= self.intervals[j][1]:
+            return self.offsets[j] + value - self.starts[j]
         raise ValueError('%d is not in list' % (value,))
 
     def index_above(self, value):
-        for offset, (u, v) in zip(self.offsets, self.intervals):
-            if u >= value:
-                return offset
-            if value <= v:
-                return offset + (value - u)
+        j = bisect_right(self.starts, value) - 1
+        if j >= 0 and value <= self.intervals[j][1]:
+            return self.offsets[j] + value - self.starts[j]
+        if j + 1 < len(self.offsets):
+            return self.offsets[j + 1]
         return self.size
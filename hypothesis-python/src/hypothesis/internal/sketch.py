@@ -0,0 +1,80 @@
+# coding=utf-8
+#
+# This file is part of Hypothesis, which may be found at
+# https://github.com/HypothesisWorks/hypothesis-python
+#
+# Most of this work is copyright (C) 2013-2018 David R. MacIver
+# (david@drmaciver.com), but it contains contributions by others. See
+# CONTRIBUTING.rst for a full list of people who may hold copyright, and
+# consult the git log if you need to determine who owns an individual
+# contribution.
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+#
+# END HEADER
+
+from __future__ import division, print_function, absolute_import
+
+import math
+
+from hypothesis.internal.compat import Counter
+
+# Anything at or below this is treated as zero. We only use sketches for
+# timings, and nothing we time takes less than a nanosecond.
+MIN_VALUE = 1e-9
+
+
+class QuantileSketch(object):
+    """Approximate order statistics of a stream of non-negative numbers,
+    using a bounded amount of memory.
+
+    Values are counted in buckets whose boundaries are successive powers of
+    gamma = (1 + accuracy) / (1 - accuracy), and each bucket is represented by
+    a value within a factor of (1 + accuracy) of everything in it. The
+    number of buckets only depends on the ratio between the largest and
+    smallest values seen, so for timings there are never more than a couple
+    of thousand however many values are added.
+
+    This is essentially the DDSketch of Masson, Rim and Lee.
+    """
+
+    __slots__ = ('count', 'gamma', 'log_gamma', 'zeroes', 'buckets')
+
+    def __init__(self, accuracy=0.01):
+        assert 0 < accuracy < 1
+        self.count = 0
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.zeroes = 0
+        self.buckets = Counter()
+
+    def __len__(self):
+        return self.count
+
+    def add(self, value):
+        assert value >= 0
+        self.count += 1
+        if value <= MIN_VALUE:
+            self.zeroes += 1
+        else:
+            self.buckets[
+                int(math.ceil(math.log(value) / self.log_gamma))] += 1
+
+    def value_at_rank(self, k):
+        """Returns an approximation to sorted(values)[k], where values is
+        everything that has been added to this sketch."""
+        if k < 0:
+            k += self.count
+        if not (0 <= k < self.count):
+            raise IndexError('Rank %d out of range for %d values' % (
+                k, self.count))
+        if k < self.zeroes:
+            return 0.0
+        k -= self.zeroes
+        for i in sorted(self.buckets):
+            k -= self.buckets[i]
+            if k < 0:
+                return 2 * self.gamma ** i / (self.gamma + 1)
+        assert False, 'unreachable'  # pragma: no cover
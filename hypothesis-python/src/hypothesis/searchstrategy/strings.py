@@ -19,11 +19,14 @@ from __future__ import division, print_function, absolute_import
 
 from hypothesis.errors import InvalidArgument
 from hypothesis.internal import charmap
-from hypothesis.internal.compat import hunichr, text_type, binary_type
+from hypothesis.internal.compat import hrange, hunichr, text_type, \
+    bit_length, binary_type, int_from_bytes
+from hypothesis.searchstrategy.lazy import unwrap_strategies
 from hypothesis.internal.intervalsets import IntervalSet
 from hypothesis.internal.conjecture.utils import integer_range
 from hypothesis.searchstrategy.strategies import SearchStrategy, \
     MappedSearchStrategy
+from hypothesis.searchstrategy.collections import ListStrategy
 
 
 class OneCharStringStrategy(SearchStrategy):
@@ -69,6 +72,9 @@ class OneCharStringStrategy(SearchStrategy):
         else:
             self.whitelist_characters = set()
         self.zero_point = self.intervals.index_above(ord('0'))
+        # The number of bytes that draw_text uses for each character.
+        self.block_size = (
+            bit_length(len(self.intervals) - 1) + 7) // 8 or 1
 
     def do_draw(self, data):
         i = integer_range(
@@ -77,6 +83,42 @@ class OneCharStringStrategy(SearchStrategy):
         )
         return hunichr(self.intervals[i])
 
+    def draw_text(self, data, n):
+        """Returns a string of n characters, drawn all at once.
+
+        Each character is a block of block_size bytes, read as a number
+        that we map to our alphabet by zigzagging outwards from the
+        character that do_draw shrinks towards, so that shrinking a block
+        moves its character towards that one from either side.
+        """
+        size = len(self.intervals)
+        buf = data.draw_blocks((self.block_size,), n)
+        if self.block_size == 1:
+            values = bytearray(buf)
+        else:
+            values = [
+                int_from_bytes(buf[i:i + self.block_size])
+                for i in hrange(0, len(buf), self.block_size)
+            ]
+        zero_point = self.zero_point
+        intervals = self.intervals
+        # The number of characters that we can zigzag over before we run out
+        # on one side and carry on through the other.
+        below = zero_point
+        above = size - 1 - zero_point
+        both = 2 * min(below, above)
+        direction = 1 if above > below else -1
+
+        def index(u):
+            u %= size
+            if u <= both:
+                if u % 2:
+                    return zero_point + (u + 1) // 2
+                return zero_point - u // 2
+            return zero_point + direction * (u - both // 2)
+
+        return u''.join([hunichr(intervals[index(u)]) for u in values])
+
 
 class StringStrategy(MappedSearchStrategy):
     """A strategy for text strings, defined in terms of a strategy for lists of
@@ -93,6 +135,17 @@ class StringStrategy(MappedSearchStrategy):
     def pack(self, ls):
         return u''.join(ls)
 
+    def do_draw(self, data):
+        # Strings of a fixed length from characters() can be drawn in one go,
+        # as there is no need to decide when to stop between characters.
+        lists = unwrap_strategies(self.mapped_strategy)
+        if isinstance(lists, ListStrategy) and \
+                lists.min_size == lists.max_size:
+            elements = unwrap_strategies(lists.element_strategy)
+            if isinstance(elements, OneCharStringStrategy):
+                return elements.draw_text(data, lists.min_size)
+        return super(StringStrategy, self).do_draw(data)
+
 
 class BinaryStringStrategy(MappedSearchStrategy):
     """A strategy for strings of bytes, defined in terms of a strategy for
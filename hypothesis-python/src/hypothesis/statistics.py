@@ -19,6 +19,7 @@ from __future__ import division, print_function, absolute_import
 
 import math
 
+from hypothesis.internal.cache import cache_statistics
 from hypothesis.utils.dynamicvariables import DynamicVariable
 from hypothesis.internal.conjecture.data import Status
 from hypothesis.internal.conjecture.engine import ExitReason
@@ -29,28 +30,22 @@ collector = DynamicVariable(None)
 class Statistics(object):
 
     def __init__(self, engine):
-        self.passing_examples = len(
-            engine.status_runtimes.get(Status.VALID, ()))
-        self.invalid_examples = len(
-            engine.status_runtimes.get(Status.INVALID, []) +
-            engine.status_runtimes.get(Status.OVERRUN, [])
+        self.passing_examples = engine.status_counts[Status.VALID]
+        self.invalid_examples = (
+            engine.status_counts[Status.INVALID] +
+            engine.status_counts[Status.OVERRUN]
         )
-        self.failing_examples = len(engine.status_runtimes.get(
-            Status.INTERESTING, ()))
+        self.failing_examples = engine.status_counts[Status.INTERESTING]
 
-        runtimes = sorted(
-            engine.status_runtimes.get(Status.VALID, []) +
-            engine.status_runtimes.get(Status.INVALID, []) +
-            engine.status_runtimes.get(Status.INTERESTING, [])
-        )
+        runtimes = engine.runtimes
 
         self.has_runs = bool(runtimes)
         if not self.has_runs:
             return
 
         n = max(0, len(runtimes) - 1)
-        lower = int(runtimes[int(math.floor(n * 0.05))] * 1000)
-        upper = int(runtimes[int(math.ceil(n * 0.95))] * 1000)
+        lower = int(runtimes.value_at_rank(int(math.floor(n * 0.05))) * 1000)
+        upper = int(runtimes.value_at_rank(int(math.ceil(n * 0.95))) * 1000)
         if upper == 0:
             self.runtimes = '< 1ms'
         elif lower == upper:
@@ -82,8 +77,8 @@ class Statistics(object):
                 engine.event_call_counts.items(), key=lambda x: -x[1])
         ]
 
-        total_runtime = math.fsum(engine.all_runtimes)
-        total_drawtime = math.fsum(engine.all_drawtimes)
+        total_runtime = engine.total_runtime
+        total_drawtime = engine.total_drawtime
 
         if total_drawtime == 0.0:
             self.draw_time_percentage = '~ 0%'
@@ -95,6 +90,27 @@ class Statistics(object):
                 round(draw_time_percentage),)
 
 
+def describe_caches():
+    """Returns a line describing each of the caches that Hypothesis keeps
+    for the life of the process, to help find out where memory is going in
+    long sessions."""
+    lines = []
+    for stats in cache_statistics():
+        if stats.max_size is None:
+            size = '%d entries' % (stats.size,)
+        else:
+            size = '%d/%d entries' % (stats.size, stats.max_size)
+        if stats.hits is None:
+            hit_rate = 'hits not counted'
+        elif stats.hit_rate is None:
+            hit_rate = 'never used'
+        else:
+            hit_rate = '%.2f%% hit rate' % (stats.hit_rate * 100,)
+        lines.append('%s: %s, %s, ~ %d KiB' % (
+            stats.name, size, hit_rate, math.ceil(stats.memory / 1024)))
+    return lines
+
+
 def note_engine_for_statistics(engine):
     callback = collector.value
     if callback is not None:
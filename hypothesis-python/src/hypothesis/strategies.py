@@ -31,7 +31,7 @@ from functools import reduce
 from hypothesis.errors import InvalidArgument, ResolutionFailed
 from hypothesis.control import note, assume, cleanup, current_build_context
 from hypothesis._settings import note_deprecation
-from hypothesis.internal.cache import LRUReusedCache
+from hypothesis.internal.cache import ClockCache, register_cache
 from hypothesis.searchstrategy import SearchStrategy, check_strategy
 from hypothesis.internal.compat import gcd, ceil, floor, hrange, \
     text_type, get_type_hints, getfullargspec, implements_iterator
@@ -137,7 +137,7 @@ def convert_value(v):
     return (type(v), v)
 
 
-STRATEGY_CACHE = LRUReusedCache(1024)
+STRATEGY_CACHE = register_cache('strategies', ClockCache(1024))
 
 
 def cacheable(fn):
@@ -17,13 +17,17 @@
 
 from __future__ import division, print_function, absolute_import
 
+import gc
+import threading
 from random import Random
 
 import pytest
 
 import hypothesis.strategies as st
 from hypothesis import HealthCheck, note, given, assume, example, settings
-from hypothesis.internal.cache import GenericCache, LRUReusedCache
+from hypothesis.internal.cache import CACHES, ClockCache, InternTable, \
+    GenericCache, LRUReusedCache, NestedDictView, set_cache_size, \
+    cache_statistics
 
 
 class LRUCache(GenericCache):
@@ -80,7 +84,8 @@ class RandomCache(GenericCache):
 
 @pytest.mark.parametrize(
     'implementation', [
-        LRUCache, LFUCache, LRUReusedCache, ValueScored, RandomCache
+        LRUCache, LFUCache, LRUReusedCache, ValueScored, RandomCache,
+        ClockCache,
     ]
 )
 @example(writes=[(0, 0), (3, 0), (1, 0), (2, 0), (2, 0), (1, 0)], size=4)
@@ -193,3 +198,121 @@ def test_max_size_cache_ignores():
     x[0] = 1
     with pytest.raises(KeyError):
         x[0]
+
+
+def test_clock_cache_counts_hits_misses_and_evictions():
+    cache = ClockCache(2)
+    cache[0] = 0
+    cache[1] = 1
+    assert cache[0] == 0
+    with pytest.raises(KeyError):
+        cache[2]
+    cache[2] = 2
+    assert (cache.hits, cache.misses, cache.evictions) == (1, 1, 1)
+    assert sorted(cache.entries) == [0, 2]
+
+
+def test_clock_cache_evicts_keys_that_were_never_reused_first():
+    cache = ClockCache(3)
+    for i in range(3):
+        cache[i] = i
+    cache[0]
+    cache[2]
+    cache[3] = 3
+    assert 1 not in cache.entries
+    cache[4] = 4
+    assert sorted(cache.entries) == [2, 3, 4] or sorted(
+        cache.entries) == [0, 3, 4]
+    cache.check_valid()
+
+
+def test_clock_cache_is_safe_to_use_from_many_threads():
+    cache = ClockCache(50)
+    errors = []
+
+    def worker(seed):
+        random = Random(seed)
+        try:
+            for _ in range(2000):
+                k = random.randrange(0, 100)
+                try:
+                    assert cache[k] == -k
+                except KeyError:
+                    cache[k] = -k
+        except Exception as e:  # pragma: no cover
+            errors.append(e)
+
+    threads = [
+        threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    cache.check_valid()
+    assert len(cache) == 50
+
+
+def test_resizing_a_clock_cache_evicts_down_to_the_new_size():
+    cache = ClockCache(10)
+    for i in range(10):
+        cache[i] = i
+    for i in range(0, 10, 2):
+        cache[i]
+    cache.resize(5)
+    cache.check_valid()
+    assert sorted(cache.entries) == [0, 2, 4, 6, 8]
+    assert cache.evictions == 5
+    cache[10] = 10
+    cache.check_valid()
+    assert len(cache) == 5
+
+
+class Interned(object):
+
+    def __init__(self, key):
+        self.key = key
+
+
+def test_intern_table_only_keeps_objects_in_use():
+    table = InternTable(Interned)
+    x = table[1]
+    assert table[1] is x
+    assert (table.hits, table.misses) == (1, 1)
+    assert len(table) == 1
+    assert table.estimated_memory() > 0
+    del x
+    gc.collect()
+    assert len(table) == 0
+
+
+def test_nested_dict_view_counts_entries_at_the_bottom_level():
+    table = {'a': {1: {2: 'x', 3: 'y'}}, 'b': {4: {5: 'z'}}}
+    view = NestedDictView(table, 3)
+    assert len(view) == view.misses == 3
+    assert view.hits is None
+    assert view.max_size is None
+    assert view.estimated_memory() > 0
+
+
+def test_reports_statistics_for_registered_caches():
+    stats = {s.name: s for s in cache_statistics()}
+    assert set(stats) == set(CACHES)
+    assert stats['strategies'].max_size == 1024
+    assert stats['arcs'].max_size is None
+    for s in stats.values():
+        assert s.size >= 0
+        assert s.memory > 0
+        assert s.hit_rate is None or 0 <= s.hit_rate <= 1
+
+
+def test_can_only_set_the_size_of_bounded_caches():
+    cache = CACHES['pretty file names']
+    try:
+        set_cache_size('pretty file names', 1)
+        assert cache.max_size == 1
+        assert len(cache) <= 1
+    finally:
+        set_cache_size('pretty file names', 1024)
+    with pytest.raises(ValueError):
+        set_cache_size('arcs', 10)
@@ -0,0 +1,312 @@
+# coding=utf-8
+#
+# This file is part of Hypothesis, which may be found at
+# https://github.com/HypothesisWorks/hypothesis-python
+#
+# Most of this work is copyright (C) 2013-2018 David R. MacIver
+# (david@drmaciver.com), but it contains contributions by others. See
+# CONTRIBUTING.rst for a full list of people who may hold copyright, and
+# consult the git log if you need to determine who owns an individual
+# contribution.
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+#
+# END HEADER
+
+from __future__ import division, print_function, absolute_import
+
+from random import Random
+
+import pytest
+
+from hypothesis import given
+from hypothesis import strategies as st
+from hypothesis.errors import StopTest
+from hypothesis.internal.compat import hbytes, hrange
+from hypothesis.internal.conjecture.data import Status, ConjectureData
+from hypothesis.internal.conjecture.datatree import DataTree, \
+    common_prefix_length
+
+
+def run(tree, f, buffer):
+    data = ConjectureData.for_buffer(buffer)
+    try:
+        f(data)
+    except StopTest:
+        pass
+    data.freeze()
+    tree.add(data, cap=100)
+    return data
+
+
+def test_single_child_chains_do_not_branch():
+    tree = DataTree()
+    run(tree, lambda data: data.draw_bytes(10), hbytes(10))
+    assert len(tree) == 11
+    node = 0
+    for _ in hrange(10):
+        (b, node), = tree.children(node)
+        assert b == 0
+    assert tree.leaf(node) is not None
+
+
+def test_can_branch_after_a_chain():
+    def f(data):
+        data.draw_bytes(3)
+
+    tree = DataTree()
+    run(tree, f, hbytes([1, 2, 3]))
+    run(tree, f, hbytes([1, 2, 4]))
+    node = tree.child(tree.child(0, 1), 2)
+    assert sorted(b for b, _ in tree.children(node)) == [3, 4]
+    assert tree.lookup(hbytes([1, 2, 4]), 10).buffer == hbytes([1, 2, 4])
+    assert tree.lookup(hbytes([1, 2, 5]), 10) is None
+
+
+def test_exhausts_capped_bits():
+    tree = DataTree()
+    for i in hrange(4):
+        run(tree, lambda data: data.draw_bits(2), hbytes([i]))
+        assert tree.exhausted == (i == 3)
+
+
+def test_forced_bytes_only_need_one_child():
+    tree = DataTree()
+    run(tree, lambda data: data.write(hbytes([5])), hbytes(1))
+    assert tree.forced(0) == 5
+    assert tree.exhausted
+
+
+def test_only_counts_dead_children_that_are_still_valid():
+    def forced_zero(data):
+        data.write(hbytes([0]))
+        data.draw_bits(1)
+
+    tree = DataTree()
+    run(tree, lambda data: data.draw_bits(8), hbytes([1]))
+    run(tree, forced_zero, hbytes([0, 0]))
+    assert tree.forced(0) == 0
+    run(tree, lambda data: data.draw_bits(8), hbytes([2]))
+    assert not tree.exhausted
+    run(tree, forced_zero, hbytes([0, 1]))
+    assert tree.exhausted
+
+
+def test_counts_dead_children_again_when_a_byte_is_forced_differently():
+    def forced(c):
+        def f(data):
+            data.write(hbytes([c]))
+            data.draw_bits(1)
+        return f
+
+    tree = DataTree()
+    run(tree, forced(1), hbytes([1, 0]))
+    run(tree, forced(2), hbytes([2, 0]))
+    run(tree, forced(2), hbytes([2, 1]))
+    assert tree.forced(0) == 2
+    assert tree.exhausted
+    tree = DataTree()
+    run(tree, forced(1), hbytes([1, 0]))
+    run(tree, forced(2), hbytes([2, 0]))
+    run(tree, forced(1), hbytes([1, 1]))
+    assert tree.forced(0) == 1
+    assert tree.exhausted
+
+
+def test_counts_dead_children_again_when_a_byte_is_capped_lower():
+    tree = DataTree()
+    run(tree, lambda data: data.draw_bits(2), hbytes([2]))
+    run(tree, lambda data: data.draw_bits(2), hbytes([3]))
+    run(tree, lambda data: data.draw_bits(1), hbytes([0]))
+    assert tree.capped(0) == 1
+    assert not tree.exhausted
+    run(tree, lambda data: data.draw_bits(1), hbytes([1]))
+    assert tree.exhausted
+
+
+def test_rejects_buffers_too_short_for_a_block():
+    tree = DataTree()
+    data = run(tree, lambda data: data.draw_bytes(4), hbytes(2))
+    assert data.status == Status.OVERRUN
+    assert not tree.rejects(hbytes(4))
+    run(tree, lambda data: data.draw_bytes(4), hbytes(4))
+    assert tree.rejects(hbytes(3))
+    assert tree.rejects(hbytes(4))
+    assert not tree.rejects(hbytes([0, 0, 0, 1]))
+
+
+@given(st.integers(0, 2 ** 32))
+def test_novel_prefixes_are_novel(seed):
+    def f(data):
+        data.draw_bits(3)
+
+    tree = DataTree()
+    seen = set()
+    while not tree.exhausted:
+        prefix = tree.generate_novel_prefix(Random(seed), cap=100)
+        assert prefix not in seen
+        seen.add(prefix)
+        run(tree, f, prefix)
+    assert len(seen) == 8
+
+
+def test_lookup_follows_forced_bytes_and_pads_with_zeroes():
+    def f(data):
+        data.write(hbytes([1]))
+        data.draw_bytes(2)
+
+    tree = DataTree()
+    run(tree, f, hbytes([1, 2, 0]))
+    assert tree.lookup(hbytes([7, 2]), 3).buffer == hbytes([1, 2, 0])
+    assert tree.lookup(hbytes([7, 2]), 2) is None
+
+
+@given(st.lists(st.binary(min_size=8, max_size=8), min_size=1, max_size=5))
+def test_lookup_finds_everything_added(buffers):
+    tree = DataTree()
+    for buffer in buffers:
+        run(tree, lambda data: data.draw_bytes(8), buffer)
+    for buffer in buffers:
+        assert tree.lookup(buffer, 8).buffer == buffer
+        assert tree.rejects(buffer)
+
+
+def test_exhaustion_propagates_through_several_levels():
+    def f(data):
+        data.draw_bits(1)
+        data.write(hbytes([3]))
+        data.draw_bits(1)
+
+    tree = DataTree()
+    buffers = [hbytes([a, 3, b]) for a in hrange(2) for b in hrange(2)]
+    for i, buffer in enumerate(buffers):
+        assert not tree.exhausted
+        run(tree, f, buffer)
+        assert tree.is_dead(tree.child(0, buffer[0])) == (i % 2 == 1)
+    assert tree.exhausted
+
+
+def test_nodes_past_the_cap_are_dead():
+    tree = DataTree()
+    data = ConjectureData.for_buffer(hbytes(3))
+    data.draw_bits(1)
+    data.draw_bytes(2)
+    data.freeze()
+    tree.add(data, cap=1)
+    node = tree.child(0, 0)
+    assert tree.is_dead(node)
+    assert not tree.exhausted
+    assert tree.generate_novel_prefix(Random(0), cap=1) == hbytes([1])
+
+
+def varied(data):
+    n = data.draw_bits(2)
+    for _ in hrange(n):
+        if data.draw_bits(1):
+            data.write(hbytes([3]))
+        data.draw_bits(3)
+    data.draw_bytes(1)
+
+
+@pytest.mark.parametrize('seed', hrange(20))
+def test_near_does_not_change_the_answer(seed):
+    rnd = Random(seed)
+    tree = DataTree()
+    near = hbytes(rnd.randint(0, 7) for _ in hrange(8))
+    for _ in hrange(10):
+        buffer = hbytes(
+            b if rnd.random() < 0.7 else rnd.randint(0, 7) for b in near
+        )[:rnd.randint(0, 8)]
+        assert tree.rejects(buffer, near) == tree.rejects(buffer)
+        looked_up = tree.lookup(buffer, 8, near)
+        expected = tree.lookup(buffer, 8)
+        assert (looked_up is None) == (expected is None)
+        if expected is not None:
+            assert looked_up.buffer == expected.buffer
+        run(tree, varied, buffer)
+        if rnd.random() < 0.2:
+            near = buffer
+
+
+def test_common_prefix_length():
+    assert common_prefix_length(b'abcd', b'abce', 10) == 3
+    assert common_prefix_length(b'abcd', b'abcd', 10) == 4
+    assert common_prefix_length(b'abcd', b'abcd', 2) == 2
+    assert common_prefix_length(b'abcd', b'ab', 10) == 2
+    assert common_prefix_length(b'abcd', b'xbcd', 10) == 0
+
+
+def test_near_notices_changes_to_the_shared_prefix():
+    def f(data):
+        for _ in hrange(3):
+            data.draw_bits(8)
+
+    tree = DataTree()
+    near = hbytes([0, 0, 0])
+    run(tree, f, near)
+    assert not tree.rejects(hbytes([0, 0, 1]), near)
+    data = ConjectureData.for_buffer(hbytes([0, 1, 0]))
+    f(data)
+    data.freeze()
+    tree.add(data, cap=1)
+    assert tree.rejects(hbytes([0, 0, 1]))
+    assert tree.rejects(hbytes([0, 0, 1]), near)
+
+
+def test_evicts_results_but_keeps_their_status():
+    def f(data):
+        if data.draw_bits(8) == 0:
+            data.mark_invalid()
+
+    tree = DataTree(leaf_budget=1000)
+    for i in hrange(10):
+        run(tree, f, hbytes([i]))
+    assert tree.lookup(hbytes([9]), 10).buffer == hbytes([9])
+    assert tree.lookup(hbytes([0]), 10) is None
+    node = tree.child(0, 0)
+    assert tree.leaf(node) is None
+    assert tree.status(node) == Status.INVALID
+    assert tree.status(tree.child(0, 1)) == Status.VALID
+    assert tree.rejects(hbytes([0]))
+
+
+def two_bits_then_maybe_forced(data):
+    if data.draw_bits(2) == 3:
+        data.write(hbytes([7]))
+    else:
+        data.draw_bits(1)
+
+
+@pytest.mark.parametrize('seed', hrange(10))
+def test_dumped_trees_load_with_the_same_dead_nodes(seed):
+    rnd = Random(seed)
+    buffers = [hbytes([a, b]) for a in hrange(4) for b in hrange(2)]
+    buffers[-2:] = [hbytes([3, 7])]
+    tree = DataTree()
+    for buffer in rnd.sample(buffers, rnd.randint(0, len(buffers))):
+        run(tree, two_bits_then_maybe_forced, buffer)
+    loaded = DataTree()
+    loaded.load(tree.dump(max_nodes=100))
+    assert loaded.exhausted == tree.exhausted
+    for buffer in buffers:
+        assert loaded.rejects(buffer) == tree.rejects(buffer)
+        assert loaded.lookup(buffer, 2) is None
+    if not loaded.exhausted:
+        prefix = loaded.generate_novel_prefix(rnd, cap=100)
+        assert not tree.rejects(prefix + hbytes(2 - len(prefix)))
+
+
+def test_does_not_dump_trees_that_are_too_large():
+    tree = DataTree()
+    run(tree, lambda data: data.draw_bytes(10), hbytes(10))
+    assert tree.dump(max_nodes=10) is None
+    assert tree.dump(max_nodes=11) is not None
+
+
+@pytest.mark.parametrize(
+    'serialized', [b'', b'\x01\xff\x00', b'\x03', b'\x00\x00'])
+def test_loading_invalid_trees_is_an_error(serialized):
+    with pytest.raises(ValueError):
+        DataTree().load(serialized)
@@ -27,14 +27,17 @@ import pytest
 from hypothesis import Phase, Verbosity, HealthCheck, settings, unlimited
 from hypothesis.errors import FailedHealthCheck
 from tests.common.utils import all_values, checks_deprecated_behaviour
-from hypothesis.database import ExampleDatabase, InMemoryExampleDatabase
+from hypothesis.database import LazyValue, ExampleDatabase, \
+    InMemoryExampleDatabase, WriteBehindExampleDatabase
 from tests.common.strategies import SLOW, HardToShrink
 from hypothesis.internal.compat import hbytes, hrange, int_from_bytes
 from hypothesis.internal.conjecture.data import MAX_DEPTH, Status, \
     ConjectureData
+from hypothesis.internal.conjecture.pool import can_fork
 from hypothesis.internal.conjecture.utils import calc_label_from_name
-from hypothesis.internal.conjecture.engine import Negated, Shrinker, \
-    RunIsComplete, ConjectureRunner, universal
+from hypothesis.internal.conjecture.engine import Negated, BytePool, \
+    Shrinker, ExitReason, RunIsComplete, ConjectureRunner, sort_key, \
+    universal
 
 MAX_SHRINKS = 1000
 SOME_LABEL = calc_label_from_name('some label')
@@ -375,7 +378,7 @@ def test_fully_exhaust_base(monkeypatch):
     for c in hrange(256):
         runner.cached_test_function([0, c])
 
-    assert 1 in runner.dead
+    assert runner.tree.is_dead(1)
 
     runner.run()
 
@@ -429,6 +432,67 @@ def test_will_shrink_covering_examples():
         assert r not in saved
 
 
+def test_saves_covering_examples_at_the_end_of_each_phase():
+    saved_while_generating = []
+
+    def tagged(data):
+        if data.draw_bits(8) < 10:
+            data.add_tag('small')
+        if runner.call_count > 1:
+            saved_while_generating.append(
+                hbytes([3]) in set(db.fetch(runner.covering_key)))
+
+    db = InMemoryExampleDatabase()
+    db.save(b'stuff', hbytes([3]))
+    runner = ConjectureRunner(tagged, settings=settings(
+        max_examples=10, database=db,
+    ), database_key=b'stuff')
+    runner.run()
+    assert saved_while_generating
+    assert all(saved_while_generating)
+
+
+def test_only_reads_the_saved_examples_it_replays():
+    materialized = []
+
+    class CountingValue(LazyValue):
+        __slots__ = ()
+
+        def materialize(self):
+            materialized.append(self)
+            return LazyValue.materialize(self)
+
+    class CountingDatabase(InMemoryExampleDatabase):
+        def fetch_lazy(self, key):
+            for value in self.fetch(key):
+                yield CountingValue(len(value), value)
+
+    db = CountingDatabase()
+    db.save_many(b'stuff.secondary', [hbytes([i, 1]) for i in range(100)])
+    db.save_many(b'stuff.coverage', [hbytes([i, 2]) for i in range(100)])
+    runner = ConjectureRunner(
+        lambda data: data.draw_bytes(2), settings=settings(
+            max_examples=20, database=db, phases=[Phase.reuse],
+        ), database_key=b'stuff')
+    runner.run()
+    assert runner.call_count == len(materialized) == 2
+
+
+def test_writes_to_the_database_have_been_made_by_the_end_of_the_run():
+    wrapped = InMemoryExampleDatabase()
+    db = WriteBehindExampleDatabase(wrapped)
+
+    def f(data):
+        if data.draw_bits(8) >= 100:
+            data.mark_interesting()
+
+    runner = ConjectureRunner(f, settings=settings(
+        max_examples=100, database=db,
+    ), database_key=b'stuff')
+    runner.run()
+    assert list(wrapped.fetch(b'stuff')) == [hbytes([100])]
+
+
 def test_can_cover_without_a_database_key():
     def tagged(data):
         data.add_tag(0)
@@ -970,8 +1034,8 @@ def test_exhaustive_enumeration(prefix, bits, seed):
             assert data.status == Status.VALID
             node = 0
             for b in data.buffer:
-                node = runner.tree[node][b]
-            assert node in runner.dead
+                node = runner.tree.child(node, b)
+            assert runner.tree.is_dead(node)
     assert len(seen) == size
 
 
@@ -1302,3 +1366,218 @@ def test_handle_empty_draws(monkeypatch):
                 break
         data.mark_interesting()
     assert x == hbytes([0])
+
+
+def run_in_parallel(f, **kwargs):
+    runner = ConjectureRunner(f, settings=settings(
+        database=None, workers=2, suppress_health_check=HealthCheck.all(),
+        **kwargs
+    ), random=Random(0))
+    runner.run()
+    return runner
+
+
+@pytest.mark.skipif(not can_fork(), reason='Requires os.fork')
+def test_parallel_generation_is_deterministic():
+    def f(data):
+        if data.draw_bits(16) >= 60000:
+            data.mark_interesting()
+
+    results = []
+    for _ in hrange(2):
+        runner = run_in_parallel(
+            f, max_examples=1000, phases=[Phase.generate])
+        results.append((
+            runner.call_count,
+            [d.buffer for d in runner.interesting_examples.values()],
+        ))
+    assert results[0] == results[1]
+    assert results[0][1]
+
+
+@pytest.mark.skipif(not can_fork(), reason='Requires os.fork')
+def test_parallel_generation_exhausts_small_spaces():
+    runner = run_in_parallel(lambda data: data.draw_bits(3))
+    assert runner.exit_reason == ExitReason.finished
+    assert len(runner.tree) == 2 ** 3 + 1
+    assert runner.tree.exhausted
+
+
+@pytest.mark.skipif(not can_fork(), reason='Requires os.fork')
+def test_parallel_generation_reruns_interesting_examples_in_parent():
+    parent_calls = []
+
+    def f(data):
+        if data.draw_bits(8) >= 128:
+            parent_calls.append(hbytes(data.buffer))
+            data.mark_interesting()
+
+    runner = run_in_parallel(f, phases=[Phase.generate])
+    data, = runner.interesting_examples.values()
+    # Examples that were only ever run in a worker can't have updated
+    # parent_calls, so everything here was an interesting example rerun by
+    # the parent.
+    assert parent_calls
+    assert data.buffer == min(parent_calls)
+
+
+@pytest.mark.skipif(not can_fork(), reason='Requires os.fork')
+def test_parallel_generation_and_shrinking_agree_with_sequential():
+    def f(data):
+        if sum(data.draw_bytes(4)) >= 300:
+            data.mark_interesting()
+
+    runner = run_in_parallel(f)
+    data, = runner.interesting_examples.values()
+    assert data.buffer == hbytes([0, 0, 45, 255])
+
+
+def test_testing_buffers_in_parallel_without_a_pool_does_nothing():
+    runner = ConjectureRunner(lambda data: None, settings=settings(
+        database=None))
+    buffers = [hbytes([1]), hbytes([2])]
+    assert runner.test_buffers_in_parallel(buffers) == buffers
+    assert runner.call_count == 0
+
+
+@pytest.mark.skipif(not can_fork(), reason='Requires os.fork')
+@pytest.mark.parametrize('workers', [1, 2, 4])
+def test_parallel_shrinking_of_lists_agrees_with_sequential(workers):
+    def f(data):
+        xs = []
+        while data.draw_bits(8) > 0:
+            xs.append(data.draw_bits(8))
+        if len(xs) >= 3 and sum(xs) >= 500:
+            data.mark_interesting()
+
+    runner = ConjectureRunner(f, settings=settings(
+        database=None, workers=workers, phases=[Phase.shrink],
+        suppress_health_check=HealthCheck.all(),
+    ), random=Random(0))
+    runner.test_function(ConjectureData.for_buffer(
+        hbytes([1, 200, 7, 100, 1, 3, 9, 250, 1, 255, 1, 17, 0])))
+    runner.run()
+    data, = runner.interesting_examples.values()
+    assert data.buffer == hbytes([1, 0, 1, 245, 1, 255, 0])
+
+
+@pytest.mark.skipif(not can_fork(), reason='Requires os.fork')
+@pytest.mark.parametrize('workers', [2, 4])
+def test_parallel_example_deletion_is_no_worse_than_sequential(
+    monkeypatch, workers
+):
+    monkeypatch.setattr(
+        Shrinker, 'shrink', Shrinker.adaptive_example_deletion)
+
+    def f(data):
+        total = 0
+        while data.draw_bits(8) > 0:
+            total += data.draw_bits(8)
+        if total >= 300:
+            data.mark_interesting()
+
+    buffer = hbytes([
+        1, 5, 1, 200, 1, 3, 1, 100, 1, 9, 1, 250, 1, 17, 1, 80, 0])
+
+    def shrink(workers):
+        runner = ConjectureRunner(f, settings=settings(
+            database=None, workers=workers, phases=[Phase.shrink],
+            suppress_health_check=HealthCheck.all(),
+        ), random=Random(0))
+        runner.test_function(ConjectureData.for_buffer(buffer))
+        runner.run()
+        data, = runner.interesting_examples.values()
+        return data.buffer
+
+    assert sort_key(shrink(workers)) <= sort_key(shrink(1))
+
+
+def test_stops_as_soon_as_a_small_space_is_exhausted():
+    seen = []
+
+    def f(data):
+        seen.append((data.draw_bits(1), data.draw_bits(2)))
+
+    runner = ConjectureRunner(f, settings=settings(
+        database=None, max_examples=1000,
+    ))
+    runner.run()
+    assert runner.exit_reason == ExitReason.finished
+    assert sorted(seen) == [(i, j) for i in hrange(2) for j in hrange(4)]
+
+
+@pytest.mark.parametrize('sizes', [[1] * 100, [3, 4096, 5, 10000, 2]])
+def test_byte_pool_is_deterministic(sizes):
+    results = [
+        [pool.draw(n) for n in sizes]
+        for pool in (BytePool(Random(0)), BytePool(Random(0)))
+    ]
+    assert results[0] == results[1]
+    assert [len(b) for b in results[0]] == sizes
+
+
+def test_random_bytes_follows_changes_to_random():
+    runner = ConjectureRunner(lambda data: None, settings=settings(
+        database=None))
+    runner.random = Random(0)
+    x = runner.random_bytes(8)
+    runner.random = Random(0)
+    assert runner.random_bytes(8) == x
+
+
+def test_generation_is_deterministic_given_a_seed():
+    def generated():
+        seen = []
+
+        def f(data):
+            while data.draw_bits(8):
+                data.draw_bytes(3)
+            seen.append(data.buffer)
+
+        runner = ConjectureRunner(f, settings=settings(
+            database=None, max_examples=50, phases=[Phase.generate],
+        ), random=Random(0))
+        runner.run()
+        return seen
+
+    assert generated() == generated()
+
+
+def test_can_find_and_shrink_with_a_memory_budget():
+    def f(data):
+        n = data.draw_bits(8)
+        data.draw_bytes(n)
+        if n >= 10:
+            data.mark_interesting()
+
+    runner = ConjectureRunner(f, settings=settings(
+        max_examples=500, database=None, memory_budget=2000))
+    runner.run()
+    v, = runner.interesting_examples.values()
+    assert v.buffer == hbytes([10]) + hbytes(10)
+    assert sum(runner.status_counts.values()) == runner.call_count
+    assert len(runner.runtimes) <= runner.call_count
+
+
+def test_remembers_explored_trees_between_runs():
+    db = InMemoryExampleDatabase()
+
+    def runner(fingerprint, fail=False):
+        def f(data):
+            if data.draw_bits(3) == 7 and fail:
+                data.mark_interesting()
+        result = ConjectureRunner(f, settings=settings(
+            database=db, remember_explored=True,
+        ), database_key=b'stuff', fingerprint=fingerprint)
+        result.run()
+        return result
+
+    first = runner(b'a')
+    assert first.exit_reason == ExitReason.finished
+    assert first.call_count == 8
+    # The tree is already exhausted, so we stop after the first example.
+    assert runner(b'a').call_count == 1
+    assert runner(b'b').call_count == 8
+    # Nothing is saved from a failing run, so the next run starts afresh.
+    assert runner(b'c', fail=True).interesting_examples
+    assert runner(b'c').call_count >= 8
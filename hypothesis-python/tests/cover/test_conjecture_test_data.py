@@ -22,8 +22,9 @@ import pytest
 from hypothesis import given
 from hypothesis import strategies as st
 from hypothesis.errors import Frozen
-from hypothesis.internal.conjecture.data import Status, StopTest, \
-    ConjectureData
+from hypothesis.internal.compat import hbytes
+from hypothesis.internal.conjecture.data import DRAW_BYTES_LABEL, \
+    DRAW_BLOCKS_LABEL, Status, StopTest, ConjectureData, ConjectureResult
 from hypothesis.searchstrategy.strategies import SearchStrategy
 
 
@@ -55,6 +56,32 @@ def test_can_draw_zero_bytes():
         assert x.draw_bytes(0) == b''
 
 
+def test_draws_many_blocks_at_once():
+    x = ConjectureData.for_buffer(hbytes(range(10)))
+    assert x.draw_blocks((1, 2, 0), 3) == hbytes(range(9))
+    assert x.draw_blocks((1,), 0) == b''
+    assert x.blocks == [
+        (0, 1), (1, 3), (3, 4), (4, 6), (6, 7), (7, 9)]
+    assert x.block_starts == {1: [0, 3, 6], 2: [1, 4, 7]}
+    assert x.index == 9
+
+
+def test_draws_each_run_of_blocks_as_an_example():
+    x = ConjectureData.for_buffer(hbytes(range(8)))
+    x.draw_blocks((1, 2), 2)
+    x.draw_blocks((1,), 2)
+    x.freeze()
+    assert [
+        (ex.label, ex.start, ex.end) for ex in x.examples
+        if ex.label in (DRAW_BLOCKS_LABEL, DRAW_BYTES_LABEL)
+    ] == [
+        (DRAW_BLOCKS_LABEL, 0, 3), (DRAW_BYTES_LABEL, 0, 1),
+        (DRAW_BYTES_LABEL, 1, 3), (DRAW_BLOCKS_LABEL, 3, 6),
+        (DRAW_BYTES_LABEL, 3, 4), (DRAW_BYTES_LABEL, 4, 6),
+        (DRAW_BYTES_LABEL, 6, 7), (DRAW_BYTES_LABEL, 7, 8),
+    ]
+
+
 def test_draw_past_end_sets_overflow():
     x = ConjectureData.for_buffer(bytes(5))
     with pytest.raises(StopTest) as e:
@@ -126,3 +153,29 @@ def test_empty_discards_do_not_count():
     x.stop_example(discard=True)
     x.freeze()
     assert not x.has_discards
+
+
+@given(st.lists(st.integers(0, 3)))
+def test_result_has_the_same_examples_and_blocks(sizes):
+    x = ConjectureData.for_buffer(hbytes(sum(sizes) + len(sizes)))
+    for i, n in enumerate(sizes):
+        x.start_example(label=i % 3)
+        x.draw_bits(1)
+        x.draw_bytes(n)
+        x.stop_example(discard=n == 1)
+    x.freeze()
+    result = x.as_result()
+    assert isinstance(result, ConjectureResult)
+    assert result.buffer == x.buffer
+    assert list(result.examples) == x.examples
+    assert list(result.blocks) == x.blocks
+    if x.blocks:
+        assert result.blocks[-1] == x.blocks[-1]
+    assert x.as_result() is result
+
+
+def test_only_unknown_attributes_go_in_the_instance_dict():
+    x = ConjectureData.for_buffer(b'')
+    x.hypothesis_runner = None
+    x.some_plugin_state = 1
+    assert x.__dict__ == {'some_plugin_state': 1}
@@ -0,0 +1,195 @@
+# coding=utf-8
+#
+# This file is part of Hypothesis, which may be found at
+# https://github.com/HypothesisWorks/hypothesis-python
+#
+# Most of this work is copyright (C) 2013-2018 David R. MacIver
+# (david@drmaciver.com), but it contains contributions by others. See
+# CONTRIBUTING.rst for a full list of people who may hold copyright, and
+# consult the git log if you need to determine who owns an individual
+# contribution.
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+#
+# END HEADER
+
+from __future__ import division, print_function, absolute_import
+
+import pytest
+
+import hypothesis.internal.conjecture.engine as engine_module
+from hypothesis import settings
+from hypothesis.__main__ import main
+from hypothesis.database import InMemoryExampleDatabase, \
+    DirectoryBasedExampleDatabase
+from hypothesis.internal.compat import hbytes, int_to_bytes
+from hypothesis.internal.conjecture.corpus import Usage, CorpusManager, \
+    LeastRecentlyUsed, LeastFrequentlyUsed, usage_key, collect_garbage
+from hypothesis.internal.conjecture.engine import ConjectureRunner
+
+
+def values(n):
+    return [int_to_bytes(i, 2) for i in range(n)]
+
+
+def test_evicts_least_recently_used_values():
+    db = InMemoryExampleDatabase()
+    db.save_many(b'a.secondary', values(10))
+    manager = CorpusManager(db, now=1)
+    manager.record_use(b'a.secondary', values(10))
+    manager.save()
+    manager = CorpusManager(db, now=2)
+    manager.record_use(b'a.secondary', values(10)[3:6])
+    manager.save()
+    assert CorpusManager(db, max_corpus_size=3, now=3).collect(
+        [b'a.secondary', b'b.secondary']) == 7
+    assert sorted(db.fetch(b'a.secondary')) == values(10)[3:6]
+    assert len(list(db.fetch(usage_key(b'a.secondary')))) == 3
+
+
+def test_evicts_least_frequently_used_values():
+    db = InMemoryExampleDatabase()
+    db.save_many(b'a.secondary', values(4))
+    for i in range(4):
+        manager = CorpusManager(db, now=i)
+        manager.record_use(b'a.secondary', values(4)[:4 - i])
+        manager.save()
+    CorpusManager(
+        db, policy=LeastFrequentlyUsed, max_corpus_size=2, now=5
+    ).collect([b'a.secondary'])
+    assert sorted(db.fetch(b'a.secondary')) == values(2)
+
+
+def test_untracked_values_count_as_just_used():
+    db = InMemoryExampleDatabase()
+    db.save_many(b'a.secondary', values(3))
+    manager = CorpusManager(db, now=1)
+    manager.record_use(b'a.secondary', values(3))
+    manager.save()
+    db.save(b'a.secondary', b'new')
+    CorpusManager(db, max_corpus_size=2, now=2).collect([b'a.secondary'])
+    assert b'new' in list(db.fetch(b'a.secondary'))
+
+
+def test_enforces_a_global_budget_and_deletes_stale_records():
+    db = InMemoryExampleDatabase()
+    db.save_many(b'a.secondary', values(3))
+    db.save_many(b'b.coverage', values(3))
+    manager = CorpusManager(db, now=1)
+    manager.record_use(b'a.secondary', values(3))
+    manager.save()
+    assert CorpusManager(db, max_size=4, now=2).collect(
+        [b'a.secondary', b'b.coverage']) == 2
+    assert len(list(db.fetch(b'a.secondary'))) == 1
+    assert len(list(db.fetch(b'a.secondary.usage'))) == 1
+    assert len(list(db.fetch(b'b.coverage'))) == 3
+
+
+def test_does_not_track_corpora_that_are_within_budget():
+    db = InMemoryExampleDatabase()
+    db.save_many(b'a.secondary', values(3))
+    assert CorpusManager(db).collect([b'a.secondary']) == 0
+    assert list(db.fetch(usage_key(b'a.secondary'))) == []
+
+
+def test_ignores_bad_usage_records():
+    db = InMemoryExampleDatabase()
+    db.save(b'a.secondary', b'a')
+    db.save(usage_key(b'a.secondary'), b'nonsense')
+    CorpusManager(db, max_corpus_size=0).collect([b'a.secondary'])
+    assert list(db.fetch(b'a.secondary')) == []
+    assert list(db.fetch(usage_key(b'a.secondary'))) == []
+
+
+def test_policy_evicts_in_order_of_score():
+    policy = LeastRecentlyUsed(2)
+    assert policy.evict([
+        (b'a', b'b', Usage(1, 2)),
+        (b'a', b'c', Usage(1, 1)),
+        (b'a', b'd', Usage(2)),
+    ]) == [(b'a', b'c')]
+
+
+def test_least_frequently_used_ignores_recency():
+    db = InMemoryExampleDatabase()
+    db.save_many(b'a.secondary', [b'a', b'b'])
+    manager = CorpusManager(db, now=1)
+    manager.record_use(b'a.secondary', [b'a'] * 10)
+    manager.save()
+    manager = CorpusManager(db, now=2)
+    manager.record_use(b'a.secondary', [b'b'])
+    manager.save()
+    CorpusManager(
+        db, policy=LeastFrequentlyUsed, max_corpus_size=1, now=3
+    ).collect([b'a.secondary'])
+    assert list(db.fetch(b'a.secondary')) == [b'a']
+
+
+def test_garbage_collection_only_touches_extra_corpora(tmpdir):
+    db = DirectoryBasedExampleDatabase(str(tmpdir))
+    db.save_many(b'a', values(3))
+    db.save_many(b'a.secondary', values(3))
+    db.save(b'gone.secondary.usage', b'x')
+    assert collect_garbage(db, max_corpus_size=1) == 2
+    assert len(list(db.fetch(b'a'))) == 3
+    assert len(list(db.fetch(b'a.secondary'))) == 1
+    assert list(db.fetch(b'gone.secondary.usage')) == []
+
+
+def test_gc_command(tmpdir, capsys):
+    path = str(tmpdir.join('examples'))
+    db = DirectoryBasedExampleDatabase(path)
+    db.save_many(b'a.coverage', values(5))
+    assert main([
+        'db', 'gc', '--database', path, '--max-corpus-size', '2',
+        '--policy', 'lfu',
+    ]) == 0
+    assert 'Deleted 3 examples' in capsys.readouterr()[0]
+    assert len(list(db.fetch(b'a.coverage'))) == 2
+
+
+def test_gc_command_needs_a_subcommand(capsys):
+    assert main(['db']) == 2
+
+
+def test_engine_trims_extra_corpora_over_budget(monkeypatch):
+    monkeypatch.setattr(engine_module, 'MAX_CORPUS_SIZE', 5)
+    db = InMemoryExampleDatabase()
+    key = b'stuff'
+
+    def f(data):
+        data.draw_bytes(2)
+
+    runner = ConjectureRunner(
+        f, settings=settings(max_examples=10, database=db), database_key=key)
+    db.save_many(runner.secondary_key, values(20))
+    runner.run()
+    secondary = list(db.fetch(runner.secondary_key))
+    assert len(secondary) == 5
+    assert len(list(db.fetch(usage_key(runner.secondary_key)))) == 5
+
+
+def test_engine_records_use_of_sampled_examples_that_still_fail():
+    db = InMemoryExampleDatabase()
+    key = b'stuff'
+
+    def f(data):
+        if data.draw_bytes(2)[0] == 0:
+            data.mark_interesting()
+
+    runner = ConjectureRunner(
+        f, settings=settings(max_examples=10, database=db), database_key=key)
+    db.save_many(runner.secondary_key, values(300))
+    runner.run()
+    usage = list(db.fetch(usage_key(runner.secondary_key)))
+    assert 0 < len(usage) <= 2
+
+
+@pytest.mark.parametrize('max_size', [0, 1])
+def test_can_evict_everything(max_size):
+    db = InMemoryExampleDatabase()
+    db.save_many(b'a.secondary', [hbytes(b'x'), hbytes(b'y')])
+    CorpusManager(db, max_corpus_size=max_size).collect([b'a.secondary'])
+    assert len(list(db.fetch(b'a.secondary'))) == max_size
@@ -17,17 +17,28 @@
 
 from __future__ import division, print_function, absolute_import
 
+import gc
 import os
 import base64
+import sqlite3
+import weakref
+import threading
 
 import pytest
 
-from hypothesis import given, settings
+from hypothesis import given, database, settings
 from tests.common.utils import validate_deprecation, \
     checks_deprecated_behaviour
-from hypothesis.database import ExampleDatabase, SQLiteExampleDatabase, \
-    InMemoryExampleDatabase, DirectoryBasedExampleDatabase
+from hypothesis.database import ExampleDatabase, ExampleDatabaseServer, \
+    RemoteExampleDatabase, SQLiteExampleDatabase, \
+    InMemoryExampleDatabase, CompressedExampleDatabase, \
+    WriteBehindExampleDatabase, LogStructuredExampleDatabase, \
+    DirectoryBasedExampleDatabase
 from hypothesis.strategies import lists, binary, tuples
+from hypothesis.configuration import hypothesis_home_dir, \
+    set_hypothesis_home_dir
+from hypothesis.internal.compat import hbytes, int_to_bytes
+from hypothesis.utils.conventions import not_set
 
 small_settings = settings(max_examples=50)
 
@@ -54,8 +65,8 @@ def test_does_not_commit_in_error_state():
     try:
         with backend.cursor() as cursor:
             cursor.execute("""
-                insert into hypothesis_data_mapping(key, value)
-                values("a", "b")
+                insert into hypothesis_examples(key, value)
+                values(x'61', x'62')
             """)
             raise ValueError()
     except ValueError:
@@ -81,21 +92,52 @@ def test_can_delete_keys():
 
 
 @checks_deprecated_behaviour
-def test_ignores_badly_stored_values():
-    backend = SQLiteExampleDatabase(':memory:')
-    backend.create_db_if_needed()
-    with backend.cursor() as cursor:
-        cursor.execute("""
-            insert into hypothesis_data_mapping(key, value)
-            values(?, ?)
-        """, (base64.b64encode(b'foo'), u'kittens'))
-    assert list(backend.fetch(b'foo')) == []
+def test_moves_values_from_the_old_table_and_ignores_bad_ones(tmpdir):
+    path = str(tmpdir.join('examples.db'))
+    connection = sqlite3.connect(path)
+    connection.execute("""
+        create table hypothesis_data_mapping(
+            key text, value text, unique(key, value)
+        )
+    """)
+    connection.executemany("""
+        insert into hypothesis_data_mapping(key, value) values(?, ?)
+    """, [
+        (base64.b64encode(b'foo'), u'kittens'),
+        (base64.b64encode(b'foo'), base64.b64encode(b'bar')),
+    ])
+    connection.commit()
+    connection.close()
+    backend = SQLiteExampleDatabase(path)
+    assert list(backend.fetch(b'foo')) == [b'bar']
+    backend.close()
+    backend = SQLiteExampleDatabase(path)
+    assert list(backend.fetch(b'foo')) == [b'bar']
 
 
 def test_default_database_is_in_memory():
     assert isinstance(ExampleDatabase(), InMemoryExampleDatabase)
 
 
+def test_default_database_is_shared():
+    assert ExampleDatabase(not_set) is ExampleDatabase(not_set)
+    assert settings(database=not_set).database is \
+        settings(database=not_set).database
+
+
+def test_setting_the_home_directory_replaces_the_default_database(tmpdir):
+    previous_home = hypothesis_home_dir()
+    previous = ExampleDatabase(not_set)
+    try:
+        set_hypothesis_home_dir(str(tmpdir))
+        db = ExampleDatabase(not_set)
+        assert db is not previous
+        assert db.path.startswith(str(tmpdir))
+    finally:
+        set_hypothesis_home_dir(previous_home)
+    assert ExampleDatabase(not_set) is not previous
+
+
 def test_default_on_disk_database_is_dir(tmpdir):
     assert isinstance(
         ExampleDatabase(tmpdir.join('foo')), DirectoryBasedExampleDatabase)
@@ -129,7 +171,9 @@ def test_does_not_error_when_fetching_when_not_exist(tmpdir):
     db.fetch(b'foo')
 
 
-@pytest.fixture(scope='function', params=['memory', 'sql', 'directory'])
+@pytest.fixture(scope='function', params=[
+    'memory', 'sql', 'directory', 'log', 'write_behind', 'remote',
+    'compressed'])
 def exampledatabase(request, tmpdir):
     if request.param == 'memory':
         return ExampleDatabase()
@@ -138,6 +182,19 @@ def exampledatabase(request, tmpdir):
             return SQLiteExampleDatabase(str(tmpdir.join('example.db')))
     if request.param == 'directory':
         return DirectoryBasedExampleDatabase(str(tmpdir.join('examples')))
+    if request.param == 'log':
+        return LogStructuredExampleDatabase(str(tmpdir.join('examples.log')))
+    if request.param == 'write_behind':
+        return WriteBehindExampleDatabase(
+            DirectoryBasedExampleDatabase(str(tmpdir.join('examples'))))
+    if request.param == 'remote':
+        server = ExampleDatabaseServer(
+            DirectoryBasedExampleDatabase(str(tmpdir.join('examples'))))
+        request.addfinalizer(server.close)
+        return RemoteExampleDatabase(server.address, server.authkey)
+    if request.param == 'compressed':
+        return CompressedExampleDatabase(
+            DirectoryBasedExampleDatabase(str(tmpdir.join('examples'))))
     assert False
 
 
@@ -178,6 +235,93 @@ def test_an_absent_value_is_present_after_it_moves_to_self(exampledatabase):
     assert next(exampledatabase.fetch(b'a')) == b'b'
 
 
+def test_save_many_is_like_saving_each_value(exampledatabase):
+    exampledatabase.save(b'a', b'b')
+    exampledatabase.save_many(b'a', [b'b', b'c', b'c', b'd'])
+    exampledatabase.save_many(b'e', [])
+    assert sorted(exampledatabase.fetch(b'a')) == [b'b', b'c', b'd']
+    assert list(exampledatabase.fetch(b'e')) == []
+
+
+def test_delete_many_is_like_deleting_each_value(exampledatabase):
+    exampledatabase.save_many(b'a', [b'b', b'c', b'd'])
+    exampledatabase.delete_many(b'a', [b'b', b'd', b'e'])
+    exampledatabase.delete_many(b'f', [b'b'])
+    assert list(exampledatabase.fetch(b'a')) == [b'c']
+
+
+def test_fetch_many_fetches_every_key(exampledatabase):
+    exampledatabase.save_many(b'a', [b'b', b'c'])
+    exampledatabase.save(b'd', b'b')
+    result = exampledatabase.fetch_many([b'a', b'd', b'e'])
+    assert sorted(result) == [b'a', b'd', b'e']
+    assert sorted(result[b'a']) == [b'b', b'c']
+    assert result[b'd'] == [b'b']
+    assert result[b'e'] == []
+    assert exampledatabase.fetch_many([]) == {}
+
+
+def test_lazy_values_materialize_to_the_saved_values(exampledatabase):
+    exampledatabase.save_many(b'a', [b'', b'bc', b'def'])
+    lazy = list(exampledatabase.fetch_lazy(b'a'))
+    assert sorted(map(len, lazy)) == [0, 2, 3]
+    assert all(len(v.materialize()) == len(v) for v in lazy)
+    assert sorted(v.materialize() for v in lazy) == [b'', b'bc', b'def']
+    result = exampledatabase.fetch_many([b'a', b'g'], lazy=True)
+    assert sorted(v.materialize() for v in result[b'a']) == [
+        b'', b'bc', b'def']
+    assert result[b'g'] == []
+
+
+def test_lazy_values_include_writes_in_a_batch(exampledatabase):
+    exampledatabase.save_many(b'a', [b'b', b'c'])
+    with exampledatabase.batch():
+        exampledatabase.delete(b'a', b'b')
+        exampledatabase.save(b'a', b'd')
+        lazy = list(exampledatabase.fetch_lazy(b'a'))
+        assert sorted(v.materialize() for v in lazy) == [b'c', b'd']
+
+
+def test_writes_in_a_batch_are_visible_inside_it(exampledatabase):
+    exampledatabase.save_many(b'a', [b'b', b'c'])
+    with exampledatabase.batch():
+        exampledatabase.delete(b'a', b'b')
+        exampledatabase.save(b'a', b'd')
+        exampledatabase.save(b'a', b'e')
+        exampledatabase.delete(b'a', b'e')
+        exampledatabase.move(b'a', b'f', b'c')
+        with exampledatabase.batch():
+            exampledatabase.save(b'a', b'g')
+        assert sorted(exampledatabase.fetch(b'a')) == [b'd', b'g']
+        assert list(exampledatabase.fetch(b'f')) == [b'c']
+    assert sorted(exampledatabase.fetch(b'a')) == [b'd', b'g']
+    assert list(exampledatabase.fetch(b'f')) == [b'c']
+
+
+def test_writes_in_a_batch_are_made_on_error(exampledatabase):
+    with pytest.raises(ValueError):
+        with exampledatabase.batch():
+            exampledatabase.save(b'a', b'b')
+            raise ValueError()
+    assert list(exampledatabase.fetch(b'a')) == [b'b']
+
+
+def test_keys_are_listed_once_they_have_values(exampledatabase):
+    exampledatabase.save_many(b'a', [b'b', b'c'])
+    exampledatabase.save(b'd', b'e')
+    exampledatabase.save(b'f', b'g')
+    exampledatabase.delete(b'f', b'g')
+    assert set(exampledatabase.keys()) - {b'f'} == {b'a', b'd'}
+
+
+def test_directory_database_skips_unknown_keys(tmpdir):
+    db = DirectoryBasedExampleDatabase(str(tmpdir))
+    db.save(b'a', b'b')
+    tmpdir.mkdir('0123456789abcdef')
+    tmpdir.join('stray').write('')
+    assert db.keys() == [b'a']
+
+
 def test_two_directory_databases_can_interact(tmpdir):
     path = str(tmpdir)
     db1 = DirectoryBasedExampleDatabase(path)
@@ -197,3 +341,375 @@ def test_can_handle_disappearing_files(tmpdir, monkeypatch):
     monkeypatch.setattr(os, 'listdir',
                         lambda d: base_listdir(d) + ['this-does-not-exist'])
     assert list(db.fetch(b'foo')) == [b'bar']
+
+
+def test_selects_log_structured_if_name_matches(tmpdir):
+    path = str(tmpdir.join('examples.log'))
+    assert isinstance(ExampleDatabase(path), LogStructuredExampleDatabase)
+
+
+def test_two_log_databases_can_interact(tmpdir):
+    path = str(tmpdir.join('examples.log'))
+    db1 = LogStructuredExampleDatabase(path)
+    db2 = LogStructuredExampleDatabase(path)
+    db1.save(b'foo', b'bar')
+    assert list(db2.fetch(b'foo')) == [b'bar']
+    db2.save(b'foo', b'baz')
+    db2.delete(b'foo', b'bar')
+    assert list(db1.fetch(b'foo')) == [b'baz']
+
+
+def test_log_database_ignores_an_incomplete_record(tmpdir):
+    path = str(tmpdir.join('examples.log'))
+    db = LogStructuredExampleDatabase(path)
+    db.save(b'foo', b'bar')
+    db.save(b'foo', b'baz')
+    with open(path, 'rb') as f:
+        data = f.read()
+    with open(path, 'wb') as f:
+        f.write(data[:-1])
+    db = LogStructuredExampleDatabase(path)
+    assert list(db.fetch(b'foo')) == [b'bar']
+    db.save(b'foo', b'qux')
+    assert os.path.getsize(path) == len(data)
+    assert sorted(LogStructuredExampleDatabase(path).fetch(b'foo')) == [
+        b'bar', b'qux']
+
+
+def test_log_database_rejects_other_files(tmpdir):
+    path = tmpdir.join('examples.log')
+    path.write('Not an example database')
+    with pytest.raises(ValueError):
+        list(LogStructuredExampleDatabase(str(path)).fetch(b'foo'))
+
+
+def test_other_log_databases_notice_compaction(tmpdir):
+    path = str(tmpdir.join('examples.log'))
+    db1 = LogStructuredExampleDatabase(path)
+    db2 = LogStructuredExampleDatabase(path)
+    db1.save_many(b'foo', [b'bar', b'baz'])
+    db1.delete(b'foo', b'bar')
+    assert list(db2.fetch(b'foo')) == [b'baz']
+    size = os.path.getsize(path)
+    db1.compact()
+    assert os.path.getsize(path) < size
+    db1.save(b'foo', b'qux')
+    assert sorted(db2.fetch(b'foo')) == [b'baz', b'qux']
+    db2.delete(b'foo', b'baz')
+    assert list(db1.fetch(b'foo')) == [b'qux']
+
+
+def test_log_database_compacts_itself(tmpdir, monkeypatch):
+    monkeypatch.setattr(database, 'LOG_COMPACTION_THRESHOLD', 10)
+    path = str(tmpdir.join('examples.log'))
+    db = LogStructuredExampleDatabase(path)
+    for i in range(100):
+        db.save(b'foo', hbytes([i]))
+        db.delete(b'foo', hbytes([i]))
+    db.save(b'foo', b'bar')
+    assert db.records <= 20
+    assert list(LogStructuredExampleDatabase(path).fetch(b'foo')) == [b'bar']
+
+
+def test_concurrent_log_database_writes_are_not_lost(tmpdir):
+    path = str(tmpdir.join('examples.log'))
+
+    def writer(i):
+        db = LogStructuredExampleDatabase(path)
+        for j in range(50):
+            db.save(b'foo', hbytes([i, j]))
+            if j % 10 == 0:
+                db.compact()
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(list(LogStructuredExampleDatabase(path).fetch(b'foo'))) == 200
+
+
+def test_lazy_value_of_a_deleted_file_is_none(tmpdir):
+    db = DirectoryBasedExampleDatabase(str(tmpdir))
+    db.save(b'foo', b'bar')
+    value, = db.fetch_lazy(b'foo')
+    assert len(value) == 3
+    db.delete(b'foo', b'bar')
+    assert value.materialize() is None
+
+
+def test_lazy_log_values_survive_compaction(tmpdir):
+    path = str(tmpdir.join('examples.log'))
+    db1 = LogStructuredExampleDatabase(path)
+    db2 = LogStructuredExampleDatabase(path)
+    db1.save_many(b'foo', [b'bar', b'baz'])
+    values = list(db2.fetch_lazy(b'foo'))
+    db1.delete(b'foo', b'bar')
+    db1.compact()
+    db1.save(b'foo', b'qux')
+    assert sorted(v.materialize() for v in values) == [b'bar', b'baz']
+    assert sorted(v.materialize() for v in db2.fetch_lazy(b'foo')) == [
+        b'baz', b'qux']
+
+
+def test_log_database_indexes_values_without_copying_them(
+    tmpdir, monkeypatch
+):
+    path = str(tmpdir.join('examples.log'))
+    LogStructuredExampleDatabase(path).save_many(b'foo', [b'bar', b'baz'])
+
+    def fail(self):
+        assert False, 'Indexing should not copy values out of the log'
+    monkeypatch.setattr(database.LazyValue, 'materialize', fail)
+    db = LogStructuredExampleDatabase(path)
+    assert len(list(db.fetch_lazy(b'foo'))) == 2
+
+
+def test_does_not_read_values_that_are_still_being_written(tmpdir):
+    db = DirectoryBasedExampleDatabase(str(tmpdir))
+    db.save(b'foo', b'bar')
+    path = db._value_path(b'foo', b'baz')
+    with open(path + '.0123456789abcdef', 'wb') as o:
+        o.write(b'ba')
+    assert list(db.fetch(b'foo')) == [b'bar']
+    assert [v.materialize() for v in db.fetch_lazy(b'foo')] == [b'bar']
+
+
+def test_directory_database_survives_its_directory_being_deleted(tmpdir):
+    path = tmpdir.join('examples')
+    db = DirectoryBasedExampleDatabase(str(path))
+    db.save(b'foo', b'bar')
+    path.remove()
+    assert list(db.fetch(b'foo')) == []
+    assert list(db.fetch_lazy(b'foo')) == []
+    db.save(b'foo', b'baz')
+    path.remove()
+    db.save_many(b'foo', [b'qux'])
+    assert list(db.fetch(b'foo')) == [b'qux']
+
+
+class BlockingDatabase(InMemoryExampleDatabase):
+
+    def __init__(self):
+        super(BlockingDatabase, self).__init__()
+        self.writing = threading.Event()
+        self.unblocked = threading.Event()
+        self.saves = []
+
+    def save_many(self, key, values):
+        values = sorted(values)
+        self.saves.append(values)
+        self.writing.set()
+        self.unblocked.wait()
+        super(BlockingDatabase, self).save_many(key, values)
+
+
+def test_write_behind_merges_writes_made_while_busy():
+    wrapped = BlockingDatabase()
+    db = WriteBehindExampleDatabase(wrapped)
+    db.save(b'a', b'b')
+    wrapped.writing.wait()
+    db.save(b'a', b'c')
+    db.delete(b'a', b'c')
+    db.move(b'e', b'a', b'd')
+    assert sorted(db.fetch(b'a')) == [b'b', b'd']
+    assert list(wrapped.fetch(b'a')) == []
+    wrapped.unblocked.set()
+    db.flush()
+    assert wrapped.saves == [[b'b'], [b'd']]
+    assert sorted(wrapped.fetch(b'a')) == [b'b', b'd']
+
+
+class BrokenDatabase(InMemoryExampleDatabase):
+    broken = True
+
+    def save_many(self, key, values):
+        if self.broken:
+            raise ValueError()
+        super(BrokenDatabase, self).save_many(key, values)
+
+
+def test_write_behind_raises_write_errors_on_flush():
+    db = WriteBehindExampleDatabase(BrokenDatabase())
+    db.save(b'a', b'b')
+    with pytest.raises(ValueError):
+        db.flush()
+
+
+def test_write_behind_retries_writes_that_failed():
+    wrapped = BrokenDatabase()
+    db = WriteBehindExampleDatabase(wrapped)
+    db.save(b'a', b'b')
+    with pytest.raises(ValueError):
+        db.flush()
+    assert list(db.fetch(b'a')) == [b'b']
+    wrapped.broken = False
+    db.flush()
+    assert list(wrapped.fetch(b'a')) == [b'b']
+
+
+def test_write_behind_database_can_be_garbage_collected():
+    db = WriteBehindExampleDatabase(InMemoryExampleDatabase())
+    ref = weakref.ref(db)
+    del db
+    gc.collect()
+    assert ref() is None
+
+
+@checks_deprecated_behaviour
+def test_sqlite_databases_can_share_a_file(tmpdir):
+    path = str(tmpdir.join('examples.db'))
+    db1 = SQLiteExampleDatabase(path)
+    db2 = SQLiteExampleDatabase(path)
+    with db1.batch():
+        db1.save_many(b'foo', [b'bar', b'baz'])
+        assert list(db2.fetch(b'foo')) == []
+    db2.delete(b'foo', b'bar')
+    assert list(db1.fetch(b'foo')) == [b'baz']
+    mode, = db1.connection().execute('pragma journal_mode').fetchone()
+    assert mode == 'wal'
+
+
+class CountingDatabase(InMemoryExampleDatabase):
+
+    def __init__(self):
+        super(CountingDatabase, self).__init__()
+        self.fetches = 0
+
+    def fetch(self, key):
+        self.fetches += 1
+        return super(CountingDatabase, self).fetch(key)
+
+
+def test_remote_databases_share_writes_and_cached_fetches():
+    backing = CountingDatabase()
+    backing.save(b'a', b'b')
+    server = ExampleDatabaseServer(backing)
+    try:
+        db1 = RemoteExampleDatabase(server.address, server.authkey)
+        db2 = RemoteExampleDatabase(server.address, server.authkey)
+        assert list(db1.fetch(b'a')) == [b'b']
+        db1.save(b'a', b'c')
+        db1.move(b'a', b'd', b'b')
+        db1.flush()
+        assert sorted(db2.fetch(b'a')) == [b'c']
+        assert list(db2.fetch(b'd')) == [b'b']
+        assert sorted(backing.fetch(b'a')) == [b'c']
+        assert backing.fetches == 3
+        db1.close()
+        db2.close()
+    finally:
+        server.close()
+
+
+def test_remote_database_fetches_more_keys_than_the_server_caches(
+    monkeypatch
+):
+    monkeypatch.setattr(database, 'SERVER_CACHE_SIZE', 1)
+    backing = InMemoryExampleDatabase()
+    backing.save(b'a', b'b')
+    backing.save(b'c', b'd')
+    server = ExampleDatabaseServer(backing)
+    try:
+        db = RemoteExampleDatabase(server.address, server.authkey)
+        assert db.fetch_many([b'a', b'c']) == {b'a': [b'b'], b'c': [b'd']}
+        assert len(server.cache) == 1
+        db.close()
+    finally:
+        server.close()
+
+
+def test_remote_database_needs_the_right_authkey():
+    server = ExampleDatabaseServer(InMemoryExampleDatabase())
+    try:
+        db = RemoteExampleDatabase(server.address, b'wrong')
+        with pytest.raises(Exception):
+            db.flush()
+        db = RemoteExampleDatabase(server.address, server.authkey)
+        db.flush()
+    finally:
+        server.close()
+
+
+def compressible_values(n):
+    return [hbytes(10) + int_to_bytes(i, 2) + hbytes(20) for i in range(n)]
+
+
+def test_compressed_database_stores_values_compressed():
+    db = CompressedExampleDatabase(InMemoryExampleDatabase())
+    db.save(b'a', hbytes(100))
+    stored, = db.db.fetch(b'a')
+    assert len(stored) < 20
+    assert list(db.fetch(b'a')) == [hbytes(100)]
+
+
+def test_compressed_database_trains_a_dictionary_for_each_test(monkeypatch):
+    monkeypatch.setattr(database, 'DICTIONARY_TRAINING_SIZE', 5)
+    values = compressible_values(10)
+    db = CompressedExampleDatabase(InMemoryExampleDatabase())
+    db.save_many(b'a', values[:3])
+    db.save_many(b'a.secondary', values[3:6])
+    assert len(list(db.db.fetch(b'a.dictionary'))) == 1
+    db.save_many(b'a.coverage', values[6:])
+    assert list(db.db.fetch(b'a.coverage.dictionary')) == []
+    db.move(b'a', b'a.secondary', values[0])
+    db.move(b'a.secondary', b'b', values[3])
+    db.delete(b'a', values[1])
+
+    fresh = CompressedExampleDatabase(db.db)
+    assert sorted(fresh.fetch(b'a')) == [values[2]]
+    assert sorted(fresh.fetch(b'a.secondary')) == [
+        values[0], values[4], values[5]]
+    assert sorted(fresh.fetch(b'a.coverage')) == values[6:]
+    assert list(fresh.fetch(b'b')) == [values[3]]
+    assert b'a.dictionary' not in fresh.keys()
+
+
+def test_compressed_database_deletes_every_way_a_value_is_stored(
+    monkeypatch
+):
+    monkeypatch.setattr(database, 'DICTIONARY_TRAINING_SIZE', 3)
+    values = compressible_values(4)
+    db = CompressedExampleDatabase(InMemoryExampleDatabase())
+    db.save(b'a', values[0])
+    db.save_many(b'a', values[1:])
+    db.save(b'a.secondary', values[0])
+    db.move(b'a.secondary', b'a', values[0])
+    # Stored uncompressed, which we would never do for this value.
+    db.db.save(b'a', hbytes(database.COMPRESSION_HEADER.pack(
+        database.COMPRESSION_RAW, len(values[0]))) + values[0])
+    assert len(list(db.db.fetch(b'a'))) == 6
+    db.delete(b'a', values[0])
+    assert sorted(db.fetch(b'a')) == values[1:]
+    assert len(list(db.db.fetch(b'a'))) == 3
+    fresh = CompressedExampleDatabase(db.db)
+    fresh.delete(b'a', values[1])
+    assert sorted(fresh.fetch(b'a')) == values[2:]
+
+
+def test_compressed_database_ignores_values_it_cannot_read(monkeypatch):
+    monkeypatch.setattr(database, 'DICTIONARY_TRAINING_SIZE', 2)
+    db = CompressedExampleDatabase(InMemoryExampleDatabase())
+    db.save_many(b'a', compressible_values(2))
+    db.db.delete_many(b'a.dictionary', list(db.db.fetch(b'a.dictionary')))
+    db.db.save_many(b'a', [
+        b'', b'\x09\x00\x00\x00\x00', b'\x01\x00\x00\x00\x03abc',
+        b'\x00\x00\x00\x00\x02a',
+    ])
+    fresh = CompressedExampleDatabase(db.db)
+    assert list(fresh.fetch(b'a')) == []
+    assert [v.materialize() for v in fresh.fetch_lazy(b'a')] == [None] * 6
+
+
+def test_compressed_database_finds_dictionaries_saved_elsewhere(monkeypatch):
+    monkeypatch.setattr(database, 'DICTIONARY_TRAINING_SIZE', 5)
+    values = compressible_values(5)
+    shared = InMemoryExampleDatabase()
+    reader = CompressedExampleDatabase(shared)
+    assert list(reader.fetch(b'a')) == []
+    writer = CompressedExampleDatabase(shared)
+    writer.save_many(b'a', values)
+    writer.save(b'a.secondary', values[0])
+    stored, = shared.fetch(b'a.secondary')
+    assert stored[0] == database.COMPRESSION_DICTIONARY
+    assert list(reader.fetch(b'a.secondary')) == [values[0]]
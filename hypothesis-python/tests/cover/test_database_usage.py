@@ -187,3 +187,62 @@ def test_does_not_use_database_when_seed_is_forced(monkeypatch):
         pass
 
     test()
+
+
+def test_remembers_exhausted_tests_between_runs():
+    calls = [0]
+
+    @settings(database=InMemoryExampleDatabase(), remember_explored=True)
+    @given(st.booleans(), st.booleans())
+    def test(a, b):
+        calls[0] += 1
+
+    test()
+    first = calls[0]
+    assert first >= 4
+    calls[0] = 0
+    test()
+    assert calls[0] < first
+
+
+def test_forgets_explored_trees_when_a_closed_over_value_changes():
+    calls = [0]
+    db = InMemoryExampleDatabase()
+
+    def run(k):
+        calls[0] = 0
+
+        @settings(database=db, remember_explored=True)
+        @given(st.booleans().map(lambda b: (b, k)), st.booleans())
+        def test(x, y):
+            calls[0] += 1
+
+        test()
+        return calls[0]
+
+    first = run(1)
+    assert run(1) < first
+    assert run(2) >= first
+
+
+def test_strategy_digest_covers_the_functions_strategies_use():
+    def make(k):
+        @st.composite
+        def composite(draw):
+            return draw(st.integers()) + k
+        return composite()
+
+    assert core.strategy_digest(make(1)) == core.strategy_digest(make(1))
+    assert core.strategy_digest(make(1)) != core.strategy_digest(make(2))
+    plus_one = st.integers().map(
+        lambda x: x + 1
+    )
+    plus_two = st.integers().map(
+        lambda x: x + 2
+    )
+    assert core.strategy_digest(plus_one) != core.strategy_digest(plus_two)
+
+
+def test_strategy_digest_is_none_if_it_cannot_account_for_a_value():
+    value = object()
+    assert core.strategy_digest(st.integers().map(lambda x: value)) is None
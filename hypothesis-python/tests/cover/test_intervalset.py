@@ -71,6 +71,28 @@ def test_error_for_index_of_not_present_value(intervals, v):
         intervals.index(v)
 
 
+LargeIntervals = st.builds(IntervalSet, st.builds(
+    build_intervals,
+    st.lists(st.tuples(st.integers(0, 10000), st.integers(0, 1000)))
+))
+
+
+@given(LargeIntervals, st.data())
+def test_large_intervals_are_equivalent_to_their_lists(intervals, data):
+    ls = list(intervals)
+    assert len(ls) == len(intervals)
+    if ls:
+        i = data.draw(st.integers(-len(ls), len(ls) - 1))
+        assert ls[i] == intervals[i]
+        assert intervals.index(ls[i]) == ls.index(ls[i])
+
+
+@given(Intervals | LargeIntervals, st.integers(-10, 12000))
+def test_index_above_matches_list(intervals, v):
+    ls = list(intervals)
+    assert intervals.index_above(v) == len([x for x in ls if x < v])
+
+
 def test_validates_index():
     with pytest.raises(IndexError):
         IntervalSet([])[1]
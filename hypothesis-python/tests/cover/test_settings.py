@@ -244,6 +244,18 @@ def test_database_type_must_be_ExampleDatabase(db):
         assert settings.database is settings_property_db
 
 
+@pytest.mark.parametrize('workers', [0, -1, 1.5, '2'])
+def test_workers_must_be_a_positive_integer(workers):
+    with pytest.raises(InvalidArgument):
+        settings(workers=workers)
+
+
+@pytest.mark.parametrize('budget', [0, -1, 1.5, '2'])
+def test_memory_budget_must_be_none_or_a_positive_integer(budget):
+    with pytest.raises(InvalidArgument):
+        settings(memory_budget=budget)
+
+
 @checks_deprecated_behaviour
 def test_can_have_none_database_file():
     assert settings(database_file=None).database is None
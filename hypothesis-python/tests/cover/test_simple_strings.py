@@ -127,3 +127,21 @@ def test_fixed_size_bytes_just_draw_bytes():
 @given(text(max_size=10**6))
 def test_can_set_max_size_large(s):
     pass
+
+
+@given(text(characters(min_codepoint=0x400, max_codepoint=0x4ff),
+            min_size=20, max_size=20))
+def test_fixed_size_text_is_drawn_from_the_alphabet(s):
+    assert len(s) == 20
+    assert all(u'Ѐ' <= c <= u'ӿ' for c in s)
+
+
+def test_fixed_size_text_minimizes_towards_ascii_zero():
+    s = find(
+        text(min_size=3, max_size=3), lambda x: any(t < u'0' for t in x))
+    assert s == u'00' + chr(ord(u'0') - 1)
+
+
+def test_fixed_size_text_can_handle_large_codepoints():
+    s = find(text(min_size=2, max_size=2), lambda x: x >= u'☃')
+    assert s == u'☃0'
@@ -0,0 +1,56 @@
+# coding=utf-8
+#
+# This file is part of Hypothesis, which may be found at
+# https://github.com/HypothesisWorks/hypothesis-python
+#
+# Most of this work is copyright (C) 2013-2018 David R. MacIver
+# (david@drmaciver.com), but it contains contributions by others. See
+# CONTRIBUTING.rst for a full list of people who may hold copyright, and
+# consult the git log if you need to determine who owns an individual
+# contribution.
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+#
+# END HEADER
+
+from __future__ import division, print_function, absolute_import
+
+import pytest
+
+from hypothesis import given
+from hypothesis import strategies as st
+from hypothesis.internal.compat import hrange
+from hypothesis.internal.sketch import QuantileSketch
+
+timings = st.lists(
+    st.one_of(st.just(0.0), st.floats(1e-6, 1e4)), min_size=1)
+
+
+@given(timings, st.data())
+def test_ranks_are_within_accuracy(values, data):
+    sketch = QuantileSketch(accuracy=0.01)
+    for v in values:
+        sketch.add(v)
+    assert len(sketch) == len(values)
+    k = data.draw(st.integers(-len(values), len(values) - 1))
+    exact = sorted(values)[k]
+    approx = sketch.value_at_rank(k)
+    assert abs(approx - exact) <= 0.01 * exact
+
+
+def test_ranks_out_of_range_are_an_error():
+    sketch = QuantileSketch()
+    sketch.add(1.0)
+    with pytest.raises(IndexError):
+        sketch.value_at_rank(1)
+
+
+def test_uses_bounded_space():
+    sketch = QuantileSketch(accuracy=0.01)
+    for i in hrange(1, 10000):
+        sketch.add(i / 1000)
+    # Values span four orders of magnitude, each of which needs
+    # log(10) / log(1.01 / 0.99) ~= 115 buckets.
+    assert len(sketch.buckets) <= 4 * 116
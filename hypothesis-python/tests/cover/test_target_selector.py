@@ -17,6 +17,8 @@
 
 from __future__ import division, print_function, absolute_import
 
+from random import Random
+
 import attr
 
 import hypothesis.strategies as st
@@ -122,3 +124,18 @@ def test_always_starts_with_rare_tags(rnd, n):
     selector.add(FakeConjectureData(tags=frozenset({1})))
     _, data = selector.select()
     assert 1 in data.tags
+
+
+@given(st.integers(0, 2 ** 32), st.integers(1, 5))
+def test_bounded_selector_keeps_a_sample_of_each_tag(seed, k):
+    selector = TargetSelector(Random(seed), max_examples_per_tag=k)
+    datas = [FakeConjectureData(tags=frozenset({i % 2})) for i in hrange(20)]
+    for d in datas:
+        selector.add(d)
+    for t in (universal, 0, 1):
+        examples = selector.examples_by_tags[t]
+        assert len(examples) == k
+        assert all(selector.has_tag(t, d) for d in examples)
+    assert selector.tag_example_counts[universal] == 20
+    assert selector.tag_example_counts[0] == 10
+    check_bounded_cycle(selector)
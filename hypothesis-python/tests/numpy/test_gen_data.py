@@ -25,6 +25,7 @@ from flaky import flaky
 
 import hypothesis.strategies as st
 import hypothesis.extra.numpy as nps
+import hypothesis.internal.conjecture.floats as flt
 from hypothesis import given, assume, settings
 from hypothesis.errors import InvalidArgument
 from tests.common.debug import minimal, find_any
@@ -93,6 +94,39 @@ def test_can_minimize_float_arrays():
     assert x.sum() in (1, 50)
 
 
+@pytest.mark.parametrize('dtype', [u'bool', u'uint8', u'int16', u'float32'])
+def test_minimizes_dense_arrays_drawn_in_bulk(dtype):
+    x = minimal(
+        nps.arrays(dtype, 20, fill=st.nothing()),
+        lambda t: np.count_nonzero(t) >= 2, timeout_after=60
+    )
+    assert np.count_nonzero(x) == 2
+    assert (x[x != 0] == 1).all()
+
+
+@given(nps.arrays(u'uint16', 100, elements=st.integers(3, 1000),
+                  fill=st.nothing()))
+def test_dense_arrays_drawn_in_bulk_respect_bounds(arr):
+    assert ((3 <= arr) & (arr <= 1000)).all()
+
+
+@given(st.lists(st.integers(0, 2 ** 64 - 1), min_size=1))
+def test_decodes_floats_in_bulk_like_one_at_a_time(lex):
+    result = nps.lex_to_floats(np.array(lex, dtype=np.uint64))
+    for i, f in zip(lex, result):
+        expected = flt.lex_to_float(i)
+        assert expected == f or (np.isnan(expected) and np.isnan(f))
+
+
+def test_decodes_every_signed_integer_in_bulk():
+    decoder = nps.SignedDecoder(1)
+    raw = np.frombuffer(bytes(bytearray(range(256))), decoder.raw_dtype())
+    values = decoder.decode(raw)
+    assert sorted(values) == list(range(-128, 128))
+    assert list(values[:3]) == [0, 1, 2]
+    assert values[-1] == -128
+
+
 class Foo(object):
     pass
 
@@ -228,6 +262,46 @@ def test_array_values_are_unique(arr):
     assert len(set(arr)) == len(arr)
 
 
+@settings(max_examples=20)
+@given(nps.arrays(dtype='uint16', shape=1000, unique=True))
+def test_large_unique_arrays_are_unique(arr):
+    assert len(set(arr)) == len(arr)
+
+
+def test_minimizes_unique_arrays():
+    arr = minimal(nps.arrays(dtype='int8', shape=10, unique=True))
+    assert sorted(arr) == list(range(10))
+
+
+def test_unique_arrays_may_contain_many_nans():
+    find_any(
+        nps.arrays(dtype=float, elements=st.sampled_from([0.0, np.nan]),
+                   shape=5, unique=True),
+        lambda x: np.isnan(x).sum() == 4
+    )
+
+
+def test_unique_arrays_may_contain_many_nats():
+    find_any(
+        nps.arrays(dtype='datetime64[s]',
+                   elements=st.sampled_from([0, np.datetime64('NaT')]),
+                   shape=5, unique=True),
+        lambda x: np.isnat(x).sum() == 4
+    )
+
+
+def test_distinct_new_values_keeps_nan_and_nat():
+    nan = float('nan')
+    assert nps.distinct_new_values(
+        np.array([1.0, nan, 1.0, nan, 2.0]), np.array([2.0])
+    ).tolist() == [True, True, False, True, False]
+    nat = np.datetime64('NaT')
+    assert nps.distinct_new_values(
+        np.array([nat, nat, np.datetime64(0, 's'), np.datetime64(1, 's')]),
+        np.array([nat, np.datetime64(0, 's')]),
+    ).tolist() == [True, True, False, True]
+
+
 def test_may_fill_with_nan_when_unique_is_set():
     find_any(
         nps.arrays(
@@ -240,3 +240,34 @@ def test_uniqueness_does_not_affect_other_rows_2():
 def test_will_fill_missing_columns_in_tuple_row(df):
     for d in df['A']:
         assert d == 7
+
+
+@given(pdst.data_frames(
+    pdst.columns(['A'], dtype=int),
+    rows=st.tuples(st.integers(0, 10)),
+    index=pdst.indexes(dtype=int, min_size=1),
+))
+def test_rows_keep_the_column_dtype_with_any_index(df):
+    assert df['A'].dtype == np.dtype(int)
+    assert df['A'].between(0, 10).all()
+
+
+@given(pdst.data_frames(
+    [pdst.column('A', dtype='int8', fill=st.nothing(), unique=True),
+     pdst.column('B', dtype=float, fill=st.nothing())],
+    index=pdst.range_indexes(100, 100),
+))
+def test_columns_drawn_in_bulk_are_unique(df):
+    assert len(set(df['A'])) == len(df['A']) == 100
+    assert df['A'].dtype == np.dtype('int8')
+    assert df['B'].dtype == np.dtype(float)
+
+
+@given(pdst.data_frames(
+    [pdst.column('A', dtype=bool, fill=st.nothing()),
+     pdst.column('B', elements=st.text(), fill=st.nothing(), unique=True)],
+    index=pdst.range_indexes(1, 10),
+))
+def test_columns_not_drawn_in_bulk_are_unique(df):
+    assert df['B'].dtype == np.dtype(object)
+    assert len(set(df['B'])) == len(df['B'])
@@ -110,3 +110,18 @@ def test_generate_arbitrary_indices(data):
 
     if unique:
         assert len(set(index.values)) == len(index)
+
+
+@given(pdst.indexes(
+    dtype='datetime64[ns]', min_size=300, max_size=300, unique=True))
+def test_large_unique_time_indexes(ix):
+    assert isinstance(ix, pandas.DatetimeIndex)
+    assert len(ix) == 300
+    assert ix.is_unique
+
+
+@given(pdst.indexes(dtype='int8', min_size=200, unique=True))
+def test_unique_indexes_with_most_possible_values(ix):
+    assert ix.dtype == np.dtype('int64')
+    assert ix.is_unique
+    assert ix.min() >= -128 and ix.max() <= 127
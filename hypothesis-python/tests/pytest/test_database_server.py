@@ -0,0 +1,64 @@
+# coding=utf-8
+#
+# This file is part of Hypothesis, which may be found at
+# https://github.com/HypothesisWorks/hypothesis-python
+#
+# Most of this work is copyright (C) 2013-2018 David R. MacIver
+# (david@drmaciver.com), but it contains contributions by others. See
+# CONTRIBUTING.rst for a full list of people who may hold copyright, and
+# consult the git log if you need to determine who owns an individual
+# contribution.
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+#
+# END HEADER
+
+from __future__ import division, print_function, absolute_import
+
+import pytest
+
+from hypothesis.database import DIRECTORY_KEY_FILE
+from hypothesis.extra.pytestplugin import DATABASE_SERVER_OPTION
+
+pytest_plugins = str('pytester')
+
+pytest.importorskip('xdist')
+
+
+TESTSUITE = """
+import pytest
+
+from hypothesis import settings
+from hypothesis.database import RemoteExampleDatabase
+
+
+@pytest.mark.parametrize('i', range(4))
+def test_workers_share_a_database(i):
+    db = settings.default.database
+    assert isinstance(db, RemoteExampleDatabase)
+    db.save(b'key', str(i).encode('ascii'))
+    db.flush()
+    assert str(i).encode('ascii') in list(db.fetch(b'key'))
+"""
+
+
+def test_workers_use_the_database_server(testdir):
+    script = testdir.makepyfile(TESTSUITE)
+    result = testdir.runpytest_subprocess(
+        script, '-n', '2', DATABASE_SERVER_OPTION)
+    assert '4 passed' in '\n'.join(result.stdout.lines)
+    examples = testdir.tmpdir.join('.hypothesis', 'examples')
+    assert len(examples.listdir()) == 1
+    values = [
+        f for f in examples.listdir()[0].listdir()
+        if f.basename != DIRECTORY_KEY_FILE
+    ]
+    assert len(values) == 4
+
+
+def test_database_server_is_not_used_without_workers(testdir):
+    script = testdir.makepyfile(TESTSUITE)
+    result = testdir.runpytest(script, DATABASE_SERVER_OPTION)
+    assert '4 failed' in '\n'.join(result.stdout.lines)
@@ -67,6 +67,14 @@ def test_prints_statistics_given_option(testdir):
     assert 'HypothesisDeprecationWarning' in out
 
 
+def test_prints_cache_statistics_given_option(testdir):
+    script = testdir.makepyfile(TESTSUITE)
+    result = testdir.runpytest(script, PRINT_STATISTICS_OPTION)
+    out = '\n'.join(result.stdout.lines)
+    assert 'Caches:' in out
+    assert '- strategies: ' in out
+
+
 UNITTEST_TESTSUITE = """
 
 from hypothesis import given